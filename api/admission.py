@@ -0,0 +1,93 @@
+# api/admission.py
+
+import logging
+import os
+import shutil
+from typing import Iterable, Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from config import settings
+from workflows.cost_model import cost_model
+from workflows.job_queue import queue_forecast
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+def cpu_load() -> Optional[float]:
+    # One-minute load average per core; unavailable on Windows without psutil
+    try:
+        load = psutil.getloadavg()[0] if psutil else os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+    return load / (os.cpu_count() or 1)
+
+def free_memory_mb() -> Optional[float]:
+    if psutil:
+        return psutil.virtual_memory().available / 2**20
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def free_disk_mb(path: str) -> Optional[float]:
+    try:
+        return shutil.disk_usage(path).free / 2**20
+    except OSError:
+        return None
+
+def estimate_wait(db: Session, request_data: Optional[dict] = None, completed_stages: Iterable[str] = ()) -> dict:
+    # The queue plan that VideoJobResponse.eta_seconds comes from, with the new job appended
+    if request_data is None:
+        cost = settings.admission_default_job_seconds
+    else:
+        cost = cost_model.total_seconds(db, request_data, completed_stages)
+    return queue_forecast(db, cost)
+
+def _reject(status_code: int, reason: str, retry_after: int, wait: dict):
+    logger.warning(f"Admission rejected ({status_code}): {reason}")
+    raise HTTPException(
+        status_code=status_code,
+        detail={
+            "message": "Server is busy, retry later",
+            "reason": reason,
+            "retry_after": retry_after,
+            "eta_seconds": wait["eta_seconds"],
+            "queue_depth": wait["pending"]
+        },
+        headers={"Retry-After": str(retry_after)}
+    )
+
+def check_admission(db: Session, request_data: Optional[dict] = None, completed_stages: Iterable[str] = ()):
+    """Refuse new work when the queue is full (429), or too many renders are running or the host
+    is short on CPU, memory or disk (503)."""
+    if not settings.admission_control:
+        return
+
+    wait = estimate_wait(db, request_data, completed_stages)
+
+    if wait["pending"] >= settings.admission_max_queue:
+        # The queue frees a slot when the head of it starts on the first worker to free up
+        _reject(429, f"queue is full ({wait['pending']} waiting)", max(wait["next_start_seconds"], 1), wait)
+
+    if settings.admission_max_running_renders and wait["running"] >= settings.admission_max_running_renders:
+        _reject(503, f"{wait['running']} renders running", max(wait["next_start_seconds"], 1), wait)
+
+    load = cpu_load()
+    if load is not None and load > settings.admission_max_load:
+        _reject(503, f"CPU load {load:.2f} per core", settings.admission_retry_after, wait)
+
+    memory = free_memory_mb()
+    if memory is not None and memory < settings.admission_min_free_memory_mb:
+        _reject(503, f"only {memory:.0f} MB memory free", settings.admission_retry_after, wait)
+
+    disk = free_disk_mb(settings.output_dir)
+    if disk is not None and disk < settings.admission_min_free_disk_mb:
+        _reject(503, f"only {disk:.0f} MB disk free", settings.admission_retry_after, wait)
@@ -1,29 +1,91 @@
 # api/routes.py
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Header, Query, Request, Response
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import and_, literal, or_, select, update, String, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
+from typing import List, Optional, Tuple
 import os
+import json
+import base64
+import binascii
+import asyncio
+import time
 import uuid
-from datetime import datetime
+import zlib
 
 from models import (
     VideoGenerationRequest, VideoJobResponse, ScriptRequest, ScriptResponse,
-    StyleAnalysisRequest, VideoStatus
+    StyleAnalysisRequest, VideoStatus, ScenePatchRequest
 )
 from database import get_db, VideoJob
 from workflows.video_workflow import VideoWorkflow
-from api.websocket import manager
+from services.llm_cache import llm_cache
+from workflows.checkpoints import INPUTS, load_checkpoints
+from workflows.artifacts import BLUEPRINT, SCRIPT, load_artifact_blob
+from api.admission import check_admission
+from api.status_cache import ACTIVE, CachedStatus, etag_matches, status_cache
+from workflows.job_queue import enqueue, queue_plan, request_fingerprint, find_reusable_job
+from config import settings
+from workflows.scene_editor import apply_patch, load_script, save_script
+from workflows.storage import touch
 from utils.logger_config import setup_logger
+from utils.metrics import STATUS_LOOKUPS
 
 logger = setup_logger('api')
 router = APIRouter()
 
+# Lookup-then-create for new jobs must not interleave, or identical requests both create jobs
+_submit_lock = asyncio.Lock()
+
+def _resource_usage(job: VideoJob) -> Optional[dict]:
+    return json.loads(job.resource_usage) if job.resource_usage else None
+
+def _encode_cursor(created_at: str, job_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, job_id]).encode('utf-8')).decode('ascii').rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(job_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, job_id
+
+def _job_response(db: Session, job: VideoJob, message: str = None, plan: dict = None) -> VideoJobResponse:
+    # One plan can serve a whole listing; it is only needed for jobs still in the queue
+    if plan is None and job.status in (VideoStatus.PENDING, VideoStatus.PROCESSING):
+        plan = queue_plan(db)
+    position, eta = (plan or {}).get(job.id, (None, None))
+    return VideoJobResponse(
+        job_id=job.id,
+        status=job.status,
+        topic=job.topic,
+        style=job.style,
+        progress=job.progress or 0,
+        message=message or job.message or "",
+        video_url=job.video_path,
+        report_url=job.report_url,
+        created_at=job.created_at,
+        completed_at=job.completed_at,
+        error=job.error,
+        queue_position=position,
+        estimated_seconds=job.estimated_seconds,
+        eta_seconds=eta,
+        resource_usage=_resource_usage(job)
+    )
+
+def _job_responses(db: Session, jobs: List[VideoJob]) -> List[VideoJobResponse]:
+    in_queue = any(job.status in (VideoStatus.PENDING, VideoStatus.PROCESSING) for job in jobs)
+    plan = queue_plan(db) if in_queue else {}
+    return [_job_response(db, job, plan=plan) for job in jobs]
+
 # Generate Script
 @router.post("/script/generate", response_model=ScriptResponse)
 async def generate_script(
     request: ScriptRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         logger.info(f"Script generation requested for: {request.topic}")
@@ -32,7 +94,8 @@ async def generate_script(
         script = await workflow.generate_script_async(
             request.topic,
             request.style.value,
-            request.duration
+            request.duration,
+            use_cache=request.use_cache
         )
         
         if not script:
@@ -49,72 +112,111 @@ async def generate_script(
 @router.post("/video/generate", response_model=VideoJobResponse)
 async def generate_video(
     request: VideoGenerationRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=200),
+    x_tenant_id: str = Header("default", min_length=1, max_length=100)
 ):
     try:
         logger.info(f"Video generation requested: {request.topic}")
         
-        job_id = str(uuid.uuid4())
-        
-        # Create job in database
-        job = VideoJob(
-            id=job_id,
-            topic=request.topic,
-            style=request.style_analysis.style.value,
-            status=VideoStatus.PENDING,
-            llm_provider=request.llm_provider.value
-        )
-        db.add(job)
-        db.commit()
-        
-        # Start background task
-        background_tasks.add_task(
-            process_video_job,
-            job_id,
-            request.dict(),
-            request.llm_provider.value
-        )
+        request_data = request.dict()
+        fingerprint = request_fingerprint(request_data, x_tenant_id)
+        
+        async with _submit_lock:
+            # A retried request returns the job its first attempt created
+            if idempotency_key:
+                existing = (await db.execute(
+                    select(VideoJob).where(VideoJob.idempotency_key == idempotency_key)
+                )).scalars().first()
+                if existing:
+                    if existing.request_hash and existing.request_hash != fingerprint:
+                        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+                    response.headers["Idempotent-Replayed"] = "true"
+                    return await db.run_sync(_job_response, existing)
+            
+            # Identical requests share one run; use_cache=false asks for a fresh one
+            if settings.job_coalescing and request.use_cache:
+                existing = await db.run_sync(find_reusable_job, fingerprint)
+                if existing:
+                    logger.info(f"Request coalesced with job {existing.id}")
+                    response.headers["X-Coalesced-Job"] = existing.id
+                    return await db.run_sync(_job_response, existing, f"Attached to identical job ({existing.status.value})")
+            
+            # Only requests that add work to the queue are subject to admission
+            await db.run_sync(check_admission, request_data)
+            
+            job_id = str(uuid.uuid4())
+            
+            # Create job in database
+            job = VideoJob(
+                id=job_id,
+                topic=request.topic,
+                style=request.style_analysis.style.value,
+                status=VideoStatus.PENDING,
+                llm_provider=request.llm_provider.value,
+                request_hash=fingerprint,
+                idempotency_key=idempotency_key,
+                tenant=x_tenant_id
+            )
+            db.add(job)
+            
+            # Queue for the worker pool
+            await db.run_sync(enqueue, job, request_data, priority=request.priority)
         
         logger.info(f"Job created: {job_id}")
         
-        return VideoJobResponse(
-            job_id=job_id,
-            status=VideoStatus.PENDING,
-            topic=request.topic,
-            style=request.style_analysis.style.value,
-            message="Video generation started"
-        )
+        return await db.run_sync(_job_response, job, "Video generation queued")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Video generation error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _cached_status(db: AsyncSession, job_id: str) -> CachedStatus:
+    entry = status_cache.get(job_id)
+    if entry is not None:
+        STATUS_LOOKUPS.labels("hit").inc()
+        return entry
+    
+    STATUS_LOOKUPS.labels("miss").inc()
+    job = await db.get(VideoJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    entry = status_cache.put(await db.run_sync(_job_response, job), keep_live=True)
+    # A long poll must not hold a pooled connection (or stale identity map) while it waits
+    await db.close()
+    return entry
+
 # Get Job Status
 @router.get("/video/status/{job_id}", response_model=VideoJobResponse)
 async def get_job_status(
     job_id: str,
-    db: Session = Depends(get_db)
+    response: Response,
+    wait: float = Query(0, ge=0, le=settings.status_max_wait),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
 ):
+    """Answered from the status cache. A status still matching If-None-Match is a 304. With `wait`,
+    an unfinished job's status is held until it differs from If-None-Match (or from the status
+    at the time of the request) or `wait` seconds pass."""
     try:
-        job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
-        
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        return VideoJobResponse(
-            job_id=job.id,
-            status=job.status,
-            topic=job.topic,
-            style=job.style,
-            progress=job.progress,
-            message=job.message,
-            video_url=job.video_path,
-            report_url=job.report_url,
-            created_at=job.created_at,
-            completed_at=job.completed_at,
-            error=job.error
-        )
+        entry = await _cached_status(db, job_id)
+        
+        known = if_none_match or entry.etag
+        deadline = time.monotonic() + wait
+        while wait and entry.response.status in ACTIVE and etag_matches(known, entry.etag):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await status_cache.wait_for_change(entry, remaining)
+            entry = await _cached_status(db, job_id)
+        
+        if etag_matches(if_none_match, entry.etag):
+            return Response(status_code=304, headers={"ETag": entry.etag})
+        response.headers["ETag"] = entry.etag
+        return entry.response
         
     except HTTPException:
         raise
@@ -125,48 +227,237 @@ async def get_job_status(
 # List Jobs
 @router.get("/video/jobs", response_model=List[VideoJobResponse])
 async def list_jobs(
-    skip: int = 0,
-    limit: int = 10,
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
     status: Optional[VideoStatus] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    """Newest jobs first. Pass the X-Next-Cursor header of a page as `cursor` for the next one."""
     try:
-        query = db.query(VideoJob)
+        # created_at as stored: re-binding the parsed datetime would not compare equal
+        # to SQLite's server-default text, and ties on it must be broken by id
+        created_text = type_coerce(VideoJob.created_at, String).label("created_text")
+        # Every listed job's response carries its resource usage: load it with the page
+        query = select(VideoJob, created_text).options(undefer(VideoJob.resource_usage))
         
         if status:
-            query = query.filter(VideoJob.status == status)
-        
-        jobs = query.order_by(VideoJob.created_at.desc()).offset(skip).limit(limit).all()
-        
-        return [
-            VideoJobResponse(
-                job_id=job.id,
-                status=job.status,
-                topic=job.topic,
-                style=job.style,
-                progress=job.progress,
-                message=job.message,
-                video_url=job.video_path,
-                report_url=job.report_url,
-                created_at=job.created_at,
-                completed_at=job.completed_at,
-                error=job.error
-            )
-            for job in jobs
-        ]
+            query = query.where(VideoJob.status == status)
+        
+        if cursor:
+            created_at, job_id = _decode_cursor(cursor)
+            after = literal(created_at, String)
+            query = query.where(or_(
+                VideoJob.created_at < after,
+                and_(VideoJob.created_at == after, VideoJob.id < job_id)
+            ))
+        
+        # Seek on the (status, created_at, id) index: no scan past the page, however deep
+        rows = (await db.execute(
+            query.order_by(VideoJob.created_at.desc(), VideoJob.id.desc()).limit(limit + 1)
+        )).all()
+        
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_job, last_created = rows[-1]
+            response.headers["X-Next-Cursor"] = _encode_cursor(str(last_created), last_job.id)
         
+        return await db.run_sync(_job_responses, [job for job, _ in rows])
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"List jobs error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Resume Failed Job
+@router.post("/video/resume/{job_id}", response_model=VideoJobResponse)
+async def resume_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        job = await db.get(VideoJob, job_id, options=[undefer(VideoJob.request_data)])
+        
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        if job.status != VideoStatus.FAILED:
+            raise HTTPException(status_code=409, detail=f"Only failed jobs can be resumed (job is {job.status.value})")
+        
+        # The stage checkpoints still hold the unedited video, so a failed edit runs as an edit again
+        if json.loads(job.request_data or "{}").get('scene_edit'):
+            request_data = {'topic': job.topic, 'scene_edit': True}
+            await db.run_sync(check_admission, request_data)
+            
+            job.error = None
+            job.message = "Retrying the scene edit"
+            await db.run_sync(enqueue, job, request_data, priority=job.priority or 0)
+            
+            logger.info(f"Scene edit of job {job_id} resumed")
+            return status_cache.put(await db.run_sync(_job_response, job)).response
+        
+        checkpoints = await asyncio.to_thread(load_checkpoints, job_id)
+        if INPUTS not in checkpoints:
+            raise HTTPException(status_code=409, detail="Job has no checkpoints to resume from")
+        
+        inputs = checkpoints[INPUTS]
+        completed = [stage for stage in checkpoints if stage != INPUTS]
+        
+        request_data = {
+            'topic': inputs['topic'],
+            'style_analysis': inputs['style_data'],
+            'use_cache': inputs.get('use_cache', True),
+            'video_duration': inputs.get('video_duration', 120)
+        }
+        await db.run_sync(check_admission, request_data, completed)
+        
+        job.error = None
+        job.message = f"Resuming after: {', '.join(completed)}" if completed else "Resuming from the start"
+        
+        await db.run_sync(enqueue, job, request_data, priority=job.priority or 0, resume=True, completed_stages=completed)
+        
+        logger.info(f"Job resumed: {job_id}")
+        
+        return status_cache.put(await db.run_sync(_job_response, job)).response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Resume error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Cancel a Queued or Running Job
+@router.post("/video/cancel/{job_id}", response_model=VideoJobResponse)
+async def cancel_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        job = await db.get(VideoJob, job_id)
+        
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        if job.status not in (VideoStatus.PENDING, VideoStatus.PROCESSING):
+            raise HTTPException(status_code=409, detail=f"Job has already finished (job is {job.status.value})")
+        
+        # A job no worker has claimed yet is cancelled outright; the status check loses no race with claim_next
+        dequeued = (await db.execute(
+            update(VideoJob).where(
+                VideoJob.id == job_id,
+                VideoJob.status == VideoStatus.PENDING
+            ).values(status=VideoStatus.CANCELLED, message="Cancelled").execution_options(synchronize_session=False)
+        )).rowcount
+        
+        if not dequeued:
+            # The owning worker sees the flag, kills its child processes and releases the workspace
+            job.cancel_requested = True
+            job.message = "Cancelling"
+        await db.commit()
+        await db.refresh(job)
+        
+        logger.info(f"Job {job_id} {'cancelled' if dequeued else 'cancellation requested'}")
+        
+        return status_cache.put(await db.run_sync(_job_response, job)).response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Cancel error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Edit a Scene of a Completed Job
+@router.patch("/video/{job_id}/scenes/{scene_number}", response_model=VideoJobResponse)
+async def patch_scene(
+    job_id: str,
+    scene_number: int,
+    patch: ScenePatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        job = await db.get(VideoJob, job_id, options=[undefer(VideoJob.request_data)])
+        
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        # Further edits may pile onto an edit that is still waiting for a worker
+        pending_edit = job.status == VideoStatus.PENDING and json.loads(job.request_data or "{}").get('scene_edit')
+        if job.status != VideoStatus.COMPLETED and not pending_edit:
+            raise HTTPException(status_code=409, detail=f"Only completed jobs can be edited (job is {job.status.value})")
+        
+        changes = patch.model_dump(exclude_none=True)
+        if not changes:
+            raise HTTPException(status_code=400, detail="No changes given")
+        
+        if not pending_edit:
+            await db.run_sync(check_admission, {'topic': job.topic, 'scene_edit': True})
+        
+        script_data = await db.run_sync(load_script, job_id)
+        try:
+            script_data = apply_patch(script_data or {}, scene_number, changes)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e.args[0]))
+        
+        await asyncio.to_thread(save_script, job_id, script_data)
+        await db.refresh(job)
+        
+        # The edited video no longer answers the original request
+        job.request_hash = None
+        
+        job.message = f"Re-rendering scene {scene_number}"
+        await db.run_sync(enqueue, job, {'topic': job.topic, 'scene_edit': True}, priority=job.priority or 0)
+        
+        logger.info(f"Scene {scene_number} of job {job_id} edited: {', '.join(changes)}")
+        
+        return status_cache.put(await db.run_sync(_job_response, job)).response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Scene edit error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _artifact_response(db: Session, job_id: str, kind: str, accept_encoding: str) -> Response:
+    if not db.query(VideoJob.id).filter(VideoJob.id == job_id).first():
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    blob = load_artifact_blob(db, job_id, kind)
+    if blob is None:
+        raise HTTPException(status_code=404, detail=f"Job has no {kind} yet")
+    
+    # The stored zlib stream is a valid deflate body: hand it over without inflating
+    if "deflate" in accept_encoding.lower():
+        return Response(content=blob, media_type="application/json",
+                        headers={"Content-Encoding": "deflate", "Vary": "Accept-Encoding"})
+    return Response(content=zlib.decompress(blob), media_type="application/json", headers={"Vary": "Accept-Encoding"})
+
+# Script of a Job
+@router.get("/video/{job_id}/script")
+async def get_job_script(
+    job_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    return await db.run_sync(_artifact_response, job_id, SCRIPT, request.headers.get("accept-encoding", ""))
+
+# Animation Blueprint of a Job
+@router.get("/video/{job_id}/blueprint")
+async def get_job_blueprint(
+    job_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    return await db.run_sync(_artifact_response, job_id, BLUEPRINT, request.headers.get("accept-encoding", ""))
+
 # Download Video
 @router.get("/video/download/{job_id}")
 async def download_video(
     job_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+        job = await db.get(VideoJob, job_id)
         
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
@@ -177,6 +468,9 @@ async def download_video(
         if not job.video_path or not os.path.exists(job.video_path):
             raise HTTPException(status_code=404, detail="Video file not found")
         
+        # Recently downloaded videos are the last to go when storage is over quota
+        await asyncio.to_thread(touch, job.video_path)
+        
         return FileResponse(
             job.video_path,
             media_type="video/mp4",
@@ -189,63 +483,7 @@ async def download_video(
         logger.error(f"Download error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-# Background task
-async def process_video_job(job_id: str, request_data: dict, llm_provider: str):
-    from database import SessionLocal
-    
-    db = SessionLocal()
-    
-    try:
-        logger.info(f"Processing job: {job_id}")
-        
-        # Update status
-        job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
-        job.status = VideoStatus.PROCESSING
-        job.message = "Starting video generation"
-        db.commit()
-        
-        # Send WebSocket update
-        await manager.send_progress(job_id, "starting", 0, "Initializing")
-        
-        # Create workflow
-        workflow = VideoWorkflow(llm_provider=llm_provider)
-        
-        # Generate video
-        result = await workflow.process_full_workflow(
-            job_id=job_id,
-            topic=request_data['topic'],
-            style_data=request_data['style_analysis'],
-            db=db
-        )
-        
-        if result and result.get('video_file'):
-            job.status = VideoStatus.COMPLETED
-            job.progress = 100
-            job.message = "Video generation completed"
-            job.video_path = result['video_file']
-            job.report_url = result.get('report_url')
-            job.completed_at = datetime.now()
-            
-            await manager.send_progress(job_id, "completed", 100, "Video ready")
-        else:
-            job.status = VideoStatus.FAILED
-            job.error = "Video generation failed"
-            job.message = "Failed to generate video"
-            
-            await manager.send_error(job_id, "Video generation failed")
-        
-        db.commit()
-        
-    except Exception as e:
-        logger.error(f"Job processing error: {str(e)}", exc_info=True)
-        
-        job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
-        job.status = VideoStatus.FAILED
-        job.error = str(e)
-        job.message = f"Error: {str(e)}"
-        db.commit()
-        
-        await manager.send_error(job_id, str(e))
-        
-    finally:
-        db.close()
\ No newline at end of file
+# LLM Cache Stats
+@router.get("/cache/stats")
+async def cache_stats():
+    return llm_cache.stats()
@@ -0,0 +1,124 @@
+# api/status_cache.py
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from config import settings
+from models import VideoJobResponse, VideoStatus
+
+ACTIVE = (VideoStatus.PENDING, VideoStatus.PROCESSING)
+
+@dataclass
+class CachedStatus:
+    response: VideoJobResponse
+    etag: str
+    stored_at: float
+    read_at: float
+    live: bool = False  # progress reported by a job running in this process, ahead of its row
+    waiters: int = 0
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+def make_etag(response: VideoJobResponse) -> str:
+    # Weak: the same status may serialize with different bytes
+    return f'W/"{hashlib.sha1(response.model_dump_json().encode("utf-8")).hexdigest()[:20]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+class StatusCache:
+    """Status responses of this API process, so polls do not each cost a database round trip.
+
+    Routes write the jobs they change through the cache; the progress relay patches entries of
+    watched jobs from their rows, and jobs run in-process report progress directly. An entry is
+    reloaded `ttl` seconds after it was loaded, which refreshes its queue position and ETA.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl if ttl is not None else settings.status_cache_ttl
+        self.max_entries = max_entries if max_entries is not None else settings.status_cache_size
+        self._entries: "OrderedDict[str, CachedStatus]" = OrderedDict()
+
+    def get(self, job_id: str) -> Optional[CachedStatus]:
+        entry = self._entries.get(job_id)
+        now = time.monotonic()
+        if entry is None or now - entry.stored_at > self.ttl:
+            return None
+        entry.read_at = now
+        self._entries.move_to_end(job_id)
+        return entry
+
+    def put(self, response: VideoJobResponse, keep_live: bool = False) -> CachedStatus:
+        """Store a response built from the job row. With keep_live, progress this process
+        reported for the still running job wins over the row's."""
+        old = self._entries.get(response.job_id)
+        live = keep_live and old is not None and old.live and old.response.status == response.status == VideoStatus.PROCESSING
+        if live:
+            response = response.model_copy(update={"progress": old.response.progress, "message": old.response.message})
+        return self._store(response, time.monotonic(), live)
+
+    def update(self, job_id: str, status: VideoStatus, progress: int, message: str, error: Optional[str]):
+        """Apply a snapshot of the job row from the progress relay."""
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return
+        if status != entry.response.status:
+            # A new status comes with fields the snapshot lacks (URLs, completion, usage): reload it
+            self.discard(job_id)
+        elif not entry.live:
+            changes = {"progress": progress, "message": message, "error": error}
+            self._store(entry.response.model_copy(update=changes), entry.stored_at, False)
+
+    def report_progress(self, job_id: str, progress: int, message: str):
+        entry = self._entries.get(job_id)
+        if entry is not None and entry.response.status == VideoStatus.PROCESSING:
+            changes = {"progress": progress, "message": message}
+            self._store(entry.response.model_copy(update=changes), entry.stored_at, True)
+
+    def discard(self, job_id: str):
+        entry = self._entries.pop(job_id, None)
+        if entry is not None:
+            entry.changed.set()
+
+    async def wait_for_change(self, entry: CachedStatus, timeout: float):
+        entry.waiters += 1
+        try:
+            await asyncio.wait_for(entry.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            entry.waiters -= 1
+
+    def watched(self) -> List[str]:
+        """Unfinished jobs someone is waiting on or polled within the last `ttl` seconds."""
+        now = time.monotonic()
+        return [
+            job_id for job_id, entry in self._entries.items()
+            if entry.response.status in ACTIVE and (entry.waiters or now - entry.read_at <= self.ttl)
+        ]
+
+    def _store(self, response: VideoJobResponse, stored_at: float, live: bool) -> CachedStatus:
+        etag = make_etag(response)
+        old = self._entries.get(response.job_id)
+        if old is not None and old.etag == etag:
+            old.response, old.stored_at, old.live = response, stored_at, live
+            return old
+
+        entry = CachedStatus(response, etag, stored_at, read_at=old.read_at if old else time.monotonic(), live=live)
+        self._entries[response.job_id] = entry
+        self._entries.move_to_end(response.job_id)
+        if old is not None:
+            old.changed.set()
+
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            evicted.changed.set()
+        return entry
+
+status_cache = StatusCache()
@@ -1,11 +1,14 @@
 # api/websocket.py
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set
+from typing import Dict, Optional, Set, Tuple
 import json
 import asyncio
+import threading
 from datetime import datetime
 
-from models import WSMessage, WSProgressUpdate, WSError
+from config import settings
+from models import WSMessage, WSProgressUpdate, WSError, VideoStatus
+from api.status_cache import status_cache
 from utils.logger_config import setup_logger
 
 logger = setup_logger('websocket')
@@ -14,6 +17,8 @@ class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.job_subscribers: Dict[str, Set[str]] = {}
+        # Set in worker processes: they have no sockets, so progress only goes to the job row
+        self.persist_progress = False
     
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
@@ -45,6 +50,16 @@ class ConnectionManager:
                 logger.error(f"Error sending to {client_id}: {str(e)}")
     
     async def send_progress(self, job_id: str, stage: str, progress: int, message: str):
+        # The job row carries progress wherever the job runs, so other API processes and restarts see it
+        progress_buffer.put(job_id, progress, message)
+        if self.persist_progress:
+            return
+        
+        # A job running in this process: status polls here read it before the next flush
+        status_cache.report_progress(job_id, progress, message)
+        await self.publish_progress(job_id, stage, progress, message)
+    
+    async def publish_progress(self, job_id: str, stage: str, progress: int, message: str):
         update = WSProgressUpdate(
             job_id=job_id,
             stage=stage,
@@ -64,6 +79,9 @@ class ConnectionManager:
         logger.info(f"Progress update sent for job {job_id}: {stage} - {progress}%")
     
     async def send_error(self, job_id: str, error: str):
+        if self.persist_progress:
+            return  # the workflow records the error on the job row itself
+        
         error_msg = WSError(error=error)
         
         ws_message = WSMessage(
@@ -83,6 +101,118 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def _store_progress(updates: Dict[str, Tuple[int, str]]):
+    from database import SessionLocal, VideoJob
+    
+    db = SessionLocal()
+    try:
+        for job_id, (progress, message) in updates.items():
+            # Only running jobs: a late flush must not overwrite a final status' progress and message
+            db.query(VideoJob).filter(
+                VideoJob.id == job_id,
+                VideoJob.status == VideoStatus.PROCESSING
+            ).update(
+                {VideoJob.progress: progress, VideoJob.message: message},
+                synchronize_session=False
+            )
+        db.commit()
+    finally:
+        db.close()
+
+class ProgressBuffer:
+    """Write-behind progress for running jobs, in worker processes and (JOB_WORKERS=0) in the API.
+    
+    Stages report progress many times a second across scenes; only the latest update per
+    job is kept, and all of them are written in one transaction per flush interval.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    def put(self, job_id: str, progress: int, message: str):
+        with self._lock:
+            self._pending[job_id] = (progress, message)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def flush(self):
+        with self._lock:
+            updates, self._pending = self._pending, {}
+        if not updates:
+            return
+        try:
+            _store_progress(updates)
+        except Exception as e:
+            logger.error(f"Progress flush failed: {str(e)}")
+            with self._lock:
+                # Keep them for the next flush unless newer updates arrived meanwhile
+                for job_id, update in updates.items():
+                    self._pending.setdefault(job_id, update)
+    
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await asyncio.to_thread(self.flush)
+        except asyncio.CancelledError:
+            self.flush()
+            raise
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+progress_buffer = ProgressBuffer(settings.progress_flush_interval)
+
+def _load_progress(job_ids: list) -> list:
+    from database import SessionLocal, VideoJob
+    
+    db = SessionLocal()
+    try:
+        return db.query(
+            VideoJob.id, VideoJob.status, VideoJob.progress, VideoJob.message, VideoJob.error
+        ).filter(VideoJob.id.in_(job_ids)).all()
+    finally:
+        db.close()
+
+async def relay_progress(interval: float, forward: bool = True):
+    # Forward progress that worker processes wrote to the database to subscribed clients (if forward),
+    # and keep the status cache current for jobs being polled
+    last_seen = {}
+    while True:
+        await asyncio.sleep(interval)
+        subscribed = {job_id for job_id, clients in manager.job_subscribers.items() if clients} if forward else set()
+        job_ids = list(subscribed.union(status_cache.watched()))
+        if not job_ids:
+            continue
+        
+        try:
+            rows = await asyncio.to_thread(_load_progress, job_ids)
+        except Exception as e:
+            logger.error(f"Progress relay failed: {str(e)}")
+            continue
+        
+        for job_id, status, progress, message, error in rows:
+            snapshot = (status, progress, message)
+            if last_seen.get(job_id) == snapshot:
+                continue
+            last_seen[job_id] = snapshot
+            
+            status_cache.update(job_id, status, progress or 0, message or "", error)
+            if job_id not in subscribed:
+                continue
+            
+            if status == VideoStatus.FAILED:
+                await manager.send_error(job_id, error or message or "Job failed")
+            else:
+                await manager.publish_progress(job_id, status.value, progress or 0, message or "")
+
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await manager.connect(websocket, client_id)
     
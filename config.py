@@ -45,7 +45,7 @@ def validate_config():
         logger.error(f"Config validation error: {str(e)}")
         return False# config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 class Settings(BaseSettings):
@@ -66,17 +66,35 @@ class Settings(BaseSettings):
     ollama_model: str = "phi3:mini"  # Only phi3:mini supported via Ollama
     
     # TTS Configuration (100% FREE options)
-    tts_provider: str = "huggingface_piper"  # piper, coqui, bark, sarvam, gtts, edge_tts
+    tts_provider: str = "huggingface_piper"  # piper, coqui, bark, sarvam, gtts, edge_tts, record, replay
     tts_language: str = "en"  # en, hi, ta, te, bn, gu, kn, ml, mr, pa
     tts_voice: str = "default"
     tts_speaker: str = "meera"  # For Sarvam: meera, anushka, arvind, etc.
     
+    # Sarvam batching (inputs per request / chars per input are API limits)
+    sarvam_api_url: str = "https://api.sarvam.ai/text-to-speech"
+    sarvam_max_inputs: int = 3
+    sarvam_max_chars: int = 500
+    sarvam_timeout: int = 30
+    sarvam_max_retries: int = 3
+    sarvam_backoff: float = 0.5
+    sarvam_pool_size: int = 10
+    
     # Google
     google_credentials_path: str = "credentials.json"
     google_token_path: str = "token.json"
     
     # Database
     database_url: str = "sqlite:///./video_synthesis.db"
+    async_database_url: str = ""  # derived from database_url (sqlite+aiosqlite, postgresql+asyncpg) when empty
+    db_pool_size: int = 20  # connections kept open; status polls and job threads share them
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # seconds to wait for a free connection
+    db_busy_timeout: float = 15.0  # seconds a writer waits for the SQLite lock
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL"  # FULL for fsync on every commit
+    sqlite_cache_kb: int = 20000  # page cache per connection
+    progress_flush_interval: float = 1.0  # seconds between batched progress writes from workers
     redis_url: str = "redis://localhost:6379"
     
     # API Settings
@@ -91,6 +109,7 @@ class Settings(BaseSettings):
     output_dir: str = "generated_videos"
     temp_dir: str = "temp_files"
     log_dir: str = "logs"
+    cache_dir: str = "cache"
     
     # Video Processing
     manim_quality: str = "medium_quality"
@@ -105,6 +124,101 @@ class Settings(BaseSettings):
     llm_temperature: float = 0.7
     llm_max_tokens: int = 2000
     
+    # Hedged LLM calls: race Phi-3 when Mistral is slower than its usual percentile
+    llm_hedge_enabled: bool = True
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_hedge_default_delay: float = 30.0  # seconds, until enough latency samples exist
+    llm_hedge_min_delay: float = 2.0
+    llm_call_deadline: float = 180.0  # hard cap per script/blueprint call
+    
+    # Blueprint generation: "single" prompt or "per_scene" fan-out
+    blueprint_mode: str = "single"
+    blueprint_batch_size: int = 1  # scenes per request in per_scene mode
+    blueprint_concurrency: int = 4
+    blueprint_batch_retries: int = 2
+    
+    # Worker processes for CPU-heavy stages (0 = run them on threads)
+    cpu_workers: int = 0
+    
+    # Streaming script generation (narrate/render scenes as they arrive)
+    script_streaming: bool = False
+    scene_pipeline_workers: int = 2
+    
+    # LLM response cache (scripts and blueprints)
+    llm_cache_enabled: bool = True
+    llm_cache_ttl: int = 86400  # seconds
+    llm_cache_max_bytes: int = 100000000
+    
+    # Follow-up requests for fragments that fail schema validation (0 = repair locally only)
+    llm_fragment_retries: int = 1
+    
+    # Job queue: worker processes claim PENDING rows of video_jobs under a renewable lease
+    job_workers: int = 2  # 0 = run jobs inside the API process
+    job_lease_seconds: int = 120
+    job_poll_interval: float = 1.0
+    job_max_attempts: int = 3
+    progress_relay_interval: float = 1.0
+    
+    # Job status responses are cached per API process and kept current from relayed progress
+    status_cache_ttl: float = 30.0  # seconds before a cached status (queue position, ETA) is reloaded
+    status_cache_size: int = 10000
+    status_max_wait: float = 60.0  # longest ?wait= a status long-poll may be held
+    queue_plan_ttl: float = 2.0  # seconds a built queue plan answers positions and admission forecasts
+    
+    # Order of pending jobs within a priority: fifo, sjf (shortest predicted job first)
+    # or fair (tenant with the least recent render time per weight first, SJF within it)
+    job_scheduler: str = "fair"
+    job_aging_seconds: float = 600.0  # a job's effective cost halves after waiting this long
+    tenant_weights: Dict[str, float] = {}  # relative share per X-Tenant-Id (default 1)
+    fair_share_window: int = 3600  # seconds of started work counted against a tenant
+    cost_model_history: int = 50  # completed jobs the cost model calibrates against
+    
+    # Identical video requests attach to an in-flight job or reuse a recent result
+    job_coalescing: bool = True
+    job_reuse_ttl: int = 3600  # seconds a completed video is handed out again (0 = only in-flight)
+    
+    # Admission control: new jobs are refused (429 queue full, 503 host overloaded)
+    admission_control: bool = True
+    admission_max_queue: int = 20  # pending jobs
+    admission_max_load: float = 1.5  # one-minute load average per CPU core
+    admission_min_free_memory_mb: int = 512
+    admission_min_free_disk_mb: int = 1024
+    admission_max_running_renders: int = 0  # jobs processing across all workers and hosts (0 = no limit)
+    admission_retry_after: int = 30  # seconds, for 503 responses
+    admission_default_job_seconds: float = 180.0  # cost of a job without a cost model estimate
+    
+    # Storage lifecycle: files unused for longer than their directory's TTL are deleted, then the least
+    # recently used ones while over quota. Files of queued/running jobs and recent writes are kept.
+    storage_lifecycle: bool = True
+    storage_sweep_interval: float = 600.0  # seconds
+    storage_temp_ttl: int = 86400  # seconds since last use, temp_dir scratch (0 = keep)
+    storage_video_ttl: int = 0  # output_dir videos
+    storage_report_ttl: int = 2592000  # analysis_reports
+    storage_cache_ttl: int = 604800  # cache_dir narration clips and scene segments
+    storage_quota_mb: int = 0  # videos, reports, scratch and cached segments together (0 = unlimited)
+    storage_grace_seconds: int = 3600  # files written this recently may belong to a render in progress
+    
+    # Watchdogs: a stage past its deadline fails the job and its ffmpeg/piper children are killed
+    stage_timeout: float = 900.0  # seconds, for stages not listed below
+    stage_timeouts: Dict[str, float] = {
+        "generate_script": 300.0,
+        "create_blueprint": 300.0,
+        "generate_audio": 600.0,
+        "render_video": 1800.0,
+        "create_report": 120.0
+    }
+    subprocess_timeout: float = 600.0  # per ffmpeg/piper invocation
+    job_cancel_poll_interval: float = 2.0  # how often a worker checks for cancel requests
+    
+    # Record/replay stand-ins for offline load tests
+    llm_provider: str = ""  # "record" or "replay" overrides the per-request provider
+    tts_record_provider: str = "gtts"  # live TTS used while tts_provider=record
+    replay_dir: str = "replays"
+    replay_llm_latency: str = "recorded"  # none, recorded, fixed:S, uniform:A,B, normal:M,SD, lognormal:MU,SIGMA
+    replay_tts_latency: str = "recorded"
+    replay_seed: int = 42
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.create_directories()
@@ -113,5 +227,6 @@ class Settings(BaseSettings):
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.temp_dir, exist_ok=True)
         os.makedirs(self.log_dir, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
 
 settings = Settings()
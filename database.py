@@ -1,19 +1,100 @@
 # database.py
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
-from models import Base, VideoJob, StyleProfile
+from models import Base, VideoJob, JobArtifact, JobCheckpoint, StyleProfile
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+logger = logging.getLogger(__name__)
+
+def _sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+def _engine_options(url: str, asynchronous: bool = False) -> dict:
+    if make_url(url).get_backend_name() != "sqlite":
+        return {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_pre_ping": True
+        }
+    if not _sqlite_file(url):
+        # One private database per connection; the default single-connection pool keeps it shared
+        return {"connect_args": {"check_same_thread": False}}
+    # Status polls and workers hold connections concurrently, so keep enough of them open.
+    # timeout: how long a writer waits on another's lock before "database is locked"
+    options = {
+        "connect_args": {"check_same_thread": False, "timeout": settings.db_busy_timeout},
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout
+    }
+    if asynchronous:
+        # aiosqlite would otherwise open a new connection (and thread) per session
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return options
+
+def tune_sqlite(engine):
+    """WAL lets readers run alongside the one writer instead of waiting on the file lock."""
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if settings.sqlite_wal:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                # NORMAL syncs at checkpoints rather than every commit; only a power loss can drop the last commits
+                cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_kb)}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+        finally:
+            cursor.close()
+
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
+if _sqlite_file(settings.database_url):
+    tune_sqlite(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Async driver per backend, for the engine the API routes and job runner await on
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {parsed.get_backend_name()}; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+_async_url = settings.async_database_url or async_database_url(settings.database_url)
+async_engine = create_async_engine(_async_url, **_engine_options(_async_url, asynchronous=True))
+if _sqlite_file(_async_url):
+    tune_sqlite(async_engine.sync_engine)
+
+# Objects stay readable after commit; attributes never loaded need db.refresh() or run_sync
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def init_db():
+    # create_all only creates missing tables; add any new nullable columns to existing ones
+    Base.metadata.create_all(bind=engine)
+    
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+            # Indexes declared on columns that were just added
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -1,19 +1,26 @@
 # main.py
-from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from contextlib import asynccontextmanager
 from datetime import datetime
+import asyncio
 import logging
+import time
 import uvicorn
 import os
 
 from config import settings
+from utils.metrics import HTTP_SECONDS, clear_earlier_samples, render_metrics, scrape_gauge
 from models import HealthResponse, VideoGenerationRequest, VideoJobResponse, ScriptRequest, ScriptResponse
 from api.routes import router
 from api.websocket import manager, websocket_endpoint
 from utils.logger_config import setup_logger
-from database import engine, Base
+from database import init_db
+from api.websocket import relay_progress
+from workflows.executors import shutdown_executors
+from workflows.job_worker import worker_pool
+from workflows.storage import storage_lifecycle
 
 logger = setup_logger('main')
 
@@ -22,7 +29,7 @@ async def lifespan(app: FastAPI):
     logger.info("Starting application")
     
     # Create database tables
-    Base.metadata.create_all(bind=engine)
+    init_db()
     logger.info("Database tables created")
     
     # Verify directories
@@ -30,8 +37,22 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.temp_dir, exist_ok=True)
     logger.info("Directories verified")
     
+    # Samples of an earlier run; this process's own files stay
+    clear_earlier_samples()
+    worker_pool.start()
+    # Keeps polled statuses current; with worker processes, also forwards their progress to WebSocket clients
+    relay = asyncio.create_task(relay_progress(settings.progress_relay_interval, forward=settings.job_workers > 0))
+    sweeper = None
+    if settings.storage_lifecycle:
+        sweeper = asyncio.create_task(storage_lifecycle.run(settings.storage_sweep_interval))
+    
     yield
     
+    relay.cancel()
+    if sweeper:
+        sweeper.cancel()
+    await worker_pool.stop()
+    shutdown_executors()
     logger.info("Shutting down application")
 
 app = FastAPI(
@@ -50,9 +71,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, so job ids do not explode the series
+        route = request.scope.get("route")
+        HTTP_SECONDS.labels(
+            request.method,
+            route.path if route else "unmatched",
+            str(status)
+        ).observe(time.monotonic() - started)
+
 # Include routers
 app.include_router(router, prefix="/api/v1", tags=["video"])
 
+@scrape_gauge("video_websocket_connections", "Open WebSocket connections")
+def websocket_connections() -> int:
+    return len(manager.active_connections)
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = await asyncio.to_thread(render_metrics)
+    return Response(content=body, media_type=content_type)
+
 # WebSocket endpoint
 @app.websocket("/ws/{client_id}")
 async def websocket_route(websocket: WebSocket, client_id: str):
@@ -94,7 +142,8 @@ async def http_exception_handler(request, exc):
     logger.error(f"HTTP error: {exc.detail}")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"error": exc.detail, "status_code": exc.status_code}
+        content={"error": exc.detail, "status_code": exc.status_code},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
@@ -39,6 +39,7 @@ class VideoStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 # Request Models
 
@@ -75,6 +76,8 @@ class VideoGenerationRequest(BaseModel):
     llm_provider: LLMProvider = LLMProvider.MISTRAL
     include_voiceover: bool = True
     video_duration: Optional[int] = Field(120, ge=30, le=600, description="Duration in seconds")
+    use_cache: bool = Field(True, description="Reuse cached LLM responses for identical inputs")
+    priority: int = Field(0, ge=0, le=10, description="Higher priority jobs are picked up first")
     
     class Config:
         json_schema_extra = {
@@ -98,6 +101,17 @@ class ScriptRequest(BaseModel):
     style: StyleType
     duration: int = Field(120, ge=30, le=600)
     llm_provider: LLMProvider = LLMProvider.MISTRAL
+    use_cache: bool = True
+
+class SceneStyle(BaseModel):
+    bg_color: Optional[str] = Field(None, pattern=r"^#[0-9a-fA-F]{6}$", description="Background color, e.g. #0a0a1e")
+    text_color: Optional[str] = None
+    font_size: Optional[int] = Field(None, ge=10, le=200)
+
+class ScenePatchRequest(BaseModel):
+    narration_text: Optional[str] = Field(None, min_length=1)
+    duration: Optional[int] = Field(None, ge=1, le=120)
+    style: Optional[SceneStyle] = None
 
 # Response Models
 
@@ -177,6 +191,10 @@ class VideoJobResponse(BaseModel):
     created_at: datetime = Field(default_factory=datetime.now)
     completed_at: Optional[datetime] = None
     error: Optional[str] = None
+    queue_position: Optional[int] = None  # 1 = next to be picked up; only set while pending
+    estimated_seconds: Optional[float] = None  # predicted run time once a worker has it
+    eta_seconds: Optional[float] = None  # predicted time until the video is ready; pending or processing only
+    resource_usage: Optional[Dict[str, Any]] = None
 
 class HealthResponse(BaseModel):
     status: str
@@ -205,7 +223,8 @@ class WSError(BaseModel):
 
 # Database Models (SQLAlchemy)
 
-from sqlalchemy import Column, String, Integer, DateTime, Text, Enum as SQLEnum, Float
+from sqlalchemy import Column, String, Integer, DateTime, Text, Enum as SQLEnum, Float, ForeignKey, UniqueConstraint, Boolean, Index, LargeBinary
+from sqlalchemy.orm import deferred
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -213,6 +232,13 @@ Base = declarative_base()
 
 class VideoJob(Base):
     __tablename__ = "video_jobs"
+    __table_args__ = (
+        # Keyset pages of /video/jobs, with and without a status filter
+        Index("ix_video_jobs_status_created", "status", "created_at", "id"),
+        Index("ix_video_jobs_created", "created_at", "id"),
+        # Pending/claimable scans of the scheduler
+        Index("ix_video_jobs_status_priority_queued", "status", "priority", "queued_at"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     topic = Column(String(200), nullable=False)
@@ -221,20 +247,62 @@ class VideoJob(Base):
     progress = Column(Integer, default=0)
     message = Column(Text, default="")
     
-    script_data = Column(Text, nullable=True)
-    blueprint_data = Column(Text, nullable=True)
+    # Legacy JSON of jobs finished before job_artifacts; deferred so row loads skip them
+    script_data = deferred(Column(Text, nullable=True))
+    blueprint_data = deferred(Column(Text, nullable=True))
     
     video_path = Column(String(500), nullable=True)
     report_url = Column(String(500), nullable=True)
     
     llm_provider = Column(String(20), default="mistral")
     
+    # Job queue; the scheduler scans many rows but only a claimed job needs its request
+    request_data = deferred(Column(Text, nullable=True))  # JSON of the VideoGenerationRequest
+    request_hash = Column(String(64), nullable=True, index=True)  # identical requests share a job
+    idempotency_key = Column(String(200), nullable=True, unique=True, index=True)
+    priority = Column(Integer, default=0)
+    tenant = Column(String(100), default="default", index=True)  # fair-share scheduling unit
+    estimated_seconds = Column(Float, nullable=True)  # cost model prediction at enqueue time
+    queued_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)  # last claim by a worker
+    resume = Column(Boolean, default=False)
+    cancel_requested = Column(Boolean, default=False)
+    resource_usage = deferred(Column(Text, nullable=True))  # deferred JSON: per-stage wall/CPU/RSS/bytes, LLM tokens, TTS characters
+    attempts = Column(Integer, default=0)
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
     error = Column(Text, nullable=True)
 
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+    __table_args__ = (UniqueConstraint("job_id", "stage", name="uq_job_checkpoint_stage"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey("video_jobs.id"), nullable=False, index=True)
+    stage = Column(String(50), nullable=False)
+    data = Column(Text, nullable=False)  # JSON of the state keys the stage produced
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class JobArtifact(Base):
+    __tablename__ = "job_artifacts"
+    __table_args__ = (UniqueConstraint("job_id", "kind", name="uq_job_artifact_kind"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey("video_jobs.id"), nullable=False, index=True)
+    kind = Column(String(50), nullable=False)  # script, blueprint
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON
+    size = Column(Integer, nullable=True)  # compressed bytes
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
 class StyleProfile(Base):
     __tablename__ = "style_profiles"
     
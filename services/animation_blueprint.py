@@ -1,36 +1,70 @@
 # services/animation_blueprint.py
+import asyncio
 import logging
 import json
+import time
+from typing import List, Optional
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from config import settings
+from services.llm_cache import llm_cache
+from services.llm_hedging import hedged_call
+from services.llm_instrumentation import InstrumentedLLM
+from services.structured_output import RepairingJsonOutputParser, StructuredOutput, BLUEPRINT_SCHEMA
 
 logger = logging.getLogger(__name__)
 
+# Left over when the stage budget runs out, to fall back to the basic blueprint before the watchdog fires
+BUDGET_MARGIN = 5.0
+
+def _budget_left(ends_at: Optional[float]) -> float:
+    if ends_at is None:
+        return float("inf")
+    return ends_at - time.monotonic() - BUDGET_MARGIN
+
+def _ends_at(budget: Optional[float]) -> Optional[float]:
+    return time.monotonic() + budget if budget else None
+
 class AnimationBlueprint:
+    # Bump whenever the prompt below changes so cached blueprints are not reused
+    PROMPT_VERSION = "blueprint-v2"
+    
     def __init__(self, llm_provider: str = "mistral"):
         self.llm_provider = llm_provider
+        self.temperature = 0.6
         
         # Initialize LLM
-        if llm_provider == "mistral":
+        if settings.llm_provider == "replay":
+            from services.replay_providers import ReplayLLM
+            self.model_name = "replay"
+            self.llm = ReplayLLM()
+            logger.info("Replaying recorded LLM responses for blueprint")
+        elif llm_provider == "mistral":
             from langchain_mistralai import ChatMistralAI
+            self.model_name = "mistral-large-latest"
             self.llm = ChatMistralAI(
-                model="mistral-large-latest",
-                temperature=0.6,
+                model=self.model_name,
+                temperature=self.temperature,
                 api_key=settings.mistral_api_key
             )
             logger.info("Using Mistral AI API for blueprint")
         elif llm_provider == "phi3":
             from langchain_community.llms import Ollama
+            self.model_name = "phi3:mini"
             self.llm = Ollama(
-                model="phi3:mini",
+                model=self.model_name,
                 base_url=settings.ollama_base_url,
-                temperature=0.6
+                temperature=self.temperature
             )
             logger.info("Using Phi-3 Mini via LOCAL Ollama for blueprint")
         else:
             raise ValueError(f"Unsupported LLM provider: {llm_provider}")
         
+        if settings.llm_provider == "record":
+            from services.replay_providers import RecordingLLM
+            self.llm = RecordingLLM(self.llm)
+        
+        self.llm = InstrumentedLLM(self.llm, self.model_name)
+        
         # Create LCEL chain
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", "You are an expert animation director. Generate animation blueprints in valid JSON format only."),
@@ -49,31 +83,36 @@ Generate:
 
 Return valid JSON with this structure:
 {{
-  "storyboard": [...],
-  "elements": [...],
-  "animation_instructions": [...],
-  "timing": [...],
-  "transitions": [...],
-  "asset_prompts": [...]
+  "storyboard": [{{"scene": 1, "description": "...", "composition": "...", "visual_elements": ["..."], "text_overlays": ["..."], "animation_movement": "..."}}],
+  "elements": [{{"name": "...", "element_type": "...", "description": "...", "color": "...", "size": "..."}}],
+  "animation_instructions": [{{"scene": 1, "entry_animation": "...", "main_animation": "...", "exit_animation": "...", "duration": 5.0}}],
+  "timing": [{{"scene": 1, "start": 0.0, "end": 15.0, "duration": 15.0}}],
+  "transitions": [{{"from_scene": 1, "to_scene": 2, "transition_type": "...", "duration": 0.5}}],
+  "asset_prompts": [{{"element_name": "...", "prompt": "...", "asset_type": "..."}}]
 }}
 
 Return only valid JSON, no other text.""")
         ])
         
-        self.chain = self.prompt | self.llm | JsonOutputParser()
+        self.chain = self.prompt | self.llm | RepairingJsonOutputParser()
+        
+        # Schema validation; only invalid or missing fragments are re-requested
+        self.structured = StructuredOutput(self.llm, BLUEPRINT_SCHEMA, "animation blueprint")
     
-    def create_blueprint(self, script_data: dict, style_data: dict) -> dict:
+    def create_blueprint(self, script_data: dict, style_data: dict, use_cache: bool = True) -> dict:
+        # Blocking entry point for scripts and tests; not for use inside a running event loop
+        return asyncio.run(self.acreate_blueprint(script_data, style_data, use_cache))
+    
+    async def acreate_blueprint(self, script_data: dict, style_data: dict, use_cache: bool = True,
+                                budget: float = None) -> dict:
+        # budget: seconds the caller's stage allows; calls and the fallback must all fit in it
+        scenes = script_data.get('scenes', [])
+        ends_at = _ends_at(budget)
+        
         try:
             logger.info(f"Creating animation blueprint using {self.llm_provider}")
             
-            scenes = script_data.get('scenes', [])
-            
-            # Invoke LCEL chain
-            blueprint = self.chain.invoke({
-                "scenes": json.dumps(scenes, indent=2),
-                "style": style_data.get('style'),
-                "colors": style_data.get('colors')
-            })
+            blueprint = await self._ablueprint(scenes, style_data, use_cache, ends_at)
             
             logger.info("Blueprint created successfully")
             return blueprint
@@ -81,21 +120,185 @@ Return only valid JSON, no other text.""")
         except Exception as e:
             logger.error(f"Blueprint creation failed with {self.llm_provider}: {str(e)}", exc_info=True)
             
-            # Fallback to Phi-3
-            if self.llm_provider == "mistral":
+            # Fallback to Phi-3 (a hedged call has already raced it)
+            if self.llm_provider == "mistral" and not settings.llm_hedge_enabled and _budget_left(ends_at) > 0:
                 logger.info("Attempting fallback to Phi-3 (local Ollama) for blueprint...")
                 try:
-                    fallback_gen = AnimationBlueprint("phi3")
-                    return fallback_gen.create_blueprint(script_data, style_data)
+                    from services.service_registry import registry
+                    fallback_gen = registry.animation_blueprint("phi3")
+                    return await fallback_gen.acreate_blueprint(
+                        script_data, style_data, use_cache, ends_at and ends_at - time.monotonic()
+                    )
                 except Exception as fallback_error:
                     logger.error(f"Phi-3 fallback also failed: {str(fallback_error)}")
             
-            # Basic fallback structure
-            return {
-                "storyboard": [{"scene": i+1, "description": s.get('concept', '')} for i, s in enumerate(scenes)],
-                "elements": [],
-                "animation_instructions": [],
-                "timing": [],
-                "transitions": [],
-                "asset_prompts": []
-            }
+            logger.warning("Every blueprint attempt failed, rendering from a degraded basic blueprint")
+            return self._basic_blueprint(scenes)
+    
+    async def acreate_blueprint_batched(self, script_data: dict, style_data: dict, use_cache: bool = True,
+                                        budget: float = None) -> dict:
+        # One small request per scene (or batch of scenes) instead of one huge prompt
+        scenes = script_data.get('scenes', [])
+        ends_at = _ends_at(budget)
+        batch_size = max(1, settings.blueprint_batch_size)
+        batches = [scenes[i:i + batch_size] for i in range(0, len(scenes), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, settings.blueprint_concurrency))
+        
+        logger.info(f"Creating blueprint in {len(batches)} batches using {self.llm_provider}")
+        
+        async def run(batch: list) -> dict:
+            async with semaphore:
+                return await self._ablueprint_batch(batch, style_data, use_cache, ends_at)
+        
+        parts = await asyncio.gather(*(run(batch) for batch in batches))
+        blueprint = merge_blueprints(parts, batches, style_data)
+        
+        degraded = sum(1 for part in parts if part.get('degraded'))
+        if degraded:
+            logger.warning(f"{degraded} of {len(batches)} blueprint batches fell back to a degraded basic blueprint")
+        else:
+            logger.info("Batched blueprint created successfully")
+        return blueprint
+    
+    async def _ablueprint_batch(self, scenes: list, style_data: dict, use_cache: bool,
+                                ends_at: Optional[float] = None) -> dict:
+        # Only this batch is retried, and only while the stage budget lasts; the other batches keep their results
+        attempts = settings.blueprint_batch_retries + 1
+        numbers = [s.get('scene_number') for s in scenes]
+        for attempt in range(1, attempts + 1):
+            if _budget_left(ends_at) <= 0:
+                logger.warning(f"Blueprint stage budget used up before batch {numbers} (attempt {attempt}/{attempts})")
+                break
+            try:
+                return await self._ablueprint(scenes, style_data, use_cache, ends_at)
+            except Exception as e:
+                logger.warning(f"Blueprint batch {numbers} failed (attempt {attempt}/{attempts}): {str(e)}")
+        
+        if self.llm_provider == "mistral" and not settings.llm_hedge_enabled and _budget_left(ends_at) > 0:
+            try:
+                from services.service_registry import registry
+                return await registry.animation_blueprint("phi3")._ablueprint_batch(scenes, style_data, use_cache, ends_at)
+            except Exception as fallback_error:
+                logger.error(f"Phi-3 fallback also failed: {str(fallback_error)}")
+        
+        return self._basic_blueprint(scenes)
+    
+    async def _ablueprint(self, scenes: list, style_data: dict, use_cache: bool, ends_at: Optional[float] = None) -> dict:
+        # One cached, hedged and validated request for the whole script or one batch of it
+        inputs = self._inputs(scenes, style_data)
+        cache_key = self._cache_key(inputs) if use_cache and settings.llm_cache_enabled else None
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Blueprint cache hit")
+                return cached
+        
+        # Fragment re-asks count against the same per-call deadline
+        deadline = min(settings.llm_call_deadline, _budget_left(ends_at))
+        if deadline <= 0:
+            raise asyncio.TimeoutError("Blueprint stage budget is used up")
+        async with asyncio.timeout(deadline):
+            blueprint, winner = await self._ainvoke_hedged(inputs, deadline)
+            blueprint = await self.structured.avalidate(blueprint, self._context(scenes, style_data))
+        
+        # A hedged Phi-3 answer must not be cached as a Mistral response
+        if cache_key and winner == "primary":
+            llm_cache.set(cache_key, blueprint)
+        return blueprint
+    
+    async def _ainvoke_hedged(self, inputs: dict, deadline: float = None):
+        secondary = None
+        if self.llm_provider == "mistral" and settings.llm_hedge_enabled:
+            try:
+                from services.service_registry import registry
+                backup = registry.animation_blueprint("phi3")
+                secondary = lambda: backup.chain.ainvoke(inputs)
+            except Exception as e:
+                logger.warning(f"Phi-3 hedge unavailable: {str(e)}")
+        
+        return await hedged_call(
+            f"blueprint:{self.llm_provider}",
+            lambda: self.chain.ainvoke(inputs),
+            secondary,
+            deadline
+        )
+    
+    def _inputs(self, scenes: list, style_data: dict) -> dict:
+        return {
+            "scenes": json.dumps(scenes, indent=2),
+            "style": style_data.get('style'),
+            "colors": style_data.get('colors')
+        }
+    
+    def _context(self, scenes: list, style_data: dict) -> str:
+        outline = "; ".join(f"scene {s.get('scene_number')}: {s.get('concept', '')}" for s in scenes)
+        return f"a {style_data.get('style')} video ({outline})"
+    
+    def _cache_key(self, inputs: dict) -> str:
+        return llm_cache.make_key(
+            "blueprint", self.llm_provider, self.model_name, self.temperature,
+            self.PROMPT_VERSION, inputs
+        )
+    
+    def _basic_blueprint(self, scenes: list) -> dict:
+        # Basic fallback structure; "degraded" tells downstream stages no model produced it
+        return {
+            "degraded": True,
+            "storyboard": [{"scene": s.get('scene_number', i+1), "description": s.get('concept', '')} for i, s in enumerate(scenes)],
+            "elements": [],
+            "animation_instructions": [],
+            "timing": [],
+            "transitions": [],
+            "asset_prompts": []
+        }
+
+BLUEPRINT_SECTIONS = ["storyboard", "elements", "animation_instructions", "timing", "transitions", "asset_prompts"]
+
+def merge_blueprints(parts: List[dict], batches: List[list], style_data: dict) -> dict:
+    # Stitch per-batch blueprints back into a single BlueprintResponse-shaped dict
+    merged = {section: [] for section in BLUEPRINT_SECTIONS}
+    seen_elements = set()
+    seen_assets = set()
+    offset = 0.0
+    
+    for part, batch in zip(parts, batches):
+        for section in BLUEPRINT_SECTIONS:
+            for item in part.get(section) or []:
+                if not isinstance(item, dict):
+                    continue
+                
+                if section == "elements":
+                    if item.get('name') in seen_elements:
+                        continue
+                    seen_elements.add(item.get('name'))
+                elif section == "asset_prompts":
+                    if item.get('element_name') in seen_assets:
+                        continue
+                    seen_assets.add(item.get('element_name'))
+                elif section == "timing":
+                    # Each batch times its scenes from zero; shift onto the full timeline
+                    item = dict(item)
+                    for field in ("start", "end"):
+                        if isinstance(item.get(field), (int, float)):
+                            item[field] = item[field] + offset
+                
+                merged[section].append(item)
+        
+        offset += sum(s.get('duration', 0) or 0 for s in batch)
+    
+    # Batches cannot see their neighbours, so add any missing boundary transitions
+    scene_numbers = [s.get('scene_number') for batch in batches for s in batch]
+    linked = {(t.get('from_scene'), t.get('to_scene')) for t in merged["transitions"]}
+    for previous, current in zip(scene_numbers, scene_numbers[1:]):
+        if (previous, current) not in linked:
+            merged["transitions"].append({
+                "from_scene": previous,
+                "to_scene": current,
+                "transition_type": style_data.get('transitions') or "fade",
+                "duration": 0.5
+            })
+    
+    merged["transitions"].sort(key=lambda t: (t.get('from_scene') or 0, t.get('to_scene') or 0))
+    if any(part.get('degraded') for part in parts):
+        merged["degraded"] = True
+    return merged
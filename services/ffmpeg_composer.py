@@ -2,6 +2,8 @@
 import logging
 import subprocess
 from pathlib import Path
+from config import settings
+from utils.subprocesses import run_process
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +24,7 @@ class FFmpegComposer:
                 output_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_process(cmd, timeout=settings.subprocess_timeout)
             
             if result.returncode == 0:
                 logger.info(f"Audio added: {output_path}")
@@ -34,6 +36,9 @@ class FFmpegComposer:
         except FileNotFoundError:
             logger.warning("FFmpeg not found, skipping audio merge")
             return video_path
+        except subprocess.TimeoutExpired:
+            logger.error(f"Audio merge timed out after {settings.subprocess_timeout}s, keeping silent video")
+            return video_path
         except Exception as e:
             logger.error(f"Audio merge failed: {str(e)}")
             return video_path
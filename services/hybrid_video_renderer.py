@@ -1,22 +1,34 @@
 # services/hybrid_video_renderer.py
 
 import logging
+import uuid
+from datetime import datetime
 from pathlib import Path
-import subprocess
 from services.lottie_renderer import LottieRenderer
 from services.video_renderer import VideoRenderer
 from config import settings
+from utils.subprocesses import run_process
 
 logger = logging.getLogger(__name__)
 
+def _safe_topic(topic: str) -> str:
+    return "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+
+def _unique_name() -> str:
+    # For renders outside a job; a timestamp alone collides between concurrent renders
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
 class HybridVideoRenderer:
     def __init__(self):
         self.lottie = LottieRenderer()
         self.moviepy = VideoRenderer()
-        self.temp_dir = Path("temp_files/hybrid")
+        self.temp_dir = Path(settings.temp_dir) / "hybrid"
         self.temp_dir.mkdir(parents=True, exist_ok=True)
     
-    def render(self, blueprint: dict, script_data: dict, audio_path: str = None) -> str:
+    def render(self, blueprint: dict, script_data: dict, audio_path: str = None, job_id: str = None) -> str:
+        # Every intermediate and output is named after the job: workers render jobs concurrently
+        name = job_id or _unique_name()
+        final_path = str(Path(settings.output_dir) / f"hybrid_{_safe_topic(script_data.get('topic', 'video'))}_{name}.mp4")
 
         try:
             logger.info("Starting hybrid video rendering")
@@ -25,7 +37,7 @@ class HybridVideoRenderer:
             self.lottie.create_placeholder_animations()
             
             # 1. Render Lottie intro
-            intro_path = str(self.temp_dir / "intro.mp4")
+            intro_path = str(self.temp_dir / f"intro_{name}.mp4")
             logger.info("Rendering Lottie intro...")
             self.lottie.render_to_video(
                 self.lottie.get_default_intro(),
@@ -34,17 +46,14 @@ class HybridVideoRenderer:
             )
             
             # 2. Render MoviePy content
-            content_path = str(self.temp_dir / "content.mp4")
             logger.info("Rendering MoviePy content...")
-            self.moviepy.render(blueprint, script_data, None)  # No audio yet
-            
-            # Rename to content_path
-            import shutil
-            latest_video = sorted(Path(settings.output_dir).glob("*.mp4"))[-1]
-            shutil.copy(latest_video, content_path)
+            content_path = self.moviepy.render(
+                blueprint, script_data, None,  # No audio yet
+                output_path=str(self.temp_dir / f"content_{name}.mp4")
+            )
             
             # 3. Render Lottie outro
-            outro_path = str(self.temp_dir / "outro.mp4")
+            outro_path = str(self.temp_dir / f"outro_{name}.mp4")
             logger.info("Rendering Lottie outro...")
             self.lottie.render_to_video(
                 self.lottie.get_default_outro(),
@@ -53,15 +62,13 @@ class HybridVideoRenderer:
             )
             
             # 4. Concatenate all parts
-            final_path = str(Path(settings.output_dir) / f"hybrid_video_{Path(content_path).stem}.mp4")
-            self._concatenate_videos([intro_path, content_path, outro_path], final_path)
+            joined_path = str(self.temp_dir / f"joined_{name}.mp4") if audio_path else final_path
+            self._concatenate_videos([intro_path, content_path, outro_path], joined_path, name)
             
             # 5. Add audio if provided
             if audio_path:
                 logger.info("Adding audio to hybrid video...")
-                final_with_audio = str(Path(settings.output_dir) / f"hybrid_final_{Path(content_path).stem}.mp4")
-                self._add_audio(final_path, audio_path, final_with_audio)
-                return final_with_audio
+                self._add_audio(joined_path, audio_path, final_path)
             
             logger.info(f"Hybrid video rendered: {final_path}")
             return final_path
@@ -70,12 +77,47 @@ class HybridVideoRenderer:
             logger.error(f"Hybrid rendering failed: {e}", exc_info=True)
             # Fallback to pure MoviePy
             logger.warning("Falling back to MoviePy-only rendering")
-            return self.moviepy.render(blueprint, script_data, audio_path)
+            return self.moviepy.render(blueprint, script_data, audio_path, output_path=final_path)
+    
+    def render_segments(self, segment_paths: list, topic: str = "video", job_id: str = None) -> str:
+        # Joins pre-rendered scene segments (video + narration) by stream copy, no re-encode
+        name = job_id or _unique_name()
+        final_path = str(Path(settings.output_dir) / f"hybrid_{_safe_topic(topic)}_{name}.mp4")
+        
+        try:
+            logger.info(f"Assembling {len(segment_paths)} segments with Lottie intro/outro")
+            
+            self.lottie.create_placeholder_animations()
+            
+            # Match the segment format so the concat demuxer can copy streams
+            segment_format = dict(
+                duration=3.0,
+                width=self.moviepy.width,
+                height=self.moviepy.height,
+                fps=self.moviepy.fps,
+                silent_audio=True
+            )
+            intro_path = str(self.temp_dir / f"intro_{name}.mp4")
+            outro_path = str(self.temp_dir / f"outro_{name}.mp4")
+            # Re-assembling an edited job reuses its intro/outro
+            if not Path(intro_path).exists():
+                self.lottie.render_to_video(self.lottie.get_default_intro(), intro_path, **segment_format)
+            if not Path(outro_path).exists():
+                self.lottie.render_to_video(self.lottie.get_default_outro(), outro_path, **segment_format)
+            
+            self._concatenate_videos([intro_path, *segment_paths, outro_path], final_path, name)
+            
+        except Exception as e:
+            logger.warning(f"Intro/outro assembly failed, joining segments only: {e}")
+            self._concatenate_videos(segment_paths, final_path, name)
+        
+        logger.info(f"Segmented video assembled: {final_path}")
+        return final_path
     
-    def _concatenate_videos(self, video_paths: list, output_path: str):
+    def _concatenate_videos(self, video_paths: list, output_path: str, name: str = None):
        
         # Create concat file
-        concat_file = self.temp_dir / "concat_list.txt"
+        concat_file = self.temp_dir / f"concat_list_{name or _unique_name()}.txt"
         with open(concat_file, 'w') as f:
             for video in video_paths:
                 f.write(f"file '{Path(video).absolute()}'\n")
@@ -89,7 +131,7 @@ class HybridVideoRenderer:
             output_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_process(cmd, timeout=settings.subprocess_timeout)
         if result.returncode != 0:
             logger.error(f"Concatenation failed: {result.stderr}")
             raise RuntimeError("Video concatenation failed")
@@ -109,7 +151,7 @@ class HybridVideoRenderer:
             output_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_process(cmd, timeout=settings.subprocess_timeout)
         if result.returncode != 0:
             logger.error(f"Audio addition failed: {result.stderr}")
             raise RuntimeError("Audio addition failed")
@@ -0,0 +1,166 @@
+# services/llm_cache.py
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from config import settings
+from utils.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    def __init__(self, path: str = None, ttl: int = None, max_bytes: int = None):
+        self.path = Path(path or Path(settings.cache_dir) / "llm_cache.db")
+        self.ttl = ttl if ttl is not None else settings.llm_cache_ttl
+        self.max_bytes = max_bytes if max_bytes is not None else settings.llm_cache_max_bytes
+
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed ON llm_responses (accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(namespace: str, provider: str, model: str, temperature: float,
+                 template_version: str, inputs: dict) -> str:
+        material = json.dumps({
+            "namespace": namespace,
+            "provider": provider,
+            "model": model,
+            "temperature": temperature,
+            "template_version": template_version,
+            "inputs": inputs
+        }, sort_keys=True, default=str)
+        return f"{namespace}:{hashlib.sha256(material.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Any]:
+        namespace = key.split(':', 1)[0]
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                now = time.time()
+                if row and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    conn.commit()
+                    row = None
+
+                if row is None:
+                    self._record(namespace, hit=False)
+                    return None
+
+                conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self._record(namespace, hit=True)
+
+            return json.loads(row[0])
+
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Any):
+        namespace = key.split(':', 1)[0]
+
+        try:
+            payload = json.dumps(value, default=str)
+            now = time.time()
+
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses "
+                    "(key, namespace, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, namespace, payload, len(payload), now, now)
+                )
+                self._evict(conn, now)
+                conn.commit()
+
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until we are back under the size budget
+        for key, size in conn.execute(
+            "SELECT key, size FROM llm_responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            total -= size
+            logger.debug(f"LLM cache evicted {key}")
+
+    def _record(self, namespace: str, hit: bool):
+        counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+        CACHE_LOOKUPS.labels(namespace, "hit" if hit else "miss").inc()
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = {
+                name: {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / max(1, counters["hits"] + counters["misses"]), 4)
+                }
+                for name, counters in self._stats.items()
+            }
+            hits = sum(c["hits"] for c in self._stats.values())
+            misses = sum(c["misses"] for c in self._stats.values())
+
+            try:
+                entries, size = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+                ).fetchone()
+            except Exception:
+                entries, size = 0, 0
+
+        return {
+            "enabled": settings.llm_cache_enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / max(1, hits + misses), 4),
+            "entries": entries,
+            "size_bytes": size,
+            "namespaces": namespaces
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_responses")
+            conn.commit()
+            self._stats.clear()
+
+llm_cache = LLMResponseCache()
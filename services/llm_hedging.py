@@ -0,0 +1,102 @@
+# services/llm_hedging.py
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < settings.llm_hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct * (len(samples) - 1))))
+        return samples[index]
+
+    def hedge_delay(self, key: str) -> float:
+        # Fire the backup once the primary is slower than it usually is
+        observed = self.percentile(key, settings.llm_hedge_percentile)
+        delay = observed if observed is not None else settings.llm_hedge_default_delay
+        return max(settings.llm_hedge_min_delay, delay)
+
+latency_tracker = LatencyTracker()
+
+async def hedged_call(
+    key: str,
+    primary: Callable[[], Awaitable[Any]],
+    secondary: Optional[Callable[[], Awaitable[Any]]] = None,
+    deadline: float = None
+) -> Tuple[Any, str]:
+    """Run primary, racing secondary against it if primary is slow or fails.
+
+    Returns (result, "primary" | "secondary"). The losing call is cancelled and
+    the whole race is bounded by ``deadline`` seconds.
+    """
+    deadline = deadline or settings.llm_call_deadline
+    hedge_delay = latency_tracker.hedge_delay(key)
+    started = time.monotonic()
+
+    async def timed(label: str, factory: Callable[[], Awaitable[Any]]):
+        call_started = time.monotonic()
+        result = await factory()
+        if label == "primary":
+            latency_tracker.record(key, time.monotonic() - call_started)
+        return label, result
+
+    labels = {asyncio.create_task(timed("primary", primary)): "primary"}
+    hedged = secondary is None
+    last_error = None
+
+    def start_secondary(reason: str):
+        nonlocal hedged
+        hedged = True
+        logger.info(f"Hedging {key}: {reason}, firing secondary")
+        labels[asyncio.create_task(timed("secondary", secondary))] = "secondary"
+
+    try:
+        while labels:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"{key} exceeded its {deadline:.0f}s deadline")
+
+            wait_for = remaining if hedged else min(remaining, max(0.0, hedge_delay - (time.monotonic() - started)))
+            done, _ = await asyncio.wait(list(labels), timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if not hedged:
+                    start_secondary(f"no response after {hedge_delay:.1f}s")
+                continue
+
+            for task in done:
+                label = labels.pop(task)
+                if task.exception() is None:
+                    _, result = task.result()
+                    if label == "secondary":
+                        logger.info(f"Secondary won the hedge for {key}")
+                    return result, label
+
+                last_error = task.exception()
+                logger.warning(f"{label.capitalize()} call for {key} failed: {str(last_error)}")
+                if label == "primary" and not hedged:
+                    start_secondary("primary failed")
+
+        raise last_error or RuntimeError(f"All calls for {key} failed")
+
+    finally:
+        # Cancel whichever call lost (or everything, on deadline/error)
+        for task in labels:
+            task.cancel()
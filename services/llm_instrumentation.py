@@ -0,0 +1,77 @@
+# services/llm_instrumentation.py
+import time
+from typing import Any, AsyncIterator, Iterator
+from langchain_core.runnables import Runnable
+from utils.metrics import PROVIDER_SECONDS, outcome_of
+from utils.llm_text import output_text, prompt_text
+from utils.resource_usage import estimate_tokens, record_llm
+
+def _reported_usage(output: Any) -> dict:
+    metadata = getattr(output, "response_metadata", None) or {}
+    return metadata.get("token_usage") or metadata.get("usage") or {}
+
+class InstrumentedLLM(Runnable):
+    """Times every call of the wrapped model (streamed calls until their last chunk)
+    and charges its tokens to the job the call is made for."""
+
+    def __init__(self, inner: Runnable, provider: str):
+        self.inner = inner
+        self.provider = provider
+
+    def _observe(self, started: float, outcome: str):
+        PROVIDER_SECONDS.labels("llm", self.provider, outcome).observe(time.monotonic() - started)
+
+    def _count(self, input: Any, output: Any, text: str = None):
+        reported = _reported_usage(output)
+        record_llm(
+            reported.get("prompt_tokens") or estimate_tokens(prompt_text(input)),
+            reported.get("completion_tokens") or estimate_tokens(text if text is not None else output_text(output))
+        )
+
+    def invoke(self, input: Any, config=None, **kwargs) -> Any:
+        started = time.monotonic()
+        try:
+            output = self.inner.invoke(input, config, **kwargs)
+        except BaseException as e:
+            self._observe(started, outcome_of(e))
+            raise
+        self._observe(started, "ok")
+        self._count(input, output)
+        return output
+
+    async def ainvoke(self, input: Any, config=None, **kwargs) -> Any:
+        started = time.monotonic()
+        try:
+            output = await self.inner.ainvoke(input, config, **kwargs)
+        except BaseException as e:
+            self._observe(started, outcome_of(e))
+            raise
+        self._observe(started, "ok")
+        self._count(input, output)
+        return output
+
+    def stream(self, input: Any, config=None, **kwargs) -> Iterator[Any]:
+        started = time.monotonic()
+        parts = []
+        try:
+            for chunk in self.inner.stream(input, config, **kwargs):
+                parts.append(output_text(chunk))
+                yield chunk
+        except BaseException as e:
+            self._observe(started, outcome_of(e))
+            raise
+        self._observe(started, "ok")
+        self._count(input, None, "".join(parts))
+
+    async def astream(self, input: Any, config=None, **kwargs) -> AsyncIterator[Any]:
+        started = time.monotonic()
+        parts = []
+        try:
+            async for chunk in self.inner.astream(input, config, **kwargs):
+                parts.append(output_text(chunk))
+                yield chunk
+        except BaseException as e:
+            self._observe(started, outcome_of(e))
+            raise
+        self._observe(started, "ok")
+        self._count(input, None, "".join(parts))
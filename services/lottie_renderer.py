@@ -4,11 +4,14 @@ Lottie animation renderer for creating professional intro/outro/transition anima
 """
 import logging
 import json
+import os
+import uuid
 from pathlib import Path
 from typing import Optional
 from PIL import Image
 import subprocess
 from config import settings
+from utils.subprocesses import run_process
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +28,8 @@ class LottieRenderer:
                         duration: float = 3.0,
                         width: int = 1920,
                         height: int = 1080,
-                        fps: int = 30) -> str:
+                        fps: int = 30,
+                        silent_audio: bool = False) -> str:
         """
         Render Lottie JSON animation to MP4 video
         
@@ -36,6 +40,7 @@ class LottieRenderer:
             width: Video width
             height: Video height
             fps: Frames per second
+            silent_audio: Add a silent AAC track (needed to join with voiced segments)
         
         Returns:
             Path to rendered video
@@ -44,7 +49,7 @@ class LottieRenderer:
             logger.info(f"Rendering Lottie animation: {lottie_json_path}")
             
             # Generate frames for animation
-            frames_dir = self.output_dir / f"frames_{Path(lottie_json_path).stem}"
+            frames_dir = self.output_dir / f"frames_{Path(lottie_json_path).stem}_{Path(output_video_path).stem}"
             frames_dir.mkdir(exist_ok=True)
             
             total_frames = int(duration * fps)
@@ -70,14 +75,25 @@ class LottieRenderer:
             ffmpeg_cmd = [
                 settings.ffmpeg_path, "-y",
                 "-framerate", str(fps),
-                "-i", str(frames_dir / "frame_%04d.png"),
+                "-i", str(frames_dir / "frame_%04d.png")
+            ]
+            
+            if silent_audio:
+                ffmpeg_cmd += [
+                    "-f", "lavfi",
+                    "-i", "anullsrc=channel_layout=stereo:sample_rate=44100",
+                    "-c:a", "aac",
+                    "-shortest"
+                ]
+            
+            ffmpeg_cmd += [
                 "-c:v", "libx264",
                 "-pix_fmt", "yuv420p",
                 "-preset", "fast",
                 output_video_path
             ]
             
-            result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=30)
+            result = run_process(ffmpeg_cmd, timeout=30)
             
             if result.returncode != 0:
                 logger.error(f"FFmpeg error: {result.stderr}")
@@ -117,13 +133,13 @@ class LottieRenderer:
             "layers": []
         }
         
-        intro_path = self.animations_dir / "intro.json"
-        outro_path = self.animations_dir / "outro.json"
-        
-        with open(intro_path, 'w') as f:
-            json.dump(placeholder, f)
-        
-        with open(outro_path, 'w') as f:
-            json.dump(placeholder, f)
+        for path in (self.animations_dir / "intro.json", self.animations_dir / "outro.json"):
+            if path.exists():
+                continue
+            # Concurrent renders may be reading it: publish the whole file at once
+            partial = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            with open(partial, 'w') as f:
+                json.dump(placeholder, f)
+            os.replace(partial, path)
         
         logger.info("Initialized default Lottie animations")
@@ -0,0 +1,210 @@
+# services/replay_providers.py
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import shutil
+import threading
+import time
+import uuid
+import wave
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional
+from langchain_core.runnables import Runnable
+from config import settings
+from utils.llm_text import output_text, prompt_text
+
+logger = logging.getLogger(__name__)
+
+class LatencyModel:
+    """Synthetic latency drawn from a spec such as ``uniform:0.5,2``.
+
+    Supported specs: ``none``, ``recorded`` (the latency stored with each
+    recording), ``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,STDDEV`` and
+    ``lognormal:MU,SIGMA``. Draws come from a seeded generator so runs repeat.
+    """
+
+    def __init__(self, spec: str, seed: int = None):
+        self.spec = (spec or "none").strip().lower()
+        self.kind, _, params = self.spec.partition(":")
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        self._random = random.Random(settings.replay_seed if seed is None else seed)
+        self._lock = threading.Lock()
+
+        expected = {"none": 0, "recorded": 0, "fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid replay latency spec: {spec!r}")
+
+    def sample(self, recorded: float = 0.0) -> float:
+        with self._lock:
+            if self.kind == "recorded":
+                return max(0.0, recorded or 0.0)
+            if self.kind == "fixed":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._random.uniform(*self.params)
+            if self.kind == "normal":
+                return max(0.0, self._random.gauss(*self.params))
+            if self.kind == "lognormal":
+                return self._random.lognormvariate(*self.params)
+            return 0.0
+
+class ReplayStore:
+    """Recordings on disk: one JSON file per key, plus an optional payload file."""
+
+    def __init__(self, kind: str):
+        self.directory = Path(settings.replay_dir) / kind
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return hashlib.sha256("\x00".join(parts).encode('utf-8')).hexdigest()
+
+    def save(self, key: str, record: dict, payload_path: str = None):
+        if payload_path:
+            payload = self.directory / f"{key}{Path(payload_path).suffix}"
+            shutil.copyfile(payload_path, payload)
+            record = {**record, "payload": payload.name}
+
+        # Write then rename so a concurrent replay never sees half a file
+        tmp = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding='utf-8')
+        tmp.replace(self.directory / f"{key}.json")
+
+    def load(self, key: str) -> Optional[dict]:
+        path = self.directory / f"{key}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def payload_path(self, record: dict) -> Optional[Path]:
+        return self.directory / record["payload"] if record.get("payload") else None
+
+class RecordingLLM(Runnable):
+    """Passes calls through to a live model and stores each prompt/response pair."""
+
+    def __init__(self, inner: Runnable):
+        self.inner = inner
+        self.store = ReplayStore("llm")
+
+    def _save(self, prompt: Any, text: str, seconds: float):
+        prompt_string = prompt_text(prompt)
+        self.store.save(ReplayStore.make_key(prompt_string), {
+            "prompt": prompt_string,
+            "output": text,
+            "latency": round(seconds, 3)
+        })
+
+    def invoke(self, input: Any, config=None, **kwargs) -> Any:
+        started = time.monotonic()
+        output = self.inner.invoke(input, config, **kwargs)
+        self._save(input, output_text(output), time.monotonic() - started)
+        return output
+
+    async def ainvoke(self, input: Any, config=None, **kwargs) -> Any:
+        started = time.monotonic()
+        output = await self.inner.ainvoke(input, config, **kwargs)
+        self._save(input, output_text(output), time.monotonic() - started)
+        return output
+
+    def stream(self, input: Any, config=None, **kwargs) -> Iterator[Any]:
+        started = time.monotonic()
+        parts = []
+        for chunk in self.inner.stream(input, config, **kwargs):
+            parts.append(output_text(chunk))
+            yield chunk
+        self._save(input, "".join(parts), time.monotonic() - started)
+
+    async def astream(self, input: Any, config=None, **kwargs) -> AsyncIterator[Any]:
+        started = time.monotonic()
+        parts = []
+        async for chunk in self.inner.astream(input, config, **kwargs):
+            parts.append(output_text(chunk))
+            yield chunk
+        self._save(input, "".join(parts), time.monotonic() - started)
+
+class ReplayLLM(Runnable):
+    """Serves recorded responses by prompt, after a synthetic delay; never touches the network."""
+
+    # Streamed replays arrive in pieces of this many characters
+    CHUNK_CHARS = 64
+
+    def __init__(self, latency: LatencyModel = None):
+        self.store = ReplayStore("llm")
+        self.latency = latency or LatencyModel(settings.replay_llm_latency)
+
+    def _lookup(self, prompt: Any) -> dict:
+        prompt_string = prompt_text(prompt)
+        record = self.store.load(ReplayStore.make_key(prompt_string))
+        if record is None:
+            raise LookupError(f"No recorded LLM response for prompt: {prompt_string[:120]!r}")
+        return record
+
+    def _chunks(self, text: str) -> list:
+        return [text[i:i + self.CHUNK_CHARS] for i in range(0, len(text), self.CHUNK_CHARS)] or [""]
+
+    def invoke(self, input: Any, config=None, **kwargs) -> str:
+        record = self._lookup(input)
+        time.sleep(self.latency.sample(record.get("latency", 0.0)))
+        return record["output"]
+
+    async def ainvoke(self, input: Any, config=None, **kwargs) -> str:
+        record = self._lookup(input)
+        await asyncio.sleep(self.latency.sample(record.get("latency", 0.0)))
+        return record["output"]
+
+    def stream(self, input: Any, config=None, **kwargs) -> Iterator[str]:
+        record = self._lookup(input)
+        chunks = self._chunks(record["output"])
+        delay = self.latency.sample(record.get("latency", 0.0)) / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+
+    async def astream(self, input: Any, config=None, **kwargs) -> AsyncIterator[str]:
+        record = self._lookup(input)
+        chunks = self._chunks(record["output"])
+        delay = self.latency.sample(record.get("latency", 0.0)) / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+class ReplayTTS:
+    """Recorded narration by (language, text); unknown texts get silence of a plausible length."""
+
+    # Speaking rate used to size silence for texts that were never recorded
+    WORDS_PER_SECOND = 2.5
+
+    def __init__(self, latency: LatencyModel = None):
+        self.store = ReplayStore("tts")
+        self.latency = latency or LatencyModel(settings.replay_tts_latency)
+
+    def record(self, text: str, language: str, audio_path: str, seconds: float):
+        if not audio_path or not Path(audio_path).is_file() or Path(audio_path).stat().st_size == 0:
+            return  # placeholder output is not worth replaying
+        self.store.save(ReplayStore.make_key(language, text), {
+            "text": text[:200],
+            "language": language,
+            "latency": round(seconds, 3)
+        }, payload_path=audio_path)
+
+    def replay(self, text: str, language: str, output_dir: Path) -> str:
+        record = self.store.load(ReplayStore.make_key(language, text))
+        time.sleep(self.latency.sample((record or {}).get("latency", 0.0)))
+
+        payload = self.store.payload_path(record) if record else None
+        if payload and payload.exists():
+            audio_path = output_dir / f"replay_{uuid.uuid4().hex[:12]}{payload.suffix}"
+            shutil.copyfile(payload, audio_path)
+            return str(audio_path)
+
+        logger.info("No recorded narration for text, replaying silence")
+        audio_path = output_dir / f"replay_{uuid.uuid4().hex[:12]}.wav"
+        seconds = max(1.0, len(text.split()) / self.WORDS_PER_SECOND)
+        with wave.open(str(audio_path), 'wb') as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(22050)
+            writer.writeframes(b"\x00\x00" * int(22050 * seconds))
+        return str(audio_path)
@@ -1,36 +1,59 @@
 # services/script_generator.py
+import asyncio
 import logging
+from typing import Callable
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from config import settings
+from services.llm_cache import llm_cache
+from services.llm_hedging import hedged_call
+from services.llm_instrumentation import InstrumentedLLM
+from services.structured_output import RepairingJsonOutputParser, StructuredOutput, SCRIPT_SCHEMA
+from utils.json_stream import SceneStreamParser
 
 logger = logging.getLogger(__name__)
 
 class ScriptGenerator:
+    # Bump whenever the prompt below changes so cached scripts are not reused
+    PROMPT_VERSION = "script-v2"
+    
     def __init__(self, llm_provider: str = "mistral"):
         self.llm_provider = llm_provider
+        self.temperature = settings.llm_temperature
         
         # Initialize LLM
-        if llm_provider == "mistral":
+        if settings.llm_provider == "replay":
+            from services.replay_providers import ReplayLLM
+            self.model_name = "replay"
+            self.llm = ReplayLLM()
+            logger.info("Replaying recorded LLM responses")
+        elif llm_provider == "mistral":
             from langchain_mistralai import ChatMistralAI
+            self.model_name = "mistral-large-latest"
             self.llm = ChatMistralAI(
-                model="mistral-large-latest",
-                temperature=settings.llm_temperature,
+                model=self.model_name,
+                temperature=self.temperature,
                 api_key=settings.mistral_api_key
             )
             logger.info("Using Mistral AI API (primary)")
         elif llm_provider == "phi3":
             from langchain_community.llms import Ollama
+            self.model_name = "phi3:mini"
             self.llm = Ollama(
-                model="phi3:mini",
+                model=self.model_name,
                 base_url=settings.ollama_base_url,
-                temperature=settings.llm_temperature
+                temperature=self.temperature
             )
             logger.info("Using Phi-3 Mini via LOCAL Ollama (free fallback)")
         else:
             raise ValueError(f"Unsupported LLM provider: {llm_provider}")
         
+        if settings.llm_provider == "record":
+            from services.replay_providers import RecordingLLM
+            self.llm = RecordingLLM(self.llm)
+        
+        self.llm = InstrumentedLLM(self.llm, self.model_name)
+        
         # Create LCEL chain with structured output
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", "You are a professional video script writer. Generate video scripts in valid JSON format only."),
@@ -62,42 +85,174 @@ Return as JSON with this exact structure:
 Generate valid JSON only, no other text.""")
         ])
         
-        # Build LCEL chain: prompt | llm | parser
-        self.chain = self.prompt | self.llm | JsonOutputParser()
+        # Build LCEL chain: prompt | llm | parser (malformed JSON is repaired locally)
+        self.chain = self.prompt | self.llm | RepairingJsonOutputParser()
+        
+        # Schema validation; only invalid or missing scenes are re-requested
+        self.structured = StructuredOutput(self.llm, SCRIPT_SCHEMA, "video script")
+        
+        # Unparsed chain for token streaming
+        self.stream_chain = self.prompt | self.llm
+    
+    def generate_script(self, topic: str, style: str, duration: int, use_cache: bool = True) -> dict:
+        # Blocking entry point for scripts and tests; not for use inside a running event loop
+        return asyncio.run(self.agenerate_script(topic, style, duration, use_cache))
     
-    def generate_script(self, topic: str, style: str, duration: int) -> dict:
+    async def agenerate_script(self, topic: str, style: str, duration: int, use_cache: bool = True) -> dict:
         try:
             logger.info(f"Generating script for: {topic} using {self.llm_provider}")
             
-            # Invoke LCEL chain
-            script_data = self.chain.invoke({
-                "topic": topic,
-                "style": style,
-                "duration": duration
-            })
+            cache_key = self._cache_key(topic, style, duration) if use_cache and settings.llm_cache_enabled else None
+            cached = self._cached(cache_key, topic)
+            if cached is not None:
+                return cached
             
-            # Add metadata
-            script_data.update({
-                'topic': topic,
-                'style': style,
-                'narration': " ".join([s.get('narration_text', '') for s in script_data.get('scenes', [])]),
-                'voiceover_text': " ".join([s.get('narration_text', '') for s in script_data.get('scenes', [])]),
-                'total_duration': sum([s.get('duration', 0) for s in script_data.get('scenes', [])])
-            })
+            script_data, winner = await self._ainvoke_hedged(self._inputs(topic, style, duration))
             
+            script_data = await self._finish(script_data, topic, style, duration, cache_key, winner)
             logger.info(f"Script generated with {len(script_data.get('scenes', []))} scenes")
             return script_data
             
         except Exception as e:
             logger.error(f"Script generation failed with {self.llm_provider}: {str(e)}", exc_info=True)
             
-            # Fallback to Phi-3
-            if self.llm_provider == "mistral":
+            # Fallback to Phi-3 (a hedged call has already raced it)
+            if self.llm_provider == "mistral" and not settings.llm_hedge_enabled:
                 logger.info("Attempting fallback to Phi-3 (local Ollama)...")
                 try:
-                    fallback_gen = ScriptGenerator("phi3")
-                    return fallback_gen.generate_script(topic, style, duration)
+                    from services.service_registry import registry
+                    fallback_gen = registry.script_generator("phi3")
+                    return await fallback_gen.agenerate_script(topic, style, duration, use_cache)
                 except Exception as fallback_error:
                     logger.error(f"Phi-3 fallback also failed: {str(fallback_error)}")
             
             raise
+    
+    async def astream_script(
+        self,
+        topic: str,
+        style: str,
+        duration: int,
+        on_scene: Callable[[dict], None],
+        use_cache: bool = True
+    ) -> dict:
+        # Hands each scene to on_scene as soon as its JSON object is complete
+        logger.info(f"Streaming script for: {topic} using {self.llm_provider}")
+        
+        cache_key = self._cache_key(topic, style, duration) if use_cache and settings.llm_cache_enabled else None
+        cached = self._cached(cache_key, topic)
+        if cached is not None:
+            for scene in cached.get('scenes', []):
+                on_scene(scene)
+            return cached
+        
+        inputs = self._inputs(topic, style, duration)
+        parser = SceneStreamParser()
+        scene_check = self.structured.section('scenes')
+        context = self._context(topic, style, duration)
+        scenes = []
+        
+        async def emit(new_scenes: list):
+            for scene in new_scenes:
+                # Rendering starts on a scene right away, so it is validated (and re-asked) first
+                checked = (await scene_check.avalidate({'scenes': [scene]}, context))['scenes']
+                if not checked:
+                    continue
+                scenes.append(checked[0])
+                logger.info(f"Streamed scene {checked[0].get('scene_number', len(scenes))}")
+                on_scene(checked[0])
+        
+        async with asyncio.timeout(settings.llm_call_deadline):
+            # Only the wait for the first scene is hedged: once scenes flow to on_scene the
+            # stream is committed, since scenes of two different scripts cannot be mixed
+            result, winner = await self._ainvoke_hedged(
+                inputs, primary=lambda: self._afirst_scenes(inputs, parser), stage="script-stream"
+            )
+            
+            if winner == "primary":
+                stream, first = result
+                await emit(first)
+                async for chunk in stream:
+                    await emit(parser.feed(getattr(chunk, 'content', chunk)))
+            else:
+                await emit(result.get('scenes') or [])
+        
+        if not scenes:
+            raise ValueError("Streamed script contained no scenes")
+        
+        script_data = await self._finish({"scenes": scenes}, topic, style, duration, cache_key, winner)
+        logger.info(f"Script streamed with {len(scenes)} scenes")
+        return script_data
+    
+    async def _afirst_scenes(self, inputs: dict, parser: SceneStreamParser):
+        # Reads the stream up to its first complete scene(s); the caller drains the rest
+        stream = aiter(self.stream_chain.astream(inputs))
+        async for chunk in stream:
+            # Chat models stream message chunks, Ollama streams plain strings
+            first = parser.feed(getattr(chunk, 'content', chunk))
+            if first:
+                return stream, first
+        return stream, []
+    
+    async def _ainvoke_hedged(self, inputs: dict, primary: Callable = None, stage: str = "script"):
+        secondary = None
+        if self.llm_provider == "mistral" and settings.llm_hedge_enabled:
+            try:
+                from services.service_registry import registry
+                backup = registry.script_generator("phi3")
+                secondary = lambda: backup.chain.ainvoke(inputs)
+            except Exception as e:
+                logger.warning(f"Phi-3 hedge unavailable: {str(e)}")
+        
+        return await hedged_call(
+            f"{stage}:{self.llm_provider}",
+            primary or (lambda: self.chain.ainvoke(inputs)),
+            secondary
+        )
+    
+    def _cached(self, cache_key: str, topic: str):
+        if not cache_key:
+            return None
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Script cache hit for: {topic}")
+        return cached
+    
+    async def _finish(self, script_data: dict, topic: str, style: str, duration: int, cache_key: str, winner: str) -> dict:
+        script_data = self._validated(
+            await self.structured.avalidate(script_data, self._context(topic, style, duration))
+        )
+        script_data = self._add_metadata(script_data, topic, style)
+        
+        # A hedged Phi-3 answer must not be cached as a Mistral response
+        if cache_key and winner == "primary":
+            llm_cache.set(cache_key, script_data)
+        return script_data
+    
+    def _inputs(self, topic: str, style: str, duration: int) -> dict:
+        return {"topic": topic, "style": style, "duration": duration}
+    
+    def _cache_key(self, topic: str, style: str, duration: int) -> str:
+        return llm_cache.make_key(
+            "script", self.llm_provider, self.model_name, self.temperature,
+            self.PROMPT_VERSION, self._inputs(topic, style, duration)
+        )
+    
+    def _context(self, topic: str, style: str, duration: int) -> str:
+        return f"the topic {topic!r} ({style}, {duration} seconds)"
+    
+    def _validated(self, script_data: dict) -> dict:
+        if not script_data.get('scenes'):
+            raise ValueError("Script contained no valid scenes")
+        return script_data
+    
+    def _add_metadata(self, script_data: dict, topic: str, style: str) -> dict:
+        scenes = script_data.get('scenes', [])
+        script_data.update({
+            'topic': topic,
+            'style': style,
+            'narration': " ".join([s.get('narration_text', '') for s in scenes]),
+            'voiceover_text': " ".join([s.get('narration_text', '') for s in scenes]),
+            'total_duration': sum([s.get('duration', 0) for s in scenes])
+        })
+        return script_data
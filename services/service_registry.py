@@ -0,0 +1,73 @@
+# services/service_registry.py
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class ServiceRegistry:
+    """Process-wide cache of long-lived service instances, keyed by provider."""
+
+    def __init__(self):
+        self._instances: Dict[Hashable, Any] = {}
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            # Another thread may have built it while we waited for the lock
+            if key not in self._instances:
+                logger.info(f"Creating shared service instance: {key}")
+                self._instances[key] = factory()
+            return self._instances[key]
+
+    def script_generator(self, llm_provider: str = "mistral"):
+        def build():
+            from services.script_generator import ScriptGenerator
+            return ScriptGenerator(llm_provider)
+        return self.get(("script_generator", llm_provider), build)
+
+    def animation_blueprint(self, llm_provider: str = "mistral"):
+        def build():
+            from services.animation_blueprint import AnimationBlueprint
+            return AnimationBlueprint(llm_provider)
+        return self.get(("animation_blueprint", llm_provider), build)
+
+    def tts_generator(self, provider: str = None):
+        from config import settings
+        provider = provider or settings.tts_provider
+
+        def build():
+            from services.tts_generator import TTSGenerator
+            return TTSGenerator(provider)
+        return self.get(("tts_generator", provider), build)
+
+    def video_renderer(self):
+        def build():
+            from services.video_renderer import VideoRenderer
+            return VideoRenderer()
+        return self.get(("video_renderer",), build)
+
+    def hybrid_renderer(self):
+        def build():
+            from services.hybrid_video_renderer import HybridVideoRenderer
+            return HybridVideoRenderer()
+        return self.get(("hybrid_renderer",), build)
+
+    def report_generator(self):
+        def build():
+            from utils.report_generator import ReportGenerator
+            return ReportGenerator()
+        return self.get(("report_generator",), build)
+
+    def workflow_graph(self, llm_provider: str, builder: Callable[[], Any]):
+        return self.get(("workflow_graph", llm_provider), builder)
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+
+registry = ServiceRegistry()
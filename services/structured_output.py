@@ -0,0 +1,188 @@
+# services/structured_output.py
+import copy
+import json
+import logging
+from typing import Any, Dict, Type
+from pydantic import BaseModel, ValidationError
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from config import settings
+from models import (
+    SceneModel, StoryboardFrame, AnimationElement, AnimationInstruction,
+    TimingMarker, TransitionModel, AssetPrompt
+)
+from utils.json_repair import repair_json
+
+logger = logging.getLogger(__name__)
+
+# Marker the parser leaves on a repaired dict listing sections that were cut off mid-list
+TRUNCATED_KEY = "_truncated"
+
+SCRIPT_SCHEMA: Dict[str, Type[BaseModel]] = {"scenes": SceneModel}
+
+BLUEPRINT_SCHEMA: Dict[str, Type[BaseModel]] = {
+    "storyboard": StoryboardFrame,
+    "elements": AnimationElement,
+    "animation_instructions": AnimationInstruction,
+    "timing": TimingMarker,
+    "transitions": TransitionModel,
+    "asset_prompts": AssetPrompt,
+}
+
+class RepairingJsonOutputParser(JsonOutputParser):
+    """JsonOutputParser that repairs malformed output locally instead of failing."""
+
+    def parse_result(self, result, *, partial: bool = False) -> Any:
+        if partial:
+            return super().parse_result(result, partial=partial)
+
+        # The stock parser silently closes truncated output; repair_json also reports it
+        text = result[0].text
+        try:
+            data, truncated = repair_json(text)
+        except ValueError as e:
+            raise OutputParserException(f"Invalid json output: {text}") from e
+
+        if truncated and isinstance(data, dict):
+            data[TRUNCATED_KEY] = truncated
+        return data
+
+FRAGMENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You repair fragments of a JSON document. Return valid JSON only."),
+    ("human", """A {document} for {context} came back with some parts missing or invalid.
+
+Item schemas:
+{schemas}
+
+Problems:
+{problems}
+
+Return one JSON object. For each "section[index]" problem use that exact key and a corrected item as the value.
+For each "section" problem use the section name as the key and a list of the missing items as the value.
+Return only valid JSON, no other text.""")
+])
+
+class StructuredOutput:
+    """Validates parsed model output section by section and re-asks only for the bad parts."""
+
+    def __init__(self, llm, schema: Dict[str, Type[BaseModel]], document: str):
+        self.schema = schema
+        self.document = document
+        self.fix_chain = FRAGMENT_PROMPT | llm | RepairingJsonOutputParser() if llm is not None else None
+
+    def section(self, name: str) -> "StructuredOutput":
+        # Validator for one section's items as they arrive (streamed scenes), sharing the fix chain
+        part = copy.copy(self)
+        part.schema = {name: self.schema[name]}
+        return part
+
+    async def avalidate(self, data: Any, context: str) -> dict:
+        data, problems = self._check(data)
+        if problems and self.fix_chain is not None:
+            for _ in range(settings.llm_fragment_retries):
+                fixes = await self._aask(problems, context)
+                data, problems = self._check(self._apply(data, problems, fixes))
+                if not problems:
+                    break
+        return self._finish(data, problems)
+
+    def _check(self, data: Any) -> tuple:
+        # Returns the data with valid items normalised, plus {problem key: description}
+        if not isinstance(data, dict):
+            raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+
+        data = dict(data)
+        truncated = data.pop(TRUNCATED_KEY, [])
+        problems: Dict[str, dict] = {}
+
+        for section, model in self.schema.items():
+            items = data.get(section)
+            if not isinstance(items, list):
+                problems[section] = {"error": "section is missing"}
+                continue
+
+            checked = []
+            for index, item in enumerate(items):
+                try:
+                    validated = model.model_validate(item).model_dump(exclude_none=True)
+                    # Keep extra keys the model added; downstream renderers read some of them
+                    checked.append({**item, **validated})
+                except (ValidationError, TypeError) as e:
+                    checked.append(item)
+                    problems[f"{section}[{index}]"] = {"item": item, "error": _describe(e)}
+            data[section] = checked
+
+            if section in truncated:
+                problems[section] = {
+                    "error": "output was cut off; list the items that should follow",
+                    "last_item": items[-1] if items else None
+                }
+
+        return data, problems
+
+    async def _aask(self, problems: Dict[str, dict], context: str) -> dict:
+        try:
+            fixes = await self.fix_chain.ainvoke(self._fix_inputs(problems, context))
+            return fixes if isinstance(fixes, dict) else {}
+        except Exception as e:
+            logger.warning(f"Fragment repair request for {self.document} failed: {str(e)}")
+            return {}
+
+    def _fix_inputs(self, problems: Dict[str, dict], context: str) -> dict:
+        sections = {key.split('[')[0] for key in problems}
+        logger.info(f"Re-asking for {len(problems)} {self.document} fragment(s): {', '.join(sorted(problems))}")
+        return {
+            "document": self.document,
+            "context": context,
+            "schemas": "\n".join(
+                f"{section}: {_fields(self.schema[section])}" for section in sorted(sections)
+            ),
+            "problems": "\n".join(
+                f"{key}: {json.dumps(problem, default=str)}" for key, problem in problems.items()
+            ),
+        }
+
+    def _apply(self, data: dict, problems: Dict[str, dict], fixes: dict) -> dict:
+        data = dict(data)
+        for key in problems:
+            if key not in fixes:
+                continue
+            if '[' in key:
+                section, index = key[:-1].split('[')
+                items = list(data[section])
+                items[int(index)] = fixes[key]
+                data[section] = items
+            elif isinstance(fixes[key], list):
+                data[key] = list(data.get(key) or []) + fixes[key]
+        return data
+
+    def _finish(self, data: dict, problems: Dict[str, dict]) -> dict:
+        # Whatever is still invalid after re-asking is dropped rather than passed downstream
+        dropped = {section: set() for section in self.schema}
+        for key in problems:
+            if '[' in key:
+                section, index = key[:-1].split('[')
+                dropped[section].add(int(index))
+            elif not isinstance(data.get(key), list):
+                data[key] = []
+
+        for section, indexes in dropped.items():
+            if indexes:
+                logger.warning(f"Dropping {len(indexes)} invalid {section} item(s) from {self.document}")
+                data[section] = [item for i, item in enumerate(data[section]) if i not in indexes]
+        return data
+
+def _fields(model: Type[BaseModel]) -> str:
+    return ", ".join(
+        f"{name} ({getattr(field.annotation, '__name__', str(field.annotation))}"
+        f"{'' if field.is_required() else ', optional'})"
+        for name, field in model.model_fields.items()
+    )
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc']) or 'item'}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
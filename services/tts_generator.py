@@ -1,53 +1,207 @@
 # services/tts_generator.py
 import logging
 import os
+import io
+import base64
+import re
+import threading
+import time
+import uuid
+import wave
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List
 from config import settings
+from utils.metrics import PROVIDER_SECONDS
+from utils.resource_usage import record_tts
 
 logger = logging.getLogger(__name__)
 
+_sarvam_session = None
+_sarvam_session_lock = threading.Lock()
+
+def _get_sarvam_session():
+    global _sarvam_session
+    with _sarvam_session_lock:
+        if _sarvam_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            retry = Retry(
+                total=settings.sarvam_max_retries,
+                backoff_factor=settings.sarvam_backoff,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["POST"],
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=settings.sarvam_pool_size,
+                pool_maxsize=settings.sarvam_pool_size,
+                max_retries=retry
+            )
+            
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sarvam_session = session
+    return _sarvam_session
+
+def _split_text(text: str, max_chars: int) -> List[str]:
+    # Prefer sentence boundaries, then words, then a hard cut
+    if len(text) <= max_chars:
+        return [text]
+    
+    chunks = []
+    current = ""
+    for sentence in re.split(r'(?<=[.!?।])\s+', text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        
+        candidate = f"{current} {sentence}".strip()
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = sentence
+    
+    if current:
+        chunks.append(current)
+    return [c for c in chunks if c]
+
+def _concat_wav(parts: List[bytes]) -> bytes:
+    if len(parts) == 1:
+        return parts[0]
+    
+    output = io.BytesIO()
+    writer = None
+    for part in parts:
+        with wave.open(io.BytesIO(part), 'rb') as reader:
+            if writer is None:
+                writer = wave.open(output, 'wb')
+                writer.setparams(reader.getparams())
+            writer.writeframes(reader.readframes(reader.getnframes()))
+    writer.close()
+    return output.getvalue()
+
 class TTSGenerator:
     def __init__(self, provider: str = None):
         self.temp_dir = Path(settings.temp_dir)
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.provider = provider or settings.tts_provider
+        self._replay_tts = None
+        self._live_tts = None
         
         logger.info(f"TTS Generator initialized with provider: {self.provider}")
     
     def generate_audio(self, text: str, language: str = None) -> str:
         lang = language or settings.tts_language
+        started = time.monotonic()
+        outcome = "ok"
+        record_tts(len(text or ""))
         
         try:
-            if self.provider == "huggingface_piper":
-                return self._generate_piper(text, lang)
-            elif self.provider == "huggingface_coqui":
-                return self._generate_coqui(text, lang)
-            elif self.provider == "bark":
-                return self._generate_bark(text, lang)
-            elif self.provider == "sarvam":
-                return self._generate_sarvam(text, lang)
-            elif self.provider == "gtts":
-                return self._generate_gtts(text, lang)
-            elif self.provider == "edge_tts":
-                return self._generate_edge_tts(text, lang)
-            else:
-                logger.warning(f"Unknown provider {self.provider}, using Piper")
-                return self._generate_piper(text, lang)
-                
+            return self._synthesize(text, lang)
         except Exception as e:
+            outcome = "error"
             logger.error(f"TTS generation failed with {self.provider}: {str(e)}")
             return self._create_placeholder()
+        finally:
+            PROVIDER_SECONDS.labels("tts", self.provider, outcome).observe(time.monotonic() - started)
+    
+    def _synthesize(self, text: str, lang: str) -> str:
+        # The provider call alone; generate_audio accounts for it
+        if self.provider == "huggingface_piper":
+            return self._generate_piper(text, lang)
+        elif self.provider == "huggingface_coqui":
+            return self._generate_coqui(text, lang)
+        elif self.provider == "bark":
+            return self._generate_bark(text, lang)
+        elif self.provider == "sarvam":
+            return self._generate_sarvam(text, lang)
+        elif self.provider == "gtts":
+            return self._generate_gtts(text, lang)
+        elif self.provider == "edge_tts":
+            return self._generate_edge_tts(text, lang)
+        elif self.provider == "replay":
+            return self._replay().replay(text, lang, self.temp_dir)
+        elif self.provider == "record":
+            return self._generate_recorded(text, lang)
+        else:
+            logger.warning(f"Unknown provider {self.provider}, using Piper")
+            return self._generate_piper(text, lang)
+    
+    def generate_audio_batch(self, texts: List[str], language: str = None) -> List[str]:
+        lang = language or settings.tts_language
+        if self.provider != "sarvam":
+            return [self.generate_audio(text, lang) for text in texts]
+        
+        started = time.monotonic()
+        outcome = "ok"
+        record_tts(sum(len(text or "") for text in texts))
+        
+        try:
+            return self._generate_sarvam_batch(texts, lang)
+        except Exception as e:
+            outcome = "error"
+            logger.error(f"Batch TTS generation failed with {self.provider}: {str(e)}")
+            return [self._create_placeholder() for _ in texts]
+        finally:
+            PROVIDER_SECONDS.labels("tts", self.provider, outcome).observe(time.monotonic() - started)
+    
+    def generate_scene_audio(self, scenes: List[dict], language: str = None) -> Dict[int, str]:
+        # One narration clip per scene, keyed by scene number
+        voiced = [s for s in scenes if s.get('narration_text')]
+        if not voiced:
+            return {}
+        
+        lang = language or self.detect_language(" ".join(s['narration_text'] for s in voiced))
+        paths = self.generate_audio_batch([s['narration_text'] for s in voiced], lang)
+        
+        return {
+            scene.get('scene_number', i + 1): path
+            for i, (scene, path) in enumerate(zip(voiced, paths))
+        }
+    
+    def join_audio(self, paths: List[str]) -> str:
+        # One voiceover track from per-scene clips, in order; placeholder clips are empty
+        clips = [p for p in paths if p and os.path.exists(p) and os.path.getsize(p) > 0]
+        if not clips:
+            return self._create_placeholder()
+        if len(clips) == 1:
+            return clips[0]
+        
+        target = self._audio_path("voiceover", ".wav")
+        if all(Path(p).suffix == ".wav" for p in clips):
+            target.write_bytes(_concat_wav([Path(p).read_bytes() for p in clips]))
+            return str(target)
+        
+        # Mixed engines (e.g. a Sarvam clip fell back to gTTS): decode and join with ffmpeg
+        from utils.subprocesses import run_process
+        cmd = ["ffmpeg", "-y"]
+        for clip in clips:
+            cmd += ["-i", clip]
+        cmd += ["-filter_complex", f"concat=n={len(clips)}:v=0:a=1", str(target)]
+        
+        result = run_process(cmd, timeout=settings.subprocess_timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"Voiceover join failed: {result.stderr}")
+        return str(target)
     
     def _generate_piper(self, text: str, language: str) -> str:
         
         try:
             logger.info("Generating audio with Piper TTS")
             
-            import subprocess
+            from utils.subprocesses import run_process
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            audio_path = self.temp_dir / f"piper_{timestamp}.wav"
+            audio_path = self._audio_path("piper", ".wav")
             
             model_map = {
                 "en": "en_US-lessac-medium",
@@ -64,21 +218,13 @@ class TTSGenerator:
                 "--output_file", str(audio_path)
             ]
             
-            process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            stdout, stderr = process.communicate(input=text[:5000])
+            result = run_process(cmd, timeout=settings.subprocess_timeout, input=text[:5000])
             
-            if process.returncode == 0 and audio_path.exists():
+            if result.returncode == 0 and audio_path.exists():
                 logger.info(f"Piper TTS audio generated: {audio_path}")
                 return str(audio_path)
             else:
-                logger.warning(f"Piper failed: {stderr}")
+                logger.warning(f"Piper failed: {result.stderr}")
                 return self._generate_coqui(text, language)
                 
         except FileNotFoundError:
@@ -95,8 +241,7 @@ class TTSGenerator:
             
             from TTS.api import TTS
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            audio_path = self.temp_dir / f"coqui_{timestamp}.wav"
+            audio_path = self._audio_path("coqui", ".wav")
             
             model_map = {
                 "en": "tts_models/en/ljspeech/tacotron2-DDC",
@@ -128,8 +273,7 @@ class TTSGenerator:
             from transformers import AutoProcessor, BarkModel
             import scipy
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            audio_path = self.temp_dir / f"bark_{timestamp}.wav"
+            audio_path = self._audio_path("bark", ".wav")
             
             processor = AutoProcessor.from_pretrained("suno/bark-small")
             model = BarkModel.from_pretrained("suno/bark-small")
@@ -151,86 +295,110 @@ class TTSGenerator:
             return self._generate_sarvam(text, language)
     
     def _generate_sarvam(self, text: str, language: str) -> str:
-        try:
-            logger.info("Generating audio with Sarvam AI")
-            
-            import requests
-            
-            if not settings.sarvam_api_key:
-                logger.warning("Sarvam API key not set, falling back to gTTS")
-                return self._generate_gtts(text, language)
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            audio_path = self.temp_dir / f"sarvam_{timestamp}.wav"
-            
-            # Official Sarvam AI API
-            url = "https://api.sarvam.ai/text-to-speech"
-            
-            headers = {
-                "api-subscription-key": settings.sarvam_api_key,
-                "content-type": "application/json"
-            }
-            
-            # Language to Sarvam code mapping
-            lang_map = {
-                "hi": "hi-IN",
-                "ta": "ta-IN",
-                "te": "te-IN",
-                "en": "en-IN",
-                "bn": "bn-IN",
-                "gu": "gu-IN",
-                "kn": "kn-IN",
-                "ml": "ml-IN",
-                "mr": "mr-IN",
-                "pa": "pa-IN"
-            }
-            
-            # Voice/Speaker options: anushka, arvind, meera, etc.
-            speaker_map = {
-                "hi": "meera",      # Female Hindi
-                "ta": "pallavi",    # Female Tamil
-                "te": "shruti",     # Female Telugu
-                "en": "anushka",    # Female English-Indian
-            }
-            
-            payload = {
-                "inputs": [text[:5000]],  # Sarvam uses "inputs" array
-                "target_language_code": lang_map.get(language, "en-IN"),
-                "speaker": speaker_map.get(language, "anushka"),
-                "pitch": 0,
-                "pace": 1.0,
-                "loudness": 1.5,
-                "speech_sample_rate": 22050,
-                "enable_preprocessing": True,
-                "model": "bulbul:v2"  # Latest Sarvam model
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
+        return self._generate_sarvam_batch([text], language)[0]
+    
+    def _generate_sarvam_batch(self, texts: List[str], language: str) -> List[str]:
+        if not settings.sarvam_api_key:
+            logger.warning("Sarvam API key not set, falling back to gTTS")
+            return [self._generate_gtts(text, language) for text in texts]
+        
+        logger.info(f"Generating {len(texts)} audio clip(s) with Sarvam AI")
+        
+        # Split every text into API-sized pieces, remembering which text each belongs to
+        pieces = []
+        for index, text in enumerate(texts):
+            for chunk in _split_text(text[:5000], settings.sarvam_max_chars):
+                pieces.append((index, chunk))
+        
+        audio_chunks: Dict[int, List[bytes]] = {i: [] for i in range(len(texts))}
+        failed = set()
+        session = _get_sarvam_session()
+        batch_size = max(1, settings.sarvam_max_inputs)
+        
+        for start in range(0, len(pieces), batch_size):
+            batch = pieces[start:start + batch_size]
+            if all(index in failed for index, _ in batch):
+                continue
+            
+            try:
+                response = session.post(
+                    settings.sarvam_api_url,
+                    json=self._sarvam_payload([chunk for _, chunk in batch], language),
+                    headers={
+                        "api-subscription-key": settings.sarvam_api_key,
+                        "content-type": "application/json"
+                    },
+                    timeout=settings.sarvam_timeout
+                )
                 
-                # Sarvam returns base64 encoded audio
-                if 'audios' in result and len(result['audios']) > 0:
-                    import base64
-                    audio_b64 = result['audios'][0]
-                    audio_bytes = base64.b64decode(audio_b64)
-                    
-                    with open(audio_path, 'wb') as f:
-                        f.write(audio_bytes)
-                    
-                    logger.info(f"Sarvam AI audio generated: {audio_path}")
-                    return str(audio_path)
-                else:
-                    logger.warning("Sarvam API returned no audio data")
-                    return self._generate_gtts(text, language)
-            else:
-                logger.warning(f"Sarvam API failed: {response.status_code} - {response.text}")
-                return self._generate_gtts(text, language)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{response.status_code} - {response.text}")
                 
-        except Exception as e:
-            logger.error(f"Sarvam AI error: {str(e)}")
-            return self._generate_gtts(text, language)
+                # Sarvam returns one base64 encoded audio per input, in order
+                audios = response.json().get('audios') or []
+                if len(audios) != len(batch):
+                    raise RuntimeError(f"expected {len(batch)} audios, got {len(audios)}")
+                
+                for (index, _), audio_b64 in zip(batch, audios):
+                    audio_chunks[index].append(base64.b64decode(audio_b64))
+                    
+            except Exception as e:
+                logger.warning(f"Sarvam API batch failed: {str(e)}")
+                failed.update(index for index, _ in batch)
+        
+        paths = []
+        
+        for index, text in enumerate(texts):
+            if index in failed or not audio_chunks[index]:
+                paths.append(self._generate_gtts(text, language))
+                continue
+            
+            audio_path = self._audio_path("sarvam", ".wav")
+            try:
+                with open(audio_path, 'wb') as f:
+                    f.write(_concat_wav(audio_chunks[index]))
+                logger.info(f"Sarvam AI audio generated: {audio_path}")
+                paths.append(str(audio_path))
+            except Exception as e:
+                logger.error(f"Sarvam AI audio decode failed: {str(e)}")
+                paths.append(self._generate_gtts(text, language))
+        
+        return paths
+    
+    def _sarvam_payload(self, inputs: List[str], language: str) -> dict:
+        # Language to Sarvam code mapping
+        lang_map = {
+            "hi": "hi-IN",
+            "ta": "ta-IN",
+            "te": "te-IN",
+            "en": "en-IN",
+            "bn": "bn-IN",
+            "gu": "gu-IN",
+            "kn": "kn-IN",
+            "ml": "ml-IN",
+            "mr": "mr-IN",
+            "pa": "pa-IN"
+        }
+        
+        # Voice/Speaker options: anushka, arvind, meera, etc.
+        speaker_map = {
+            "hi": "meera",      # Female Hindi
+            "ta": "pallavi",    # Female Tamil
+            "te": "shruti",     # Female Telugu
+            "en": "anushka",    # Female English-Indian
+        }
+        
+        return {
+            "inputs": inputs,  # Sarvam accepts several texts per request
+            "target_language_code": lang_map.get(language, "en-IN"),
+            "speaker": speaker_map.get(language, "anushka"),
+            "pitch": 0,
+            "pace": 1.0,
+            "loudness": 1.5,
+            "speech_sample_rate": 22050,
+            "enable_preprocessing": True,
+            "model": "bulbul:v2"  # Latest Sarvam model
+        }
     
     def _generate_gtts(self, text: str, language: str) -> str:
         try:
@@ -238,8 +406,7 @@ class TTSGenerator:
             
             from gtts import gTTS
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            audio_path = self.temp_dir / f"gtts_{timestamp}.mp3"
+            audio_path = self._audio_path("gtts", ".mp3")
             
             lang_map = {
                 "en": "en",
@@ -265,8 +432,7 @@ class TTSGenerator:
             import edge_tts
             import asyncio
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            audio_path = self.temp_dir / f"edge_{timestamp}.mp3"
+            audio_path = self._audio_path("edge", ".mp3")
             
             voice_map = {
                 "en": "en-US-AriaNeural",
@@ -291,10 +457,31 @@ class TTSGenerator:
             logger.error(f"Edge TTS error: {str(e)}")
             return self._create_placeholder()
     
+    def _replay(self):
+        if self._replay_tts is None:
+            from services.replay_providers import ReplayTTS
+            self._replay_tts = ReplayTTS()
+        return self._replay_tts
+    
+    def _generate_recorded(self, text: str, language: str) -> str:
+        # Narrate with the live provider and keep a copy for replay runs
+        if self._live_tts is None:
+            self._live_tts = TTSGenerator(settings.tts_record_provider)
+        
+        # The outer generate_audio already counted these characters; a live failure is not recorded
+        started = time.monotonic()
+        audio_path = self._live_tts._synthesize(text, language)
+        self._replay().record(text, language, audio_path, time.monotonic() - started)
+        return audio_path
+    
+    def _audio_path(self, engine: str, suffix: str) -> Path:
+        # Scenes are narrated concurrently: a timestamp alone collides within the same second
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return self.temp_dir / f"{engine}_{timestamp}_{uuid.uuid4().hex[:8]}{suffix}"
+    
     def _create_placeholder(self) -> str:
       
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        placeholder = self.temp_dir / f"placeholder_{timestamp}.mp3"
+        placeholder = self._audio_path("placeholder", ".mp3")
         placeholder.touch()
         
         logger.warning(f"Created placeholder audio: {placeholder}")
@@ -1,6 +1,7 @@
 
 import logging
 import os
+import uuid
 from pathlib import Path
 from datetime import datetime
 from config import settings
@@ -11,6 +12,14 @@ if settings.imagemagick_path and os.path.exists(settings.imagemagick_path):
 
 # MoviePy 2.x+ uses this import path
 from moviepy import ColorClip, TextClip, AudioFileClip, CompositeVideoClip, concatenate_videoclips
+from moviepy.audio.AudioClip import AudioArrayClip
+from moviepy.audio.io import ffmpeg_audiowriter, readers
+from moviepy.video.io import ffmpeg_reader, ffmpeg_writer
+import numpy as np
+from utils.subprocesses import track_library_processes
+
+# MoviePy starts ffmpeg itself; registering it with the job lets cancel and the watchdog kill an encode
+track_library_processes(ffmpeg_writer, ffmpeg_audiowriter, ffmpeg_reader, readers)
 
 logger = logging.getLogger(__name__)
 
@@ -18,54 +27,37 @@ class VideoRenderer:
     def __init__(self):
         self.output_dir = Path(settings.output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Default settings
+        self.width, self.height = 1280, 720
+        self.fps = 24
+        self.bg_color = (10, 10, 30) # Dark blue/black
+        self.text_color = 'white'
+        self.font_size = 50
+        self.audio_fps = 44100
     
-    def render(self, blueprint: dict, script_data: dict, audio_path: str = None) -> str:
+    def render(self, blueprint: dict, script_data: dict, audio_path: str = None, output_path: str = None) -> str:
         try:
             logger.info("Starting video rendering with MoviePy")
             
-            topic = script_data.get('topic', 'video')
-            safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).strip()
-            safe_topic = safe_topic.replace(' ', '_')
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            video_filename = f"{safe_topic}_{timestamp}.mp4"
-            video_path = self.output_dir / video_filename
+            if output_path:
+                video_path = Path(output_path)
+            else:
+                topic = script_data.get('topic', 'video')
+                safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).strip()
+                safe_topic = safe_topic.replace(' ', '_')
+                
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                video_filename = f"{safe_topic}_{timestamp}_{uuid.uuid4().hex[:8]}.mp4"
+                video_path = self.output_dir / video_filename
             
             # Create video clips from script scenes
             scenes = script_data.get('scenes', [])
-            clips = []
-            
-            # Default settings
-            width, height = 1280, 720
-            bg_color = (10, 10, 30) # Dark blue/black
-            text_color = 'white'
-            font_size = 50
-            
-            for i, scene in enumerate(scenes):
-                duration = scene.get('duration', 5)
-                text = scene.get('narration_text', '')
-                
-                # Create background
-                bg_clip = ColorClip(size=(width, height), color=bg_color).with_duration(duration)
-                
-                # Create text
-                # Note: moviepy requires ImageMagick for TextClip, falling back to basic if not present might be needed
-                # For this prototype we assume a simple TextClip works or we handle error
-                try:
-                    txt_clip = TextClip(text=text, font=r"C:\Windows\Fonts\arial.ttf", font_size=font_size, color=text_color, size=(width-100, None), method='caption')
-                    txt_clip = txt_clip.with_position('center').with_duration(duration)
-                    
-                    video = CompositeVideoClip([bg_clip, txt_clip])
-                except Exception as e:
-                    logger.warning(f"TextClip failed (likely ImageMagick missing): {e}")
-                    # Fallback to just color clip if text fails
-                    video = bg_clip
-                
-                clips.append(video)
+            clips = [self._scene_clip(scene) for scene in scenes]
             
             if not clips:
                 # specific fallback if no scenes
-                clips.append(ColorClip(size=(width, height), color=bg_color).with_duration(5))
+                clips.append(ColorClip(size=(self.width, self.height), color=self.bg_color).with_duration(5))
                 
             final_video = concatenate_videoclips(clips)
             
@@ -84,10 +76,10 @@ class VideoRenderer:
             logger.info(f"Writing video file to {video_path}")
             final_video.write_videofile(
                 str(video_path), 
-                fps=24, 
+                fps=self.fps, 
                 codec='libx264', 
                 audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
+                temp_audiofile=str(video_path.with_suffix('.temp-audio.m4a')),
                 remove_temp=True,
                 logger=None # Silence moviepy logger
             )
@@ -100,3 +92,73 @@ class VideoRenderer:
             # Create empty placeholder as last resort so workflow doesn't crash completely?
             # No, better to raise error so user knows
             raise
+    
+    def render_segment(self, scene: dict, output_path: str, audio_path: str = None) -> str:
+        # Single-scene clip; every segment carries an AAC track so segments can be joined by stream copy
+        try:
+            logger.info(f"Rendering segment for scene {scene.get('scene_number')}")
+            
+            duration = scene.get('duration', 5)
+            audio = None
+            
+            if audio_path and os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
+                try:
+                    audio = AudioFileClip(audio_path)
+                    # Never cut the narration short
+                    duration = max(duration, audio.duration)
+                except Exception as e:
+                    logger.error(f"Failed to attach segment audio: {e}")
+                    audio = None
+            
+            if audio is None:
+                audio = AudioArrayClip(np.zeros((int(duration * self.audio_fps), 2)), fps=self.audio_fps)
+            
+            clip = self._scene_clip(scene, duration).with_audio(audio)
+            
+            clip.write_videofile(
+                output_path,
+                fps=self.fps,
+                codec='libx264',
+                audio_codec='aac',
+                audio_fps=self.audio_fps,
+                temp_audiofile=str(Path(output_path).with_suffix('.temp-audio.m4a')),
+                remove_temp=True,
+                logger=None
+            )
+            
+            logger.info(f"Segment rendered: {output_path}")
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Segment rendering failed: {str(e)}", exc_info=True)
+            raise
+    
+    def _scene_clip(self, scene: dict, duration: float = None):
+        duration = duration or scene.get('duration', 5)
+        text = scene.get('narration_text', '')
+        
+        # Per-scene overrides set through scene edits
+        style = scene.get('style') or {}
+        bg_color = self._rgb(style.get('bg_color')) or self.bg_color
+        
+        # Create background
+        bg_clip = ColorClip(size=(self.width, self.height), color=bg_color).with_duration(duration)
+        
+        # Create text
+        # Note: moviepy requires ImageMagick for TextClip, falling back to basic if not present might be needed
+        # For this prototype we assume a simple TextClip works or we handle error
+        try:
+            txt_clip = TextClip(text=text, font=r"C:\Windows\Fonts\arial.ttf", font_size=style.get('font_size') or self.font_size, color=style.get('text_color') or self.text_color, size=(self.width-100, None), method='caption')
+            txt_clip = txt_clip.with_position('center').with_duration(duration)
+            
+            return CompositeVideoClip([bg_clip, txt_clip])
+        except Exception as e:
+            logger.warning(f"TextClip failed (likely ImageMagick missing): {e}")
+            # Fallback to just color clip if text fails
+            return bg_clip
+    
+    def _rgb(self, hex_color: str = None):
+        if not hex_color:
+            return None
+        hex_color = hex_color.lstrip('#')
+        return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
@@ -0,0 +1,26 @@
+# tests/conftest.py
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+
+@pytest.fixture
+def Session(tmp_path):
+    """Session factory of a fresh SQLite file (tmp_path/jobs.db) with the full schema.
+
+    Tests point the modules under test at it with monkeypatch, e.g.
+    ``monkeypatch.setattr(job_queue, "SessionLocal", Session)``; async tests open the
+    same file with ``sqlite+aiosqlite``.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def db(Session):
+    session = Session()
+    yield session
+    session.close()
@@ -0,0 +1,78 @@
+# tests/test_admission.py
+
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from api import admission
+from api.admission import check_admission, estimate_wait
+from config import settings
+from models import VideoJob, VideoStatus
+from workflows.job_queue import enqueue, queue_plan
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(settings, "admission_control", True)
+    monkeypatch.setattr(settings, "job_workers", 2)
+    monkeypatch.setattr(admission, "cpu_load", lambda: 0.1)
+    monkeypatch.setattr(admission, "free_memory_mb", lambda: 8192)
+    monkeypatch.setattr(admission, "free_disk_mb", lambda path: 100_000)
+    # Jobs are added behind the queue's back, so every check plans afresh
+    monkeypatch.setattr(settings, "queue_plan_ttl", 0.0)
+    return db
+
+def add(db, count, status, **fields):
+    for _ in range(count):
+        db.add(VideoJob(id=f"job-{db.query(VideoJob).count()}", topic="t", style="s", status=status, **fields))
+        db.commit()
+
+def test_eta_is_the_one_the_queue_plan_gives_the_job(db, monkeypatch):
+    monkeypatch.setattr(settings, "job_scheduler", "fifo")
+    now = datetime.now()
+    add(db, 1, VideoStatus.PROCESSING, estimated_seconds=100, started_at=now - timedelta(seconds=40))
+    for n in range(3):
+        add(db, 1, VideoStatus.PENDING, estimated_seconds=100, queued_at=now - timedelta(seconds=10 - n))
+    request_data = {"topic": "t", "video_duration": 60}
+
+    wait = estimate_wait(db, request_data)
+
+    job = VideoJob(id="new", topic="t", style="s")
+    db.add(job)
+    enqueue(db, job, request_data)
+    assert wait["eta_seconds"] == math.ceil(queue_plan(db)["new"][1])
+    assert (wait["pending"], wait["running"], wait["next_start_seconds"]) == (3, 1, 0)
+
+def test_full_queue_is_rejected_with_retry_after(db, monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_queue", 2)
+    add(db, 1, VideoStatus.PENDING)
+    check_admission(db)
+
+    add(db, 1, VideoStatus.PENDING)
+    with pytest.raises(HTTPException) as exc:
+        check_admission(db)
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
+    assert exc.value.detail["eta_seconds"] > 0
+
+def test_host_pressure_is_rejected_as_unavailable(db, monkeypatch):
+    monkeypatch.setattr(settings, "admission_retry_after", 15)
+    monkeypatch.setattr(admission, "free_memory_mb", lambda: 100)
+
+    with pytest.raises(HTTPException) as exc:
+        check_admission(db)
+    assert exc.value.status_code == 503
+    assert exc.value.headers == {"Retry-After": "15"}
+    assert "memory" in exc.value.detail["reason"]
+
+def test_too_many_running_renders_is_rejected_until_one_finishes(db, monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_running_renders", 2)
+    now = datetime.now()
+    add(db, 1, VideoStatus.PROCESSING, estimated_seconds=100, started_at=now - timedelta(seconds=40))
+    check_admission(db)
+
+    add(db, 1, VideoStatus.PROCESSING, estimated_seconds=100, started_at=now - timedelta(seconds=10))
+    with pytest.raises(HTTPException) as exc:
+        check_admission(db)
+    assert exc.value.status_code == 503
+    assert exc.value.headers == {"Retry-After": "60"}
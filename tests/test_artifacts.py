@@ -0,0 +1,60 @@
+# tests/test_artifacts.py
+
+import asyncio
+import json
+import zlib
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from api.routes import get_job_blueprint, get_job_script
+from models import VideoJob
+from workflows.artifacts import BLUEPRINT, SCRIPT, load_artifact, save_artifact
+
+SCRIPT_DATA = {"topic": "Tides", "scenes": [{"scene_number": n, "narration_text": "The moon pulls " * 50} for n in range(1, 9)]}
+
+class FakeRequest:
+    def __init__(self, accept_encoding=""):
+        self.headers = {"accept-encoding": accept_encoding} if accept_encoding else {}
+
+def fetch(endpoint, job_id, request, db):
+    async def call():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db.get_bind().url.database}")
+        try:
+            async with async_sessionmaker(engine)() as session:
+                return await endpoint(job_id, request, session)
+        finally:
+            await engine.dispose()
+    return asyncio.run(call())
+
+@pytest.fixture
+def db(db):
+    db.add(VideoJob(id="new", topic="Tides", style="2D explainer"))
+    # Stored before job_artifacts existed, as a Python repr
+    db.add(VideoJob(id="old", topic="Tides", style="2D explainer", blueprint_data=str({"storyboard": [1]})))
+    save_artifact(db, "new", SCRIPT, SCRIPT_DATA)
+    db.commit()
+    return db
+
+def test_artifacts_are_compressed_and_not_loaded_with_the_job(db):
+    assert load_artifact(db, "new", SCRIPT) == SCRIPT_DATA
+    assert load_artifact(db, "old", BLUEPRINT) == {"storyboard": [1]}
+    assert load_artifact(db, "new", BLUEPRINT) is None
+
+    job = db.query(VideoJob).filter(VideoJob.id == "old").one()
+    assert "blueprint_data" not in job.__dict__  # deferred until touched
+
+def test_endpoints_serve_the_stored_deflate_stream(db):
+    compressed = fetch(get_job_script, "new", FakeRequest("gzip, deflate"), db)
+    assert compressed.headers["content-encoding"] == "deflate"
+    assert len(compressed.body) < len(json.dumps(SCRIPT_DATA)) / 5
+    assert json.loads(zlib.decompress(compressed.body)) == SCRIPT_DATA
+
+    plain = fetch(get_job_blueprint, "old", FakeRequest(), db)
+    assert "content-encoding" not in plain.headers
+    assert json.loads(plain.body) == {"storyboard": [1]}
+
+    with pytest.raises(HTTPException) as error:
+        fetch(get_job_blueprint, "new", FakeRequest(), db)
+    assert error.value.status_code == 404
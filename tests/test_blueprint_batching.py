@@ -0,0 +1,121 @@
+# tests/test_blueprint_batching.py
+
+import asyncio
+import time
+
+from config import settings
+from services import animation_blueprint
+from services.animation_blueprint import AnimationBlueprint, merge_blueprints
+from services.structured_output import StructuredOutput, BLUEPRINT_SCHEMA
+
+SCENES = [
+    {"scene_number": n, "duration": 10, "narration_text": f"Scene {n}", "concept": f"C{n}", "explanation": ""}
+    for n in range(1, 6)
+]
+
+class FlakyChain:
+    """Answers one blueprint per request; the scene listed in fail_once fails on its first call."""
+
+    def __init__(self, fail_once=()):
+        self.fail_once = set(fail_once)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def ainvoke(self, inputs):
+        number = int(inputs["scenes"].split('"scene_number": ')[1].split(",")[0])
+        self.calls.append(number)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+
+        if number in self.fail_once:
+            self.fail_once.discard(number)
+            raise ValueError("Invalid json output")
+
+        return {
+            "storyboard": [{
+                "scene": number, "description": f"frame {number}", "composition": "centered",
+                "visual_elements": [], "text_overlays": [], "animation_movement": "none"
+            }],
+            "elements": [{"name": "title", "element_type": "text", "description": "Title", "color": "blue"}],
+            "animation_instructions": [],
+            "timing": [{"scene": number, "start": 0, "end": 10, "duration": 10}],
+            "transitions": [],
+            "asset_prompts": [],
+        }
+
+def make_generator(chain):
+    generator = AnimationBlueprint.__new__(AnimationBlueprint)
+    generator.llm_provider = "phi3"
+    generator.model_name = "test"
+    generator.temperature = 0.6
+    generator.chain = chain
+    generator.structured = StructuredOutput(None, BLUEPRINT_SCHEMA, "animation blueprint")
+    return generator
+
+def test_per_scene_blueprint_retries_only_failed_scene(monkeypatch):
+    monkeypatch.setattr(settings, "blueprint_batch_size", 1)
+    monkeypatch.setattr(settings, "blueprint_concurrency", 2)
+    monkeypatch.setattr(settings, "blueprint_batch_retries", 2)
+    chain = FlakyChain(fail_once={3})
+
+    blueprint = asyncio.run(make_generator(chain).acreate_blueprint_batched(
+        {"scenes": SCENES}, {"style": "2D explainer", "colors": "blue"}, use_cache=False
+    ))
+
+    assert sorted(chain.calls) == [1, 2, 3, 3, 4, 5]
+    assert chain.max_active <= 2
+    assert [f["scene"] for f in blueprint["storyboard"]] == [1, 2, 3, 4, 5]
+
+def test_merge_offsets_timing_and_links_batches():
+    parts = [
+        {"storyboard": [{"scene": 1}], "elements": [{"name": "title"}],
+         "timing": [{"scene": 1, "start": 0, "end": 10}], "transitions": []},
+        {"storyboard": [{"scene": 2}], "elements": [{"name": "title"}, {"name": "arrow"}],
+         "timing": [{"scene": 2, "start": 0, "end": 10}], "transitions": []},
+    ]
+
+    merged = merge_blueprints(parts, [SCENES[:1], SCENES[1:2]], {"transitions": "slide"})
+
+    assert [t["start"] for t in merged["timing"]] == [0, 10]
+    assert [e["name"] for e in merged["elements"]] == ["title", "arrow"]
+    assert merged["transitions"] == [
+        {"from_scene": 1, "to_scene": 2, "transition_type": "slide", "duration": 0.5}
+    ]
+    assert set(merged) == {"storyboard", "elements", "animation_instructions", "timing", "transitions", "asset_prompts"}
+
+def test_a_batch_that_keeps_failing_marks_the_blueprint_degraded(monkeypatch):
+    monkeypatch.setattr(settings, "blueprint_batch_size", 1)
+    monkeypatch.setattr(settings, "blueprint_batch_retries", 0)
+    chain = FlakyChain(fail_once={2})
+
+    blueprint = asyncio.run(make_generator(chain).acreate_blueprint_batched(
+        {"scenes": SCENES[:3]}, {"style": "2D explainer", "colors": "blue"}, use_cache=False
+    ))
+
+    assert blueprint["degraded"] is True
+    assert [f["scene"] for f in blueprint["storyboard"]] == [1, 2, 3]
+    assert [f.get("description") for f in blueprint["storyboard"]][1] == "C2"
+
+def test_retries_stop_when_the_stage_budget_runs_out(monkeypatch):
+    monkeypatch.setattr(settings, "blueprint_batch_retries", 5)
+    monkeypatch.setattr(animation_blueprint, "BUDGET_MARGIN", 0.0)
+    chain = FlakyChain()
+
+    async def hangs(inputs):
+        chain.calls.append(inputs)
+        await asyncio.sleep(30)
+
+    chain.ainvoke = hangs
+    started = time.monotonic()
+
+    blueprint = asyncio.run(make_generator(chain).acreate_blueprint_batched(
+        {"scenes": SCENES[:1]}, {"style": "2D explainer", "colors": "blue"}, use_cache=False, budget=0.3
+    ))
+
+    # The first call is cut off at the budget and no retry starts after it
+    assert time.monotonic() - started < 2
+    assert len(chain.calls) == 1
+    assert blueprint["degraded"] is True
@@ -0,0 +1,87 @@
+# tests/test_checkpoints.py
+
+import asyncio
+from typing import List, Optional, TypedDict
+
+import pytest
+from models import VideoJob
+from workflows import checkpoints
+from workflows.checkpoints import checkpointed, load_checkpoints, restore_state
+from workflows.stage_graph import build_stage_graph
+
+class DemoState(TypedDict):
+    job_id: str
+    streaming: bool
+    script_data: Optional[dict]
+    blueprint: Optional[dict]
+    video_path: Optional[str]
+    completed_stages: List[str]
+    progress: int
+
+@pytest.fixture(autouse=True)
+def checkpoint_db(Session, monkeypatch):
+    monkeypatch.setattr(checkpoints, "SessionLocal", Session)
+
+    db = Session()
+    db.add(VideoJob(id="job-1", topic="Gravity", style="2D explainer"))
+    db.commit()
+    db.close()
+
+def make_stages(calls, tmp_path, fail_render=False):
+    async def script(state):
+        calls.append("script")
+        return {**state, "script_data": {"scenes": [{"scene_number": 1}]}, "progress": 25}
+
+    async def blueprint(state):
+        calls.append("blueprint")
+        return {**state, "blueprint": {"storyboard": [1]}, "progress": 50}
+
+    async def render(state):
+        calls.append("render")
+        if fail_render:
+            raise RuntimeError("ffmpeg crashed")
+        video = tmp_path / "video.mp4"
+        video.write_bytes(b"mp4")
+        return {**state, "video_path": str(video), "progress": 85}
+
+    return {
+        "write_script": (script, []),
+        "make_blueprint": (blueprint, ["write_script"]),
+        "render_video": (render, ["make_blueprint"]),
+    }
+
+def run(stages, state):
+    graph = build_stage_graph(DemoState, {n: (checkpointed(n, node), deps) for n, (node, deps) in stages.items()})
+    return asyncio.run(graph.ainvoke(state))
+
+def initial_state():
+    return {"job_id": "job-1", "streaming": False, "script_data": None, "blueprint": None,
+            "video_path": None, "completed_stages": [], "progress": 0}
+
+def test_resume_skips_stages_with_checkpoints(tmp_path):
+    calls = []
+    with pytest.raises(RuntimeError):
+        run(make_stages(calls, tmp_path, fail_render=True), initial_state())
+
+    assert calls == ["script", "blueprint", "render"]
+    assert load_checkpoints("job-1")["make_blueprint"] == {"blueprint": {"storyboard": [1]}, "progress": 50}
+
+    calls.clear()
+    stages = make_stages(calls, tmp_path)
+    state = restore_state(initial_state(), stages)
+    final = run(stages, state)
+
+    assert state["completed_stages"] == ["write_script", "make_blueprint"]
+    assert calls == ["render"]
+    assert final["script_data"] == {"scenes": [{"scene_number": 1}]}
+    assert final["progress"] == 85
+
+def test_checkpoint_with_missing_file_is_rerun(tmp_path):
+    calls = []
+    stages = make_stages(calls, tmp_path)
+    run(stages, initial_state())
+    (tmp_path / "video.mp4").unlink()
+
+    state = restore_state(initial_state(), stages)
+
+    assert state["completed_stages"] == ["write_script", "make_blueprint"]
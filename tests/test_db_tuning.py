@@ -0,0 +1,84 @@
+# tests/test_db_tuning.py
+
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import database
+from api import websocket
+from api.websocket import ProgressBuffer
+from models import Base, VideoJob, VideoStatus
+
+@pytest.fixture
+def engine(tmp_path):
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    engine = create_engine(url, **database._engine_options(url))
+    database.tune_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def test_file_databases_use_wal_and_a_sized_pool(engine):
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    assert engine.pool.size() == database.settings.db_pool_size
+
+    # Readers keep going while a write transaction is open
+    writer = engine.connect()
+    writer.execute(text("BEGIN IMMEDIATE"))
+    writer.execute(text("INSERT INTO video_jobs (id, topic, style) VALUES ('w', 't', 's')"))
+    with engine.connect() as reader:
+        assert reader.execute(text("SELECT count(*) FROM video_jobs")).scalar() == 0
+    writer.rollback()
+    writer.close()
+
+def test_progress_buffer_keeps_latest_update_and_skips_finished_jobs(engine, monkeypatch):
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    db = Session()
+    db.add(VideoJob(id="running", topic="t", style="s", status=VideoStatus.PROCESSING))
+    db.add(VideoJob(id="done", topic="t", style="s", status=VideoStatus.COMPLETED, progress=100, message="Video ready"))
+    db.commit()
+
+    commits = []
+    original = database.SessionLocal
+    def counting_session():
+        session = original()
+        commit = session.commit
+        session.commit = lambda: (commits.append(threading.get_ident()), commit())
+        return session
+    monkeypatch.setattr(database, "SessionLocal", counting_session)
+
+    async def report():
+        buffer = ProgressBuffer(interval=60)
+        for step in range(50):
+            buffer.put("running", step, f"Scene {step}")
+        buffer.put("done", 40, "Rendering")
+        await buffer.close()
+
+    asyncio.run(report())
+
+    db.expire_all()
+    assert len(commits) == 1
+    assert (db.get(VideoJob, "running").progress, db.get(VideoJob, "running").message) == (49, "Scene 49")
+    assert (db.get(VideoJob, "done").progress, db.get(VideoJob, "done").message) == (100, "Video ready")
+    db.close()
+
+def test_in_process_progress_is_written_behind_as_well(monkeypatch):
+    buffer = ProgressBuffer(interval=60)
+    monkeypatch.setattr(websocket, "progress_buffer", buffer)
+    monkeypatch.setattr(websocket.manager, "persist_progress", False)
+    reported = []
+    monkeypatch.setattr(websocket.status_cache, "report_progress", lambda *args: reported.append(args))
+
+    async def report():
+        await websocket.manager.send_progress("job-1", "rendering", 60, "Rendering")
+        pending = dict(buffer._pending)
+        buffer._task.cancel()
+        return pending
+
+    assert asyncio.run(report()) == {"job-1": (60, "Rendering")}
+    assert reported == [("job-1", 60, "Rendering")]
@@ -0,0 +1,47 @@
+# tests/test_hybrid_renderer.py
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("moviepy")
+
+from config import settings
+from services.hybrid_video_renderer import HybridVideoRenderer
+
+class FakeLottie:
+    def create_placeholder_animations(self):
+        pass
+
+    def get_default_intro(self):
+        return "intro.json"
+
+    def get_default_outro(self):
+        return "outro.json"
+
+    def render_to_video(self, animation, output_path, **options):
+        Path(output_path).write_bytes(b"lottie")
+        return output_path
+
+class FakeMoviePy:
+    def render(self, blueprint, script_data, audio_path=None, output_path=None):
+        Path(output_path).write_bytes(script_data["topic"].encode())
+        return output_path
+
+def test_concurrent_jobs_render_to_their_own_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path / "temp_files"))
+    monkeypatch.setattr(settings, "output_dir", str(tmp_path / "generated_videos"))
+    Path(settings.output_dir).mkdir()
+    renderer = HybridVideoRenderer()
+    renderer.lottie, renderer.moviepy = FakeLottie(), FakeMoviePy()
+    joined = []
+    renderer._concatenate_videos = lambda paths, output, name=None: (joined.append(paths), Path(output).write_bytes(b"joined"))
+    renderer._add_audio = lambda video, audio, output: Path(output).write_bytes(b"voiced")
+
+    first = renderer.render({}, {"topic": "Tides"}, "narration.wav", job_id="job-a")
+    second = renderer.render({}, {"topic": "Tides"}, None, job_id="job-b")
+
+    assert first != second
+    assert Path(first).name == "hybrid_Tides_job-a.mp4" and Path(second).name == "hybrid_Tides_job-b.mp4"
+    assert all("job-a" in Path(path).name for path in joined[0])
+    assert all("job-b" in Path(path).name for path in joined[1])
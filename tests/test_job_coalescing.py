@@ -0,0 +1,53 @@
+# tests/test_job_coalescing.py
+
+from datetime import datetime, timedelta
+
+from config import settings
+from models import VideoJob, VideoStatus
+from workflows.job_queue import find_reusable_job, request_fingerprint
+
+REQUEST = {
+    "topic": "How  Rainbows Form",
+    "style_analysis": {"style": "2D explainer", "tone": "educational"},
+    "llm_provider": "mistral",
+    "priority": 0,
+    "use_cache": True,
+}
+
+def test_fingerprint_ignores_scheduling_fields_and_topic_spacing():
+    same = {**REQUEST, "topic": "how rainbows form ", "priority": 7, "use_cache": False}
+    other_style = {**REQUEST, "style_analysis": {"style": "whiteboard", "tone": "educational"}}
+
+    assert request_fingerprint(same) == request_fingerprint(REQUEST)
+    assert request_fingerprint(other_style) != request_fingerprint(REQUEST)
+
+def test_reuses_in_flight_and_recent_completed_jobs(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "job_reuse_ttl", 3600)
+    fingerprint = request_fingerprint(REQUEST)
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"mp4")
+
+    db.add(VideoJob(id="failed", topic="t", style="s", request_hash=fingerprint, status=VideoStatus.FAILED))
+    db.add(VideoJob(id="done", topic="t", style="s", request_hash=fingerprint, status=VideoStatus.COMPLETED,
+                    video_path=str(video), completed_at=datetime.now() - timedelta(minutes=5)))
+    db.commit()
+    assert find_reusable_job(db, fingerprint).id == "done"
+
+    # An in-flight run wins over an older artifact
+    db.add(VideoJob(id="running", topic="t", style="s", request_hash=fingerprint, status=VideoStatus.PROCESSING))
+    db.commit()
+    assert find_reusable_job(db, fingerprint).id == "running"
+
+def test_expired_or_missing_artifacts_are_not_reused(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "job_reuse_ttl", 60)
+    fingerprint = request_fingerprint(REQUEST)
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"mp4")
+
+    db.add(VideoJob(id="old", topic="t", style="s", request_hash=fingerprint, status=VideoStatus.COMPLETED,
+                    video_path=str(video), completed_at=datetime.now() - timedelta(hours=2)))
+    db.add(VideoJob(id="deleted", topic="t", style="s", request_hash=fingerprint, status=VideoStatus.COMPLETED,
+                    video_path=str(tmp_path / "gone.mp4"), completed_at=datetime.now()))
+    db.commit()
+
+    assert find_reusable_job(db, fingerprint) is None
@@ -0,0 +1,146 @@
+# tests/test_job_control.py
+
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+import types
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import settings
+from models import VideoJob, VideoStatus
+from utils import subprocesses
+from utils.subprocesses import (
+    ProcessKilled, allow_job_processes, forget_job, job_scope, kill_job_processes, run_process,
+    track_library_processes
+)
+from workflows import checkpoints, job_control, job_worker
+from workflows.job_control import StageTimeout, watchdog
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+@pytest.fixture(autouse=True)
+def pid_dir(tmp_path, monkeypatch):
+    # Stop markers and pid files go under temp_dir
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path))
+
+def test_killing_a_job_stops_its_children_and_refuses_new_ones():
+    errors = []
+
+    def render():
+        with job_scope("job-1"):
+            try:
+                run_process(SLEEP)
+            except ProcessKilled as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=render)
+    thread.start()
+    time.sleep(0.5)
+    started = time.monotonic()
+    assert kill_job_processes("job-1") == 1
+    thread.join(timeout=5)
+
+    assert errors and time.monotonic() - started < 5
+    with job_scope("job-1"), pytest.raises(ProcessKilled):
+        run_process(SLEEP)
+
+    allow_job_processes("job-1")
+    with job_scope("job-1"):
+        assert run_process([sys.executable, "-c", "print('ok')"]).stdout.strip() == "ok"
+
+def test_library_processes_are_killed_with_their_job(tmp_path):
+    # Stands in for a MoviePy writer module, which starts ffmpeg via ``sp.Popen``
+    writer = types.SimpleNamespace()
+    track_library_processes(writer)
+
+    with job_scope("job-9"):
+        process = writer.sp.Popen(SLEEP, stdin=writer.sp.DEVNULL)
+    assert (tmp_path / "pids" / "job-9" / str(process.pid)).exists()
+
+    assert kill_job_processes("job-9") == 1
+    assert process.wait(timeout=5) != 0
+    with job_scope("job-9"), pytest.raises(ProcessKilled):
+        writer.sp.Popen(SLEEP)
+
+    forget_job("job-9")
+    assert "job-9" not in subprocesses._stopped
+    assert not (tmp_path / "pids" / "job-9").exists()
+
+def test_children_of_other_processes_are_killed_through_the_pid_directory(tmp_path):
+    # A CPU pool process registered this child; this process only sees its pid file
+    process = subprocess.Popen(SLEEP)
+    (tmp_path / "pids" / "job-10").mkdir(parents=True)
+    (tmp_path / "pids" / "job-10" / str(process.pid)).touch()
+
+    assert kill_job_processes("job-10") == 1
+    assert process.wait(timeout=5) != 0
+    forget_job("job-10")
+
+def test_subprocess_timeout_kills_the_process():
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_process(SLEEP, timeout=0.2)
+
+@pytest.mark.asyncio
+async def test_watchdog_fails_only_its_own_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "stage_timeouts", {"slow_stage": 0.1})
+
+    async def hangs(state):
+        await asyncio.sleep(30)
+
+    async def times_out_inside(state):
+        raise TimeoutError("llm deadline")
+
+    with pytest.raises(StageTimeout, match="slow_stage"):
+        await watchdog("slow_stage", hangs)({"job_id": "job-2"})
+    allow_job_processes("job-2")
+
+    with pytest.raises(TimeoutError, match="llm deadline") as exc:
+        await watchdog("slow_stage", times_out_inside)({"job_id": "job-3"})
+    assert not isinstance(exc.value, StageTimeout)
+
+@pytest.mark.asyncio
+async def test_cancel_request_stops_a_running_job(Session, tmp_path, monkeypatch):
+    for module in (job_worker, job_control, checkpoints):
+        monkeypatch.setattr(module, "SessionLocal", Session)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    monkeypatch.setattr(job_worker, "AsyncSessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    monkeypatch.setattr(settings, "job_cancel_poll_interval", 0.05)
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path))
+
+    segment = tmp_path / "segments" / "job-4" / "scene_001.mp4"
+    segment.parent.mkdir(parents=True)
+    segment.write_bytes(b"mp4")
+
+    class HangingWorkflow:
+        def __init__(self, llm_provider):
+            pass
+
+        async def process_full_workflow(self, **kwargs):
+            await asyncio.sleep(30)
+
+    import workflows.video_workflow
+    monkeypatch.setattr(workflows.video_workflow, "VideoWorkflow", HangingWorkflow)
+
+    db = Session()
+    db.add(VideoJob(id="job-4", topic="t", style="s", status=VideoStatus.PROCESSING))
+    db.commit()
+
+    task = asyncio.create_task(job_worker.process_video_job("job-4", {"topic": "t", "style_analysis": {}}, "mistral"))
+    watcher = asyncio.create_task(job_worker._watch_cancel("job-4", task))
+    await asyncio.sleep(0.1)
+    db.query(VideoJob).update({VideoJob.cancel_requested: True})
+    db.commit()
+
+    await asyncio.wait_for(task, timeout=5)
+    await watcher
+    await async_engine.dispose()
+
+    db.expire_all()
+    job = db.query(VideoJob).one()
+    assert job.status == VideoStatus.CANCELLED and not job.cancel_requested
+    assert not segment.parent.exists()
+    db.close()
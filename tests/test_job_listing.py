@@ -0,0 +1,85 @@
+# tests/test_job_listing.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from api.routes import list_jobs
+from models import VideoJob, VideoStatus
+
+def page(db, **params):
+    async def request():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db.get_bind().url.database}")
+        try:
+            async with async_sessionmaker(engine)() as session:
+                return await list_jobs(response=response, db=session, **{"limit": 10, "cursor": None, "status": None, **params})
+        finally:
+            await engine.dispose()
+
+    response = Response()
+    jobs = asyncio.run(request())
+    return [job.job_id for job in jobs], response.headers.get("X-Next-Cursor")
+
+def test_cursor_walks_every_job_once_newest_first(db):
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    # Server-default timestamps (whole seconds, many ties) next to ones set from Python
+    for index in range(7):
+        db.add(VideoJob(id=f"tie-{index}", topic="t", style="s", status=VideoStatus.COMPLETED))
+    for index in range(5):
+        db.add(VideoJob(id=f"set-{index}", topic="t", style="s", status=VideoStatus.FAILED,
+                        created_at=base + timedelta(microseconds=index)))
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        ids, cursor = page(db, limit=3, cursor=cursor)
+        seen.extend(ids)
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 12
+    assert seen[:7] == [f"tie-{index}" for index in reversed(range(7))]  # inserted "now", newest
+    assert seen[7:] == [f"set-{index}" for index in reversed(range(5))]
+
+    failed, cursor = page(db, limit=4, status=VideoStatus.FAILED)
+    assert failed == ["set-4", "set-3", "set-2", "set-1"]
+    assert page(db, limit=4, status=VideoStatus.FAILED, cursor=cursor) == (["set-0"], None)
+
+def test_pages_seek_on_the_index_and_bad_cursors_are_rejected(db):
+    plan = " ".join(row[-1] for row in db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM video_jobs WHERE status = 'COMPLETED' "
+        "AND (created_at < '2026' OR (created_at = '2026' AND id < 'x')) "
+        "ORDER BY created_at DESC, id DESC LIMIT 11"
+    )))
+    assert "ix_video_jobs_status_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+    with pytest.raises(HTTPException) as error:
+        page(db, cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+def test_a_page_loads_resource_usage_with_the_rows_in_one_query(db):
+    for index in range(3):
+        db.add(VideoJob(id=f"job-{index}", topic="t", style="s", status=VideoStatus.COMPLETED,
+                        request_data='{"topic": "t"}', resource_usage='{"totals": {"wall_seconds": 1.0}}'))
+    db.commit()
+    statements = []
+
+    async def request():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db.get_bind().url.database}")
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        try:
+            async with async_sessionmaker(engine)() as session:
+                return await list_jobs(response=Response(), db=session, limit=10, cursor=None, status=None)
+        finally:
+            await engine.dispose()
+
+    jobs = asyncio.run(request())
+
+    assert [job.resource_usage for job in jobs] == [{"totals": {"wall_seconds": 1.0}}] * 3
+    assert len(statements) == 1
+    assert "resource_usage" in statements[0] and "request_data" not in statements[0]
@@ -0,0 +1,103 @@
+# tests/test_job_queue.py
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from config import settings
+from models import VideoJob, VideoStatus
+from workflows import job_queue
+from workflows.job_queue import claim_next, enqueue, queue_position, release, renew_lease
+from workflows.job_worker import WorkerPool
+
+@pytest.fixture(autouse=True)
+def queue_db(Session, monkeypatch):
+    monkeypatch.setattr(job_queue, "SessionLocal", Session)
+
+def add_jobs(Session, *priorities):
+    db = Session()
+    jobs = []
+    for index, priority in enumerate(priorities):
+        job = VideoJob(id=f"job-{index}", topic=f"Topic {index}", style="2D explainer")
+        db.add(job)
+        enqueue(db, job, {"topic": job.topic, "style_analysis": {}}, priority=priority)
+        jobs.append(job.id)
+    db.close()
+    return jobs
+
+def test_claims_follow_priority_then_fifo_order(Session):
+    add_jobs(Session, 0, 5, 0, 5)
+
+    db = Session()
+    positions = {job.id: queue_position(db, job) for job in db.query(VideoJob).all()}
+    db.close()
+    assert positions == {"job-1": 1, "job-3": 2, "job-0": 3, "job-2": 4}
+
+    claimed = [claim_next("worker")["job_id"] for _ in range(4)]
+    assert claimed == ["job-1", "job-3", "job-0", "job-2"]
+    assert claim_next("worker") is None
+
+def test_each_job_is_claimed_once_under_contention(Session):
+    add_jobs(Session, *([0] * 20))
+    claimed = []
+
+    def worker(name):
+        while (job := claim_next(name)) is not None:
+            claimed.append(job["job_id"])
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(f"job-{i}" for i in range(20))
+
+def test_expired_lease_is_reclaimed_as_a_resume(Session, monkeypatch):
+    monkeypatch.setattr(settings, "job_max_attempts", 2)
+    add_jobs(Session, 0)
+
+    first = claim_next("crashed-worker")
+    assert first["resume"] is False
+    assert claim_next("other") is None  # lease still valid
+
+    db = Session()
+    db.query(VideoJob).update({VideoJob.lease_expires_at: datetime.now() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+    assert renew_lease("job-0", "other") is False
+    second = claim_next("other")
+    assert second["job_id"] == "job-0" and second["resume"] is True
+    release("job-0", "other")
+
+    db = Session()
+    db.query(VideoJob).update({
+        VideoJob.status: VideoStatus.PROCESSING,
+        VideoJob.lease_expires_at: datetime.now() - timedelta(seconds=1)
+    })
+    db.commit()
+    db.close()
+
+    # Out of attempts: the job is failed instead of handed out again
+    assert claim_next("third") is None
+    db = Session()
+    assert db.query(VideoJob).one().status == VideoStatus.FAILED
+    db.close()
+
+def test_worker_processes_may_start_a_cpu_pool(monkeypatch):
+    started = []
+
+    class Process:
+        def __init__(self, **options):
+            self.options = options
+        def start(self):
+            started.append(self.options)
+
+    monkeypatch.setattr(settings, "job_workers", 2)
+    pool = WorkerPool()
+    monkeypatch.setattr(pool._context, "Process", Process)
+    pool.start()
+
+    # A daemonic worker could not fork the ProcessPoolExecutor render_node uses with CPU_WORKERS>0
+    assert [options["daemon"] for options in started] == [False, False]
@@ -0,0 +1,38 @@
+# tests/test_json_stream.py
+
+import json
+
+from utils.json_stream import SceneStreamParser
+
+SCRIPT = {
+    "scenes": [
+        {"scene_number": 1, "duration": 15, "narration_text": "Braces { and } inside \"strings\"", "concept": "A", "explanation": "x"},
+        {"scene_number": 2, "duration": 20, "narration_text": "Second", "concept": "B", "explanation": "y"},
+        {"scene_number": 3, "duration": 10, "narration_text": "Third", "concept": "C", "explanation": "z"},
+    ]
+}
+
+def test_scenes_emitted_as_soon_as_they_close():
+    text = "Here is your script:\n```json\n" + json.dumps(SCRIPT) + "\n```"
+    parser = SceneStreamParser()
+
+    emitted = []
+    seen_at = []
+    for i in range(0, len(text), 7):
+        for scene in parser.feed(text[i:i + 7]):
+            emitted.append(scene)
+            seen_at.append(i + 7)
+
+    assert emitted == SCRIPT["scenes"]
+    # The first scene is available long before the document ends
+    assert seen_at[0] < len(text) // 2
+    assert parser.complete
+
+def test_incomplete_scene_is_held_back():
+    text = json.dumps(SCRIPT)
+    cut = text.index('"Second"')
+    parser = SceneStreamParser()
+
+    assert [s["scene_number"] for s in parser.feed(text[:cut])] == [1]
+    assert not parser.complete
+    assert [s["scene_number"] for s in parser.feed(text[cut:])] == [2, 3]
@@ -0,0 +1,56 @@
+# tests/test_llm_cache.py
+
+import time
+
+from services.llm_cache import LLMResponseCache
+
+def make_cache(tmp_path, **kwargs):
+    return LLMResponseCache(path=str(tmp_path / "llm_cache.db"), **kwargs)
+
+def test_key_covers_provider_model_temperature_and_version():
+    inputs = {"topic": "Neural Networks", "style": "2D explainer", "duration": 120}
+    base = LLMResponseCache.make_key("script", "mistral", "mistral-large-latest", 0.7, "script-v1", inputs)
+
+    assert base == LLMResponseCache.make_key("script", "mistral", "mistral-large-latest", 0.7, "script-v1", dict(inputs))
+    assert base != LLMResponseCache.make_key("script", "phi3", "phi3:mini", 0.7, "script-v1", inputs)
+    assert base != LLMResponseCache.make_key("script", "mistral", "mistral-large-latest", 0.2, "script-v1", inputs)
+    assert base != LLMResponseCache.make_key("script", "mistral", "mistral-large-latest", 0.7, "script-v2", inputs)
+    assert base != LLMResponseCache.make_key("script", "mistral", "mistral-large-latest", 0.7, "script-v1", {**inputs, "duration": 60})
+
+def test_hit_miss_and_stats(tmp_path):
+    cache = make_cache(tmp_path, ttl=60, max_bytes=10000)
+    key = LLMResponseCache.make_key("script", "mistral", "m", 0.7, "v1", {"topic": "x"})
+
+    assert cache.get(key) is None
+    cache.set(key, {"scenes": [{"scene_number": 1}]})
+    assert cache.get(key) == {"scenes": [{"scene_number": 1}]}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["namespaces"]["script"]["hits"] == 1
+    assert stats["entries"] == 1
+
+def test_ttl_expiry(tmp_path):
+    cache = make_cache(tmp_path, ttl=0.05, max_bytes=10000)
+    key = LLMResponseCache.make_key("blueprint", "mistral", "m", 0.6, "v1", {"scenes": "[]"})
+
+    cache.set(key, {"storyboard": []})
+    time.sleep(0.1)
+
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+def test_size_eviction_drops_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, ttl=60, max_bytes=250)
+    keys = [LLMResponseCache.make_key("script", "mistral", "m", 0.7, "v1", {"topic": str(i)}) for i in range(3)]
+
+    cache.set(keys[0], {"text": "a" * 100})
+    cache.set(keys[1], {"text": "b" * 100})
+    cache.get(keys[0])  # keys[1] is now the least recently used
+    cache.set(keys[2], {"text": "c" * 100})
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
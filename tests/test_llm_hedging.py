@@ -0,0 +1,148 @@
+# tests/test_llm_hedging.py
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from config import settings
+from services import script_generator
+from services.llm_cache import LLMResponseCache
+from services.llm_hedging import LatencyTracker, hedged_call, latency_tracker
+from services.script_generator import ScriptGenerator
+from services.service_registry import registry
+from services.structured_output import SCRIPT_SCHEMA, StructuredOutput
+
+@pytest.fixture(autouse=True)
+def fast_hedging(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_default_delay", 0.05)
+    monkeypatch.setattr(settings, "llm_hedge_min_delay", 0.0)
+    monkeypatch.setattr(settings, "llm_call_deadline", 2.0)
+    latency_tracker._samples.clear()
+
+def reply(value, delay, events=None, fail=False):
+    async def call():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if events is not None:
+                events.append(f"{value} cancelled")
+            raise
+        if fail:
+            raise RuntimeError(f"{value} failed")
+        return value
+    return call
+
+def test_fast_primary_never_hedges():
+    events = []
+    result = asyncio.run(hedged_call("test", reply("mistral", 0.0), reply("phi3", 0.0, events)))
+
+    assert result == ("mistral", "primary")
+    assert events == []
+
+def test_slow_primary_is_hedged_and_cancelled():
+    events = []
+    result = asyncio.run(hedged_call("test", reply("mistral", 1.0, events), reply("phi3", 0.01)))
+
+    assert result == ("phi3", "secondary")
+    assert events == ["mistral cancelled"]
+
+def test_primary_failure_fires_secondary_immediately(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_default_delay", 10.0)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await hedged_call("test", reply("mistral", 0.0, fail=True), reply("phi3", 0.0))
+        return result, loop.time() - started
+
+    result, elapsed = asyncio.run(run())
+
+    assert result == ("phi3", "secondary")
+    assert elapsed < 1.0
+
+def test_deadline_cancels_everything(monkeypatch):
+    monkeypatch.setattr(settings, "llm_call_deadline", 0.1)
+    events = []
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(hedged_call("test", reply("mistral", 1.0, events), reply("phi3", 1.0, events)))
+
+    assert sorted(events) == ["mistral cancelled", "phi3 cancelled"]
+
+def test_hedge_delay_follows_observed_percentile(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_min_samples", 10)
+    tracker = LatencyTracker()
+
+    for seconds in range(1, 10):
+        tracker.record("script", float(seconds))
+    assert tracker.hedge_delay("script") == settings.llm_hedge_default_delay
+
+    for seconds in range(10, 101):
+        tracker.record("script", float(seconds))
+    assert tracker.hedge_delay("script") == 95.0
+
+def scene(number, model):
+    return {"scene_number": number, "duration": 10, "narration_text": f"{model} {number}", "concept": "c", "explanation": "e"}
+
+class FakeChains:
+    def __init__(self, model, first_scene_after):
+        self.model = model
+        self.first_scene_after = first_scene_after
+
+    async def ainvoke(self, inputs):
+        return {"scenes": [scene(1, self.model), scene(2, self.model)]}
+
+    async def astream(self, inputs):
+        text = json.dumps({"scenes": [scene(1, self.model), scene(2, self.model)]})
+        await asyncio.sleep(self.first_scene_after)
+        for start in range(0, len(text), 20):
+            yield text[start:start + 20]
+
+def make_script_generator(provider, first_scene_after):
+    generator = ScriptGenerator.__new__(ScriptGenerator)
+    generator.llm_provider = provider
+    generator.model_name = provider
+    generator.temperature = 0.7
+    generator.chain = generator.stream_chain = FakeChains(provider, first_scene_after)
+    generator.structured = StructuredOutput(None, SCRIPT_SCHEMA, "video script")
+    return generator
+
+@pytest.mark.parametrize("stall, model", [(0.0, "mistral"), (1.0, "phi3")])
+def test_stalled_script_stream_is_hedged_and_only_primary_answers_are_cached(tmp_path, monkeypatch, stall, model):
+    cache = LLMResponseCache(path=str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(script_generator, "llm_cache", cache)
+    monkeypatch.setattr(settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(settings, "llm_hedge_enabled", True)
+    backup = make_script_generator("phi3", 0.0)
+    monkeypatch.setattr(registry, "script_generator", lambda provider: backup)
+    generator = make_script_generator("mistral", stall)
+    streamed = []
+
+    script = asyncio.run(generator.astream_script("Tides", "2D", 20, streamed.append))
+
+    # Scenes are never mixed from both models
+    assert [s["narration_text"] for s in streamed] == [f"{model} 1", f"{model} 2"]
+    assert script["narration"] == f"{model} 1 {model} 2"
+    assert (cache.get(generator._cache_key("Tides", "2D", 20)) is not None) == (model == "mistral")
+
+def test_streamed_scenes_are_validated_before_they_are_rendered(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_enabled", False)
+    generator = make_script_generator("mistral", 0.0)
+    broken = {"scene_number": 2, "duration": "long", "narration_text": "mistral 2"}
+
+    async def astream(inputs):
+        yield json.dumps({"scenes": [scene(1, "mistral"), broken]})
+
+    generator.stream_chain = type("Stream", (), {"astream": staticmethod(astream)})()
+    # Only the broken scene is re-asked for; the repaired one is what reaches on_scene
+    generator.structured = StructuredOutput(
+        RunnableLambda(lambda _: json.dumps({"scenes[0]": scene(2, "repaired")})), SCRIPT_SCHEMA, "video script"
+    )
+    streamed = []
+
+    script = asyncio.run(generator.astream_script("Tides", "2D", 20, streamed.append, use_cache=False))
+
+    assert [s["narration_text"] for s in streamed] == ["mistral 1", "repaired 2"]
+    assert script["scenes"] == streamed
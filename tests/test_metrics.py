@@ -0,0 +1,63 @@
+# tests/test_metrics.py
+
+import os
+import sys
+
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from utils import metrics
+from utils.metrics import CACHE_LOOKUPS, clear_earlier_samples, render_metrics, scrape_gauge, timed_node
+from utils.subprocesses import run_process
+
+@pytest.fixture(autouse=True)
+def no_database_gauges(monkeypatch):
+    # The job gauges query the application database; these tests only use their own
+    monkeypatch.setattr(metrics, "_scrape_gauges", {})
+
+def sample(name: str, **labels) -> float:
+    body, _ = render_metrics()
+    for family in text_string_to_metric_families(body.decode()):
+        for s in family.samples:
+            if s.name == name and all(s.labels.get(k) == v for k, v in labels.items()):
+                return s.value
+    return 0.0
+
+@pytest.mark.asyncio
+async def test_node_timings_are_labelled_by_outcome():
+    async def probe_node(state):
+        return state
+
+    async def failing_probe_node(state):
+        raise ValueError("boom")
+
+    before = sample("video_node_duration_seconds_count", node="probe_node", outcome="ok")
+    await timed_node(probe_node)({})
+    with pytest.raises(ValueError):
+        await timed_node(failing_probe_node)({})
+
+    assert sample("video_node_duration_seconds_count", node="probe_node", outcome="ok") == before + 1
+    assert sample("video_node_duration_seconds_count", node="failing_probe_node", outcome="error") >= 1
+
+def test_subprocess_calls_are_timed():
+    program = sys.executable.rsplit("/", 1)[-1]
+    before = sample("video_subprocess_duration_seconds_count", program=program, outcome="failed")
+    run_process([sys.executable, "-c", "raise SystemExit(3)"])
+    assert sample("video_subprocess_duration_seconds_count", program=program, outcome="failed") == before + 1
+
+def test_scrape_gauges_and_cache_hit_ratio():
+    scrape_gauge("video_test_depth", "Test gauge", ("lane",))(lambda: {("fast",): 3, ("slow",): 1})
+    CACHE_LOOKUPS.labels("probe", "hit").inc(3)
+    CACHE_LOOKUPS.labels("probe", "miss").inc(1)
+
+    assert sample("video_test_depth", lane="fast") == 3
+    assert sample("video_llm_cache_hit_ratio", namespace="probe") == pytest.approx(0.75)
+
+def test_earlier_samples_are_cleared_but_own_files_kept(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    for name in ("histogram_1.db", f"histogram_{os.getpid()}.db", "counter_2.db"):
+        (tmp_path / name).write_bytes(b"")
+
+    clear_earlier_samples()
+
+    assert [path.name for path in tmp_path.iterdir()] == [f"histogram_{os.getpid()}.db"]
@@ -0,0 +1,73 @@
+# tests/test_replay_providers.py
+
+import asyncio
+import wave
+
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from config import settings
+from services.replay_providers import LatencyModel, RecordingLLM, ReplayLLM, ReplayTTS
+from services.structured_output import RepairingJsonOutputParser
+
+PROMPT = ChatPromptTemplate.from_messages([("human", "Write a script about {topic}")])
+
+@pytest.fixture(autouse=True)
+def replay_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "replay_dir", str(tmp_path))
+    return tmp_path
+
+def test_recorded_responses_replay_through_the_same_chain():
+    live = RunnableLambda(lambda prompt: '{"scenes": [{"scene_number": 1}]}')
+    recorded = asyncio.run((PROMPT | RecordingLLM(live) | RepairingJsonOutputParser()).ainvoke({"topic": "gravity"}))
+
+    replay = PROMPT | ReplayLLM(LatencyModel("none")) | RepairingJsonOutputParser()
+
+    assert asyncio.run(replay.ainvoke({"topic": "gravity"})) == recorded
+    with pytest.raises(LookupError):
+        replay.invoke({"topic": "magnets"})
+
+def test_replay_streams_in_chunks_with_synthetic_latency():
+    text = '{"scenes": [' + ", ".join('{"scene_number": %d}' % n for n in range(1, 20)) + "]}"
+    RecordingLLM(RunnableLambda(lambda prompt: text)).invoke(PROMPT.invoke({"topic": "gravity"}))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        chunks = [c async for c in (PROMPT | ReplayLLM(LatencyModel("fixed:0.2"))).astream({"topic": "gravity"})]
+        return chunks, loop.time() - started
+
+    chunks, elapsed = asyncio.run(run())
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert 0.2 <= elapsed < 1.0
+
+def test_latency_models_are_seeded_and_validated():
+    first = [LatencyModel("lognormal:0,0.5", seed=7).sample() for _ in range(3)]
+    second = [LatencyModel("lognormal:0,0.5", seed=7).sample() for _ in range(3)]
+
+    assert first == second
+    assert LatencyModel("recorded").sample(1.5) == 1.5
+    assert LatencyModel("normal:-5,0.1").sample() == 0.0
+    with pytest.raises(ValueError):
+        LatencyModel("uniform:1")
+
+def test_tts_replay_serves_recording_or_sized_silence(tmp_path):
+    source = tmp_path / "narration.wav"
+    with wave.open(str(source), 'wb') as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(8000)
+        writer.writeframes(b"\x01\x00" * 8000)
+
+    tts = ReplayTTS(LatencyModel("none"))
+    tts.record("Hello there", "en", str(source), 0.3)
+
+    replayed = tts.replay("Hello there", "en", tmp_path)
+    assert open(replayed, 'rb').read() == source.read_bytes()
+
+    silence = tts.replay("ten words of narration that nobody ever recorded before today", "en", tmp_path)
+    with wave.open(silence, 'rb') as reader:
+        assert reader.getnframes() / reader.getframerate() == pytest.approx(4.0)
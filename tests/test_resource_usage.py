@@ -0,0 +1,69 @@
+# tests/test_resource_usage.py
+
+import sys
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from config import settings
+from services.llm_instrumentation import InstrumentedLLM
+from services.tts_generator import TTSGenerator
+from utils.resource_usage import finish_job, merge_usage, record_tts, start_job, summarize_usage
+from utils.subprocesses import job_scope, run_process
+from workflows.job_control import accounted
+
+@pytest.mark.asyncio
+async def test_stage_usage_is_charged_to_the_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path))
+    start_job("job-1")
+    audio = tmp_path / "narration.wav"
+    llm = InstrumentedLLM(RunnableLambda(lambda prompt: "x" * 40), "fake")
+
+    async def tts_node(state):
+        llm.invoke("p" * 20)
+        record_tts(120)
+        run_process([sys.executable, "-c", "sum(i * i for i in range(3_000_000))"])
+        audio.write_bytes(b"\0" * 4096)
+        return {**state, "audio_path": str(audio)}
+
+    with job_scope("job-1"):
+        await accounted("generate_audio", tts_node)({"job_id": "job-1", "audio_path": None})
+    usage = finish_job("job-1")
+
+    stage = usage["stages"]["generate_audio"]
+    assert stage["bytes_written"] == 4096
+    assert stage["child_cpu_seconds"] > 0
+    assert stage["wall_seconds"] >= stage["child_cpu_seconds"] * 0.5
+    assert usage["llm"] == {"calls": 1, "input_tokens": 5, "output_tokens": 10}
+    assert usage["tts"] == {"calls": 1, "characters": 120}
+    assert usage["totals"]["bytes_written"] == 4096
+    assert "generate_audio" in summarize_usage(usage)
+
+def test_calls_outside_a_job_are_not_charged():
+    start_job("job-2")
+    InstrumentedLLM(RunnableLambda(lambda prompt: "ok"), "fake").invoke("hi")
+    assert finish_job("job-2")["llm"]["calls"] == 0
+
+def test_runs_of_a_resumed_job_add_up():
+    first = {"totals": {"wall_seconds": 10, "peak_rss_mb": 300, "child_cpu_seconds": None}, "llm": {"calls": 2}}
+    second = {"totals": {"wall_seconds": 5, "peak_rss_mb": 200, "child_cpu_seconds": 1.5}, "llm": {"calls": 1}}
+
+    merged = merge_usage(first, second)
+    assert merged["totals"] == {"wall_seconds": 15, "peak_rss_mb": 300, "child_cpu_seconds": 1.5}
+    assert merged["llm"] == {"calls": 3}
+
+def test_recorded_narration_is_charged_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "replay_dir", str(tmp_path / "replays"))
+    generator = TTSGenerator("record")
+    live = TTSGenerator("gtts")
+    narration = tmp_path / "live.mp3"
+    narration.write_bytes(b"mp3")
+    monkeypatch.setattr(live, "_generate_gtts", lambda text, lang: str(narration))
+    generator._live_tts = live
+    start_job("job-3")
+
+    with job_scope("job-3"):
+        assert generator.generate_audio("Hello there", "en") == str(narration)
+
+    assert finish_job("job-3")["tts"] == {"calls": 1, "characters": 11}
@@ -0,0 +1,194 @@
+# tests/test_sarvam_batching.py
+
+import base64
+import io
+import json
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from config import settings
+import services.tts_generator as tts_module
+from services.tts_generator import TTSGenerator, _split_text
+
+def make_wav(frames: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(22050)
+        w.writeframes(b'\x00\x00' * frames)
+    return buffer.getvalue()
+
+class StubSarvam(BaseHTTPRequestHandler):
+    requests_seen = []
+    fail_next = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StubSarvam.requests_seen.append(body)
+
+        if StubSarvam.fail_next > 0:
+            StubSarvam.fail_next -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        # Audio length encodes the input length so results can be traced back
+        audios = [base64.b64encode(make_wav(len(text))).decode() for text in body['inputs']]
+        payload = json.dumps({'audios': audios}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSarvam)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    StubSarvam.requests_seen = []
+    StubSarvam.fail_next = 0
+    monkeypatch.setattr(settings, 'sarvam_api_key', 'test-key')
+    monkeypatch.setattr(settings, 'sarvam_api_url', f'http://127.0.0.1:{server.server_port}/text-to-speech')
+    monkeypatch.setattr(settings, 'sarvam_max_inputs', 3)
+    monkeypatch.setattr(settings, 'sarvam_max_chars', 50)
+    monkeypatch.setattr(settings, 'sarvam_backoff', 0)
+    monkeypatch.setattr(settings, 'temp_dir', str(tmp_path))
+    monkeypatch.setattr(tts_module, '_sarvam_session', None)
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+def frame_count(path: str) -> int:
+    with wave.open(path, 'rb') as w:
+        return w.getnframes()
+
+def test_split_text_respects_limit():
+    text = "First sentence here. Second one is a little longer than the first. Third."
+    chunks = _split_text(text, 30)
+    assert all(len(c) <= 30 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_batches_pack_multiple_inputs(stub_server):
+    tts = TTSGenerator(provider="sarvam")
+    texts = [f"Scene {i} narration." for i in range(7)]
+
+    paths = tts.generate_audio_batch(texts, "en")
+
+    assert len(StubSarvam.requests_seen) == 3
+    assert [len(r['inputs']) for r in StubSarvam.requests_seen] == [3, 3, 1]
+    assert [frame_count(p) for p in paths] == [len(t) for t in texts]
+
+def test_long_text_is_split_and_merged(stub_server):
+    tts = TTSGenerator(provider="sarvam")
+    text = "This is a fairly long sentence for one scene. And here is another sentence after it."
+
+    path = tts.generate_audio_batch([text], "en")[0]
+
+    pieces = _split_text(text, 50)
+    assert len(pieces) > 1
+    assert frame_count(path) == sum(len(p) for p in pieces)
+
+def test_scene_audio_mapping(stub_server):
+    tts = TTSGenerator(provider="sarvam")
+    scenes = [
+        {"scene_number": 1, "narration_text": "Intro."},
+        {"scene_number": 2, "narration_text": ""},
+        {"scene_number": 3, "narration_text": "The main idea explained."},
+    ]
+
+    audio = tts.generate_scene_audio(scenes, "en")
+
+    assert set(audio) == {1, 3}
+    assert frame_count(audio[1]) == len("Intro.")
+    assert frame_count(audio[3]) == len("The main idea explained.")
+
+def test_retries_transient_errors_on_pooled_session(stub_server):
+    StubSarvam.fail_next = 1
+    tts = TTSGenerator(provider="sarvam")
+
+    path = tts._generate_sarvam("Retry me.", "en")
+
+    assert len(StubSarvam.requests_seen) == 2
+    assert frame_count(path) == len("Retry me.")
+
+def test_files_written_in_the_same_second_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'temp_dir', str(tmp_path))
+    tts = TTSGenerator(provider="sarvam")
+
+    # Scenes narrated concurrently land within the same timestamp
+    paths = {tts._create_placeholder() for _ in range(5)}
+
+    assert len(paths) == 5
+
+def test_scene_clips_join_into_one_voiceover(stub_server):
+    tts = TTSGenerator(provider="sarvam")
+    audio = tts.generate_scene_audio([
+        {"scene_number": 1, "narration_text": "Intro."},
+        {"scene_number": 2, "narration_text": "The main idea explained."},
+    ], "en")
+
+    voiceover = tts.join_audio([*audio.values(), tts._create_placeholder()])
+
+    assert frame_count(voiceover) == len("Intro.") + len("The main idea explained.")
+
+class BlockingTTS:
+    """Holds the first request open until released, recording what each request narrated."""
+
+    provider = "sarvam"
+
+    def __init__(self):
+        self.requests = []
+        self.release = threading.Event()
+
+    def detect_language(self, text):
+        return "en"
+
+    def generate_scene_audio(self, scenes, language=None):
+        self.requests.append([scene['narration_text'] for scene in scenes])
+        if len(self.requests) == 1:
+            self.release.wait(5)
+        return {scene['scene_number']: f"{scene['narration_text']}.wav" for scene in scenes}
+
+class NullRenderer:
+    def render_segment(self, scene, output_path, audio_path=None):
+        return output_path
+
+def test_streamed_scenes_share_tts_requests(tmp_path, monkeypatch):
+    from services.service_registry import registry
+    from workflows.scene_pipeline import ScenePipeline
+
+    tts = BlockingTTS()
+    monkeypatch.setattr(settings, 'temp_dir', str(tmp_path))
+    monkeypatch.setattr(settings, 'cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(registry, 'tts_generator', lambda *args: tts)
+    monkeypatch.setattr(registry, 'video_renderer', lambda *args: NullRenderer())
+    pipeline = ScenePipeline("job", max_workers=4)
+    scenes = [{"scene_number": n, "narration_text": f"scene {n}"} for n in range(1, 5)]
+
+    try:
+        pipeline.submit(scenes[0])
+        while not tts.requests:
+            time.sleep(0.01)
+        for scene in scenes[1:]:
+            pipeline.submit(scene)
+        time.sleep(0.1)
+        tts.release.set()
+        results = pipeline.collect(scenes)
+    finally:
+        pipeline.shutdown()
+
+    # The first scene is narrated at once, the ones streamed meanwhile in one request
+    assert tts.requests == [["scene 1"], ["scene 2", "scene 3", "scene 4"]]
+    assert [results[n]["audio_path"] for n in range(1, 5)] == [f"scene {n}.wav" for n in range(1, 5)]
@@ -0,0 +1,159 @@
+# tests/test_scene_editor.py
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from api import routes
+from config import settings
+from models import VideoJob, VideoStatus
+from services.service_registry import registry
+from workflows import checkpoints, scene_editor
+from workflows.artifacts import save_artifact
+from workflows.scene_editor import SceneEditor, apply_patch, load_script
+from workflows.scene_pipeline import ScenePipeline
+
+SCRIPT = {
+    "topic": "Gravity",
+    "scenes": [
+        {"scene_number": n, "duration": 10, "narration_text": f"Narration {n}"} for n in (1, 2, 3)
+    ],
+}
+
+class FakeTTS:
+    provider = "fake"
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.calls = []
+
+    def detect_language(self, text):
+        return "en"
+
+    def generate_audio(self, text, language):
+        self.calls.append(text)
+        path = self.tmp_path / f"tts_{len(self.calls)}.wav"
+        path.write_bytes(text.encode())
+        return str(path)
+
+    def generate_scene_audio(self, scenes, language=None):
+        return {scene["scene_number"]: self.generate_audio(scene["narration_text"], language) for scene in scenes}
+
+class FakeRenderer:
+    width, height, fps = 1280, 720, 24
+
+    def __init__(self):
+        self.calls = []
+
+    def render_segment(self, scene, output_path, audio_path=None):
+        self.calls.append(scene["scene_number"])
+        with open(output_path, "w") as f:
+            f.write(json.dumps(scene))
+        return output_path
+
+class FakeHybrid:
+    def render_segments(self, segment_paths, topic="video", job_id=None):
+        self.segment_paths = segment_paths
+        return f"{job_id}.mp4"
+
+@pytest.fixture
+def services(Session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(scene_editor, "SessionLocal", Session)
+
+    db = Session()
+    db.add(VideoJob(id="job-1", topic="Gravity", style="2D explainer", script_data=json.dumps(SCRIPT)))
+    db.commit()
+    db.close()
+
+    fakes = {"tts": FakeTTS(tmp_path), "renderer": FakeRenderer(), "hybrid": FakeHybrid()}
+    monkeypatch.setattr(registry, "_instances", {
+        ("tts_generator", settings.tts_provider): fakes["tts"],
+        ("video_renderer",): fakes["renderer"],
+        ("hybrid_renderer",): fakes["hybrid"],
+    })
+    fakes["Session"] = Session
+    return fakes
+
+def test_apply_patch_updates_scene_and_aggregates():
+    script = apply_patch(json.loads(json.dumps(SCRIPT)), 2, {"narration_text": "New", "style": {"font_size": 40}})
+
+    assert script["scenes"][1] == {"scene_number": 2, "duration": 10, "narration_text": "New", "style": {"font_size": 40}}
+    assert script["voiceover_text"] == "Narration 1 New Narration 3"
+    assert script["total_duration"] == 30
+    with pytest.raises(KeyError):
+        apply_patch(script, 9, {"duration": 5})
+
+def test_edit_rerenders_only_the_changed_scene(services):
+    assert SceneEditor().rebuild("job-1") == "job-1.mp4"
+    assert services["renderer"].calls == [1, 2, 3]
+    first_segments = services["hybrid"].segment_paths
+
+    # The first build read the legacy column; the edit is stored as an artifact
+    db = services["Session"]()
+    save_artifact(db, "job-1", "script", apply_patch(load_script(db, "job-1"), 2, {"narration_text": "Edited"}))
+    db.commit()
+    db.close()
+
+    services["renderer"].calls.clear()
+    services["tts"].calls.clear()
+    SceneEditor().rebuild("job-1")
+
+    assert services["renderer"].calls == [2]
+    assert services["tts"].calls == ["Edited"]
+    segments = services["hybrid"].segment_paths
+    assert segments[0] == first_segments[0] and segments[2] == first_segments[2]
+    assert segments[1] != first_segments[1]
+
+def test_first_edit_after_a_streamed_render_is_incremental(services, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path / "temp"))
+    scenes = json.loads(json.dumps(SCRIPT))["scenes"]
+    pipeline = ScenePipeline("job-1", max_workers=2)
+    try:
+        for scene in scenes:
+            pipeline.submit(scene)
+        pipeline.collect(scenes)
+    finally:
+        pipeline.shutdown()
+
+    db = services["Session"]()
+    save_artifact(db, "job-1", "script", apply_patch(load_script(db, "job-1"), 2, {"narration_text": "Edited"}))
+    db.commit()
+    db.close()
+
+    services["renderer"].calls.clear()
+    services["tts"].calls.clear()
+    SceneEditor().rebuild("job-1")
+
+    # The streamed segments and their narration were adopted into the edit caches
+    assert services["renderer"].calls == [2]
+    assert services["tts"].calls == ["Edited"]
+
+def test_resuming_a_failed_edit_queues_the_edit_again(Session, monkeypatch):
+    monkeypatch.setattr(checkpoints, "SessionLocal", Session)
+    monkeypatch.setattr(routes, "check_admission", lambda db, request_data=None, completed_stages=(): None)
+    db = Session()
+    db.add(VideoJob(id="job-2", topic="Gravity", style="2D explainer", status=VideoStatus.FAILED,
+                    request_data=json.dumps({"topic": "Gravity", "scene_edit": True})))
+    db.commit()
+    # Every stage of the original render is checkpointed, so a plain resume would skip them all
+    checkpoints.save_checkpoint("job-2", checkpoints.INPUTS, {"topic": "Gravity", "style_data": {}})
+    for stage in ("generate_script", "create_blueprint", "render_video", "create_report"):
+        checkpoints.save_checkpoint("job-2", stage, {})
+
+    async def resume():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db.get_bind().url.database}")
+        try:
+            async with async_sessionmaker(engine)() as session:
+                return await routes.resume_job("job-2", db=session)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(resume())
+
+    job = db.get(VideoJob, "job-2", populate_existing=True)
+    assert job.status == VideoStatus.PENDING and not job.resume
+    assert json.loads(job.request_data) == {"topic": "Gravity", "scene_edit": True}
+    db.close()
@@ -0,0 +1,114 @@
+# tests/test_scheduler.py
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from config import settings
+from models import VideoJob, VideoStatus
+from workflows import job_queue
+from workflows.cost_model import CostModel, prior_seconds
+from workflows.job_queue import claim_next, enqueue, queue_plan
+
+@pytest.fixture(autouse=True)
+def queue_db(Session, monkeypatch):
+    monkeypatch.setattr(job_queue, "SessionLocal", Session)
+
+def add_job(db, job_id, estimated, tenant="default", queued_ago=0, status=VideoStatus.PENDING, **fields):
+    db.add(VideoJob(
+        id=job_id, topic=job_id, style="2D explainer", status=status, tenant=tenant,
+        estimated_seconds=estimated, priority=0, attempts=0,
+        queued_at=datetime.now() - timedelta(seconds=queued_ago), **fields
+    ))
+    db.commit()
+
+def claim_all():
+    order = []
+    while (claimed := claim_next("worker")) is not None:
+        order.append(claimed["job_id"])
+    return order
+
+def test_sjf_runs_short_jobs_first_but_ages_long_ones(Session, monkeypatch):
+    monkeypatch.setattr(settings, "job_scheduler", "sjf")
+    monkeypatch.setattr(settings, "job_aging_seconds", 60.0)
+    db = Session()
+    add_job(db, "long", 600, queued_ago=30)
+    add_job(db, "short", 60, queued_ago=20)
+    add_job(db, "starved", 900, queued_ago=3600)  # 900 / (1 + 60) ~ 15s effective
+    db.close()
+
+    assert claim_all() == ["starved", "short", "long"]
+
+def test_fair_scheduler_interleaves_tenants_by_weight(Session, monkeypatch):
+    monkeypatch.setattr(settings, "job_scheduler", "fair")
+    monkeypatch.setattr(settings, "tenant_weights", {"big": 2.0})
+    db = Session()
+    for index in range(4):
+        add_job(db, f"big-{index}", 100, tenant="big", queued_ago=100 - index)
+    add_job(db, "small-0", 100, tenant="small", queued_ago=50)
+    add_job(db, "small-1", 100, tenant="small", queued_ago=49)
+    db.close()
+
+    # "big" may use twice the render time of "small" before yielding
+    assert claim_all() == ["big-0", "small-0", "big-1", "big-2", "small-1", "big-3"]
+
+def test_queue_plan_hands_jobs_to_the_first_free_worker(Session, monkeypatch):
+    monkeypatch.setattr(settings, "job_scheduler", "sjf")
+    monkeypatch.setattr(settings, "job_workers", 2)
+    db = Session()
+    add_job(db, "running", 100, status=VideoStatus.PROCESSING, started_at=datetime.now() - timedelta(seconds=40))
+    add_job(db, "b", 50, queued_ago=10)
+    add_job(db, "a", 30, queued_ago=5)
+    add_job(db, "c", 80, queued_ago=1)
+
+    plan = queue_plan(db)
+    db.close()
+
+    assert plan["running"] == (None, pytest.approx(60, abs=1))
+    assert plan["a"] == (1, 30)  # idle worker
+    assert plan["b"] == (2, 80)  # after "a" on the same worker
+    assert plan["c"][0] == 3 and plan["c"][1] == pytest.approx(140, abs=1)  # after "running"
+
+def test_queue_plan_is_reused_and_takes_new_jobs_at_the_back(Session, monkeypatch):
+    monkeypatch.setattr(settings, "job_scheduler", "fifo")
+    monkeypatch.setattr(settings, "job_workers", 1)
+    monkeypatch.setattr(settings, "queue_plan_ttl", 60.0)
+    db = Session()
+    add_job(db, "a", 100, queued_ago=10)
+    builds = []
+    build_plan = job_queue._build_plan
+    monkeypatch.setattr(job_queue, "_build_plan", lambda db: builds.append(1) or build_plan(db))
+
+    assert queue_plan(db)["a"] == (1, 100)
+    job = VideoJob(id="b", topic="b", style="2D explainer")
+    db.add(job)
+    enqueue(db, job, {"topic": "b"})
+    plan, cost = queue_plan(db), job.estimated_seconds
+    db.close()
+
+    # Still the first plan, with "b" queued after "a" on the only worker
+    assert len(builds) == 1
+    assert plan["b"][0] == 2 and plan["b"][1] == pytest.approx(100 + cost, abs=1)
+
+def test_cost_model_scales_with_length_and_learns_from_history(Session):
+    model = CostModel()
+    db = Session()
+    request = {"topic": "Queues", "style_analysis": {"style": "whiteboard/doodle"}, "video_duration": 60}
+
+    short = model.total_seconds(db, request)
+    assert model.total_seconds(db, {**request, "video_duration": 300}) > short
+    assert "generate_script" not in model.estimate(db, request, completed_stages=["generate_script"])
+    assert set(model.estimate(db, {"topic": "Queues", "scene_edit": True})) == {"generate_audio", "render_video"}
+
+    # A finished whiteboard job whose render took twice the prior
+    add_job(
+        db, "done", None, status=VideoStatus.COMPLETED, completed_at=datetime.now(),
+        request_data=json.dumps(request),
+        resource_usage=json.dumps({"stages": {"render_video": {"wall_seconds": 2 * prior_seconds("render_video", 4, 60)}}})
+    )
+    model = CostModel()
+    estimate = model.estimate(db, request)
+    db.close()
+
+    assert estimate["render_video"] == pytest.approx(2 * prior_seconds("render_video", 4, 60), abs=0.1)
+    assert estimate["generate_script"] == pytest.approx(prior_seconds("generate_script", 4, 60), abs=0.1)
@@ -0,0 +1,58 @@
+# tests/test_stage_graph.py
+
+import asyncio
+import time
+from typing import Optional, TypedDict
+
+import pytest
+
+from workflows.stage_graph import build_stage_graph, plan_waves
+
+class DemoState(TypedDict):
+    script: Optional[str]
+    blueprint: Optional[str]
+    audio: Optional[str]
+    video: Optional[str]
+    progress: int
+
+async def script(state):
+    return {**state, "script": "script", "progress": 25}
+
+async def blueprint(state):
+    await asyncio.sleep(0.2)
+    return {**state, "blueprint": f"blueprint({state['script']})", "progress": 50}
+
+async def audio(state):
+    await asyncio.sleep(0.2)
+    return {**state, "audio": f"audio({state['script']})", "progress": 70}
+
+async def render(state):
+    return {**state, "video": f"video({state['blueprint']}, {state['audio']})", "progress": 85}
+
+STAGES = {
+    "write_script": (script, []),
+    "make_blueprint": (blueprint, ["write_script"]),
+    "make_audio": (audio, ["write_script"]),
+    "render_video": (render, ["make_blueprint", "make_audio"]),
+}
+
+def test_plan_waves_groups_independent_stages():
+    assert plan_waves(STAGES) == [["write_script"], ["make_blueprint", "make_audio"], ["render_video"]]
+
+def test_plan_waves_rejects_cycles_and_unknown_stages():
+    with pytest.raises(ValueError):
+        plan_waves({"a": (script, ["b"]), "b": (script, ["a"])})
+    with pytest.raises(ValueError):
+        plan_waves({"a": (script, ["missing"])})
+
+def test_independent_stages_run_concurrently_and_join():
+    graph = build_stage_graph(DemoState, STAGES)
+    initial = {"script": None, "blueprint": None, "audio": None, "video": None, "progress": 0}
+
+    started = time.monotonic()
+    final = asyncio.run(graph.ainvoke(initial))
+    elapsed = time.monotonic() - started
+
+    assert final["video"] == "video(blueprint(script), audio(script))"
+    assert final["progress"] == 85
+    assert elapsed < 0.35
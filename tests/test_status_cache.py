@@ -0,0 +1,116 @@
+# tests/test_status_cache.py
+
+import asyncio
+import time
+
+import pytest
+from fastapi import Response
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import database
+from api import routes, websocket
+from api.routes import get_job_status
+from api.status_cache import StatusCache
+from models import VideoJob, VideoJobResponse, VideoStatus
+
+class NoDatabase:
+    def __getattr__(self, name):
+        raise AssertionError(f"status poll touched the database ({name})")
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = StatusCache(ttl=30, max_entries=100)
+    monkeypatch.setattr(routes, "status_cache", cache)
+    monkeypatch.setattr(websocket, "status_cache", cache)
+    return cache
+
+@pytest.fixture
+def Session(Session, monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    db = Session()
+    db.add(VideoJob(id="job", topic="t", style="s", status=VideoStatus.PROCESSING, progress=10, message="Writing script"))
+    db.commit()
+    db.close()
+    return Session
+
+def poll(db, wait=0, if_none_match=None):
+    response = Response()
+    result = asyncio.get_running_loop().create_task(get_job_status("job", response, wait, if_none_match, db))
+    return result, response
+
+def test_repeat_polls_are_answered_from_the_cache(Session, cache, tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+        async with async_sessionmaker(engine)() as db:
+            task, response = poll(db)
+            first = await task
+        await engine.dispose()
+        etag = response.headers["etag"]
+
+        task, response = poll(NoDatabase())
+        assert (await task) == first and response.headers["etag"] == etag
+
+        task, _ = poll(NoDatabase(), if_none_match=etag)
+        not_modified = await task
+        assert not_modified.status_code == 304 and not_modified.headers["etag"] == etag
+
+        # A long poll on an unchanged job gives up with a 304 after `wait` seconds
+        task, _ = poll(NoDatabase(), wait=0.2, if_none_match=etag)
+        assert (await task).status_code == 304
+
+    asyncio.run(run())
+
+def test_long_poll_returns_once_the_relay_sees_the_row_change(Session, cache, tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+        relay = asyncio.create_task(websocket.relay_progress(0.05, forward=False))
+        try:
+            async with async_sessionmaker(engine)() as db:
+                task, response = poll(db)
+                await task
+                etag = response.headers["etag"]
+
+                task, response = poll(db, wait=10, if_none_match=etag)
+                await asyncio.sleep(0.2)
+                assert not task.done()
+
+                db_sync = Session()
+                db_sync.get(VideoJob, "job").progress = 60
+                db_sync.commit()
+                started = time.monotonic()
+                progressed = await task
+                assert progressed.progress == 60 and time.monotonic() - started < 1
+                assert response.headers["etag"] != etag
+
+                # A new status is reloaded from the row, with the fields only it carries
+                task, response = poll(db, wait=10, if_none_match=response.headers["etag"])
+                job = db_sync.get(VideoJob, "job")
+                job.status, job.progress, job.video_path = VideoStatus.COMPLETED, 100, "out/job.mp4"
+                db_sync.commit()
+                db_sync.close()
+                completed = await task
+                assert (completed.status, completed.video_url) == (VideoStatus.COMPLETED, "out/job.mp4")
+        finally:
+            relay.cancel()
+            await engine.dispose()
+
+    asyncio.run(run())
+
+def test_progress_of_in_process_jobs_survives_a_reload_from_the_row():
+    async def run():
+        cache = StatusCache(ttl=30, max_entries=2)
+        row = VideoJobResponse(job_id="job", status=VideoStatus.PROCESSING, topic="t", style="s", progress=0, message="Starting")
+        entry = cache.put(row)
+
+        cache.report_progress("job", 45, "Scene 3")
+        assert entry.changed.is_set()
+        assert cache.put(row, keep_live=True).response.progress == 45
+        # The relay's view of the row lags behind what the job reported here
+        cache.update("job", VideoStatus.PROCESSING, 0, "Starting", None)
+        assert cache.get("job").response.message == "Scene 3"
+
+        cache.put(row.model_copy(update={"job_id": "a"}))
+        cache.put(row.model_copy(update={"job_id": "b"}))
+        assert cache.get("job") is None and cache.watched() == ["a", "b"]
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+# tests/test_storage.py
+
+import json
+import os
+import time
+
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from config import settings
+from models import JobCheckpoint, VideoJob, VideoStatus
+from utils import metrics
+from utils.metrics import render_metrics
+from workflows import storage
+from workflows.storage import StorageLifecycle, touch
+
+HOUR = 3600
+
+@pytest.fixture
+def root(Session, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "SessionLocal", Session)
+    monkeypatch.setattr(metrics, "_scrape_gauges", {})  # the job gauges query the application database
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path / "temp_files"))
+    monkeypatch.setattr(settings, "output_dir", str(tmp_path / "generated_videos"))
+    monkeypatch.setattr(settings, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "storage_cache_ttl", 7 * 24 * HOUR)
+    monkeypatch.setattr(settings, "storage_temp_ttl", 24 * HOUR)
+    monkeypatch.setattr(settings, "storage_video_ttl", 0)
+    monkeypatch.setattr(settings, "storage_report_ttl", 30 * 24 * HOUR)
+    monkeypatch.setattr(settings, "storage_quota_mb", 0)
+    monkeypatch.setattr(settings, "storage_grace_seconds", HOUR)
+
+    db = Session()
+    db.add(VideoJob(id="live", topic="t", style="s", status=VideoStatus.PROCESSING))
+    db.add(VideoJob(id="done", topic="t", style="s", status=VideoStatus.COMPLETED,
+                    video_path=str(tmp_path / "generated_videos" / "done.mp4")))
+    db.add(JobCheckpoint(job_id="live", stage="generate_audio",
+                         data=json.dumps({"audio_path": str(tmp_path / "temp_files" / "piper_live.wav")})))
+    db.commit()
+    db.close()
+    return tmp_path
+
+def write(path, size, age_hours):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    then = time.time() - age_hours * HOUR
+    os.utime(path, (then, then))
+    return path
+
+def reclaimed(directory, reason):
+    body, _ = render_metrics()
+    for family in text_string_to_metric_families(body.decode()):
+        for sample in family.samples:
+            if sample.name == "video_storage_reclaimed_bytes_total" and sample.labels == {"directory": directory, "reason": reason}:
+                return sample.value
+    return 0.0
+
+def test_expired_scratch_goes_but_live_jobs_and_recent_writes_stay(root):
+    temp = root / "temp_files"
+    stale = write(temp / "gtts_20260101.mp3", 1000, 48)
+    frames = write(temp / "lottie_frames" / "frames_a_b" / "0001.png", 500, 48)
+    live_audio = write(temp / "piper_live.wav", 1000, 48)
+    live_segment = write(temp / "segments" / "live" / "scene_1.mp4", 1000, 48)
+    live_intro = write(temp / "hybrid" / "intro_live.mp4", 1000, 48)
+    rendering = write(temp / "lottie_frames" / "frames_c_d" / "0001.png", 500, 0.1)
+    samples = write(temp / "metrics" / "counter_123.db", 1000, 48)
+    report = write(root / "analysis_reports" / "Tides_report.txt", 100, 24 * 29)
+    before = reclaimed("temp", "ttl")
+
+    assert StorageLifecycle().sweep() == {"temp": 1500}
+
+    assert not stale.exists() and not frames.exists()
+    assert not frames.parent.exists()  # emptied per-render directory is pruned
+    assert all(path.exists() for path in (live_audio, live_segment, live_intro, rendering, samples, report))
+    assert reclaimed("temp", "ttl") == before + 1500
+
+def test_quota_evicts_least_recently_used_completed_artifacts(root, monkeypatch):
+    monkeypatch.setattr(settings, "storage_quota_mb", 3)
+    videos = root / "generated_videos"
+    done = write(videos / "done.mp4", 2**20, 10)
+    older = write(videos / "hybrid_old.mp4", 2**20, 5)
+    newer = write(videos / "hybrid_new.mp4", 2**20, 2)
+    live = write(root / "temp_files" / "piper_live.wav", 2**20, 20)
+    touch(str(done))  # downloaded just now
+    lifecycle = StorageLifecycle()
+
+    assert lifecycle.sweep() == {"videos": 2**20}
+
+    assert not older.exists()
+    assert done.exists() and newer.exists() and live.exists()
+    assert lifecycle.usage == {"temp": 2**20, "videos": 2 * 2**20, "reports": 0, "cache": 0}
+
+def test_scene_edit_cache_expires_but_the_llm_cache_is_left_alone(root):
+    cache = root / "cache"
+    llm = write(cache / "llm_cache.db", 1000, 24 * 30)
+    stale = write(cache / "segments" / "abc.mp4", 1000, 24 * 8)
+    narration = write(cache / "narration" / "def.wav", 1000, 24 * 8)
+    reused = write(cache / "segments" / "ghi.mp4", 1000, 24 * 8)
+    touch(str(reused))  # a scene edit is joining it right now
+
+    assert StorageLifecycle().sweep() == {"cache": 2000}
+
+    assert not stale.exists() and not narration.exists()
+    assert llm.exists() and reused.exists()
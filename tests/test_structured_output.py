@@ -0,0 +1,68 @@
+# tests/test_structured_output.py
+
+import asyncio
+import json
+
+from langchain_core.runnables import RunnableLambda
+
+from services.structured_output import (
+    RepairingJsonOutputParser, StructuredOutput, SCRIPT_SCHEMA, TRUNCATED_KEY
+)
+from utils.json_repair import repair_json
+
+def scene(number, **overrides):
+    return {
+        "scene_number": number, "duration": 10, "narration_text": f"Narration {number}",
+        "concept": f"Concept {number}", "explanation": f"Explanation {number}", **overrides
+    }
+
+def test_repair_strips_fences_trailing_text_and_commas():
+    text = 'Here you go:\n```json\n{"scenes": [{"scene_number": 1,},]}\n```\nLet me know!'
+
+    assert repair_json(text) == ({"scenes": [{"scene_number": 1}]}, [])
+
+def test_repair_escapes_inner_quotes_and_newlines():
+    data, truncated = repair_json('{"text": "He said "hello" and\nleft"}')
+
+    assert data == {"text": 'He said "hello" and\nleft'}
+    assert truncated == []
+
+def test_repair_drops_incomplete_tail_of_truncated_array():
+    text = '{"scenes": [{"scene_number": 1, "duration": 10}, {"scene_number": 2, "narration_te'
+
+    data, truncated = repair_json(text)
+
+    assert data == {"scenes": [{"scene_number": 1, "duration": 10}, {"scene_number": 2}]}
+    assert truncated == ["scenes"]
+
+def test_parser_marks_truncated_sections():
+    parser = RepairingJsonOutputParser()
+
+    assert parser.parse('{"scenes": [{"scene_number": 1}') == {
+        "scenes": [{"scene_number": 1}], TRUNCATED_KEY: ["scenes"]
+    }
+
+def test_only_invalid_and_missing_fragments_are_re_requested():
+    requests = []
+
+    def fake_llm(prompt_value):
+        prompt = prompt_value.to_string()
+        requests.append(prompt)
+        return json.dumps({"scenes[1]": scene(2), "scenes": [scene(4)]})
+
+    structured = StructuredOutput(RunnableLambda(fake_llm), SCRIPT_SCHEMA, "video script")
+    raw = {"scenes": [scene(1), scene(2, duration="long"), scene(3)], TRUNCATED_KEY: ["scenes"]}
+
+    result = asyncio.run(structured.avalidate(raw, "a test topic"))
+
+    assert [s["scene_number"] for s in result["scenes"]] == [1, 2, 3, 4]
+    assert result["scenes"][1]["duration"] == 10
+    assert len(requests) == 1
+    assert "scenes[1]" in requests[0] and "Narration 1" not in requests[0]
+
+def test_fragments_that_stay_invalid_are_dropped():
+    structured = StructuredOutput(RunnableLambda(lambda _: "{}"), SCRIPT_SCHEMA, "video script")
+
+    result = asyncio.run(structured.avalidate({"scenes": [scene(1), {"scene_number": 2}]}, "a test topic"))
+
+    assert result["scenes"] == [scene(1)]
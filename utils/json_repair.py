@@ -0,0 +1,123 @@
+# utils/json_repair.py
+import json
+import logging
+import re
+from typing import Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+
+def repair_json(text: str) -> Tuple[Any, List[str]]:
+    """Best-effort parse of a model's JSON answer.
+
+    Handles markdown fences, prose before/after the document, trailing commas,
+    raw newlines and unescaped quotes inside strings, and truncated output
+    (the incomplete trailing item is dropped and open containers are closed).
+
+    Returns ``(data, truncated)`` where ``truncated`` lists the top-level keys
+    whose value was cut off. Raises ``ValueError`` if nothing can be recovered.
+    """
+    fenced = _FENCE.search(text)
+    if fenced and fenced.group(1).strip():
+        text = fenced.group(1)
+
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object or array found in model output")
+    text = text[min(starts):]
+
+    out: List[str] = []
+    stack: List[str] = []
+    # (output length, open containers) wherever everything written so far is complete
+    safe_points: List[Tuple[int, List[str]]] = []
+    in_string = False
+    escape = False
+    string_start = 0
+    top_key = None
+    closed = False
+
+    for pos, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+                out.append(char)
+            elif char == '\\':
+                escape = True
+                out.append(char)
+            elif char == '"':
+                following = text[pos + 1:].lstrip()[:1]
+                if following and following not in ',:}]':
+                    # A quote that doesn't end the string was meant literally
+                    out.append('\\"')
+                    continue
+                in_string = False
+                out.append(char)
+                if len(stack) == 1 and stack[0] == '{' and following == ':':
+                    top_key = json.loads("".join(out[string_start:]))
+            elif char == '\n':
+                out.append('\\n')
+            elif char in '\r\t':
+                out.append('\\r' if char == '\r' else '\\t')
+            else:
+                out.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+            string_start = len(out)
+            out.append(char)
+        elif char in '{[':
+            out.append(char)
+            stack.append(char)
+            safe_points.append((len(out), list(stack)))
+        elif char in '}]':
+            if not stack or {'}': '{', ']': '['}[char] != stack[-1]:
+                continue  # stray closer
+            _strip_trailing_comma(out)
+            out.append(char)
+            stack.pop()
+            if not stack:
+                closed = True
+                break  # anything after the document is commentary
+            safe_points.append((len(out), list(stack)))
+        elif char == ',':
+            _strip_trailing_comma(out)
+            safe_points.append((len(out), list(stack)))
+            out.append(char)
+        else:
+            out.append(char)
+
+    if closed:
+        return json.loads("".join(out)), []
+
+    # Truncated: first try closing everything as-is, then back off to earlier complete points
+    attempts = []
+    if in_string and not escape:
+        attempts.append(("".join(out) + '"', stack))
+    attempts.append(("".join(out), stack))
+    attempts.extend(("".join(out[:length]), open_) for length, open_ in reversed(safe_points))
+
+    # Only a section that was still open when the output stopped lost items
+    truncated = [top_key] if top_key is not None and len(stack) > 1 and stack[0] == '{' else []
+
+    for prefix, open_ in attempts:
+        candidate = prefix.rstrip()
+        if candidate.endswith(','):
+            candidate = candidate[:-1]
+        candidate += "".join('}' if c == '{' else ']' for c in reversed(open_))
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        logger.warning("Repaired truncated JSON output")
+        return data, truncated
+
+    raise ValueError("Could not repair truncated JSON output")
+
+def _strip_trailing_comma(out: List[str]):
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ',':
+        del out[index:]
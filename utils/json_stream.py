@@ -0,0 +1,65 @@
+# utils/json_stream.py
+import json
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+class SceneStreamParser:
+    """Incrementally pulls complete scene objects out of a streamed script JSON.
+
+    Scenes are the objects that sit directly inside the top-level array
+    (``{"scenes": [{...}, {...}]}``); each is returned as soon as its closing
+    brace arrives, while the rest of the document is still being generated.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._scene_start = None
+
+    def feed(self, chunk: str) -> List[dict]:
+        self.buffer += chunk
+        scenes = []
+
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+
+            elif char == '"':
+                # Ignore any prose the model writes before the JSON starts
+                if self._stack:
+                    self._in_string = True
+
+            elif char in '{[':
+                if char == '{' and self._stack == ['{', '[']:
+                    self._scene_start = self._pos
+                self._stack.append(char)
+
+            elif char in '}]' and self._stack:
+                self._stack.pop()
+                if char == '}' and self._stack == ['{', '['] and self._scene_start is not None:
+                    raw = self.buffer[self._scene_start:self._pos + 1]
+                    self._scene_start = None
+                    try:
+                        scenes.append(json.loads(raw))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed streamed scene: {str(e)}")
+
+            self._pos += 1
+
+        return scenes
+
+    @property
+    def complete(self) -> bool:
+        return self._pos > 0 and not self._stack and '{' in self.buffer
@@ -0,0 +1,12 @@
+# utils/llm_text.py
+from typing import Any
+
+# Shared by the wrappers around LangChain models (instrumentation, record/replay)
+
+def prompt_text(prompt: Any) -> str:
+    # Prompt values render to their text; plain strings pass through
+    return prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+
+def output_text(output: Any) -> str:
+    # Chat models answer with messages (or message chunks), completion models with strings
+    return getattr(output, "content", output) or ""
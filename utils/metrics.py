@@ -0,0 +1,155 @@
+# utils/metrics.py
+
+import functools
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from config import settings
+
+# Worker processes record into shared files that the API process aggregates on scrape.
+# This has to be in place before prometheus_client is imported; spawned workers inherit it.
+if settings.job_workers > 0 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    _multiproc_dir = Path(settings.temp_dir) / "metrics"
+    _multiproc_dir.mkdir(parents=True, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(_multiproc_dir)
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess, values
+from prometheus_client.core import GaugeMetricFamily
+
+# False if prometheus_client was imported before the directory was set; then only this process is exported
+MULTIPROCESS = values.ValueClass is not values.MutexValue
+
+logger = logging.getLogger(__name__)
+
+LONG_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+CALL_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 180, 300)
+
+STAGE_SECONDS = Histogram(
+    "video_node_duration_seconds", "Wall time of a workflow node",
+    ["node", "outcome"], buckets=LONG_BUCKETS
+)
+PROVIDER_SECONDS = Histogram(
+    "video_provider_call_duration_seconds", "Wall time of an LLM or TTS provider call",
+    ["kind", "provider", "outcome"], buckets=CALL_BUCKETS
+)
+SUBPROCESS_SECONDS = Histogram(
+    "video_subprocess_duration_seconds", "Wall time of an ffmpeg/piper invocation",
+    ["program", "outcome"], buckets=LONG_BUCKETS
+)
+HTTP_SECONDS = Histogram(
+    "video_http_request_duration_seconds", "Latency of API requests",
+    ["method", "route", "status"]
+)
+CACHE_LOOKUPS = Counter(
+    "video_llm_cache_lookups", "LLM response cache lookups",
+    ["namespace", "result"]
+)
+STORAGE_RECLAIMED_BYTES = Counter(
+    "video_storage_reclaimed_bytes", "Bytes deleted by the storage lifecycle",
+    ["directory", "reason"]
+)
+STATUS_LOOKUPS = Counter(
+    "video_status_cache_lookups", "Job status reads answered from the status cache or the database",
+    ["result"]
+)
+
+# name -> (documentation, labelnames, callback); evaluated on every scrape in the API process
+_scrape_gauges: Dict[str, Tuple[str, Tuple[str, ...], Callable[[], Any]]] = {}
+
+def scrape_gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+    """Register a gauge computed at scrape time; the callback returns a number, or {label values: number}."""
+    def register(callback: Callable[[], Any]) -> Callable[[], Any]:
+        _scrape_gauges[name] = (documentation, tuple(labelnames), callback)
+        return callback
+    return register
+
+def outcome_of(error: BaseException) -> str:
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if type(error).__name__ == "CancelledError":
+        return "cancelled"
+    return "error"
+
+def timed_node(node: Callable) -> Callable:
+    @functools.wraps(node)
+    async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            return await node(state)
+        except BaseException as e:
+            outcome = outcome_of(e)
+            raise
+        finally:
+            STAGE_SECONDS.labels(node.__name__, outcome).observe(time.monotonic() - started)
+    return run
+
+def _cache_hit_ratio(families: Iterable) -> GaugeMetricFamily:
+    counts: Dict[str, Dict[str, float]] = {}
+    for family in families:
+        if family.name != "video_llm_cache_lookups":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_total"):
+                by_result = counts.setdefault(sample.labels["namespace"], {})
+                by_result[sample.labels["result"]] = by_result.get(sample.labels["result"], 0) + sample.value
+
+    gauge = GaugeMetricFamily("video_llm_cache_hit_ratio", "Share of LLM cache lookups that hit", labels=["namespace"])
+    for namespace, by_result in counts.items():
+        total = sum(by_result.values())
+        gauge.add_metric([namespace], by_result.get("hit", 0) / total if total else 0.0)
+    return gauge
+
+class _ScrapeCollector:
+    def __init__(self, source: Callable[[], Iterable]):
+        self.source = source
+
+    def describe(self) -> List:
+        return []  # skip the trial collect() on registration
+
+    def collect(self) -> List:
+        families = [_cache_hit_ratio(self.source())]
+        for name, (documentation, labelnames, callback) in _scrape_gauges.items():
+            gauge = GaugeMetricFamily(name, documentation, labels=list(labelnames))
+            try:
+                value = callback()
+            except Exception as e:
+                # One broken source (e.g. the database) must not take the whole scrape down
+                logger.warning(f"Metric {name} unavailable: {str(e)}")
+                continue
+            if isinstance(value, dict):
+                for labels, number in value.items():
+                    gauge.add_metric(list(labels) if isinstance(labels, tuple) else [labels], number)
+            else:
+                gauge.add_metric([], value)
+            families.append(gauge)
+        return families
+
+if not MULTIPROCESS:
+    REGISTRY.register(_ScrapeCollector(CACHE_LOOKUPS.collect))
+
+def render_metrics() -> Tuple[bytes, str]:
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+    registry = CollectorRegistry()
+    collector = multiprocess.MultiProcessCollector(registry)
+    registry.register(_ScrapeCollector(collector.collect))
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def clear_earlier_samples():
+    # Called when the API starts: a worker started on its own must not wipe the live API's samples
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return
+    own = f"_{os.getpid()}.db"
+    for path in Path(directory).glob("*.db"):
+        if not path.name.endswith(own):
+            path.unlink(missing_ok=True)
+
+def mark_process_dead(pid: int):
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
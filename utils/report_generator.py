@@ -3,6 +3,7 @@ import logging
 from datetime import datetime
 from pathlib import Path
 from config import settings
+from utils.resource_usage import summarize_usage
 from services.google_docs_service import GoogleDocsService
 
 logger = logging.getLogger(__name__)
@@ -39,6 +40,12 @@ BLUEPRINT:
 {job_data.get('blueprint_data', 'N/A')}
 
 VIDEO PATH: {job_data.get('video_path', 'N/A')}
+"""
+            
+            if job_data.get('resource_usage'):
+                sections += f"""
+RESOURCES:
+{summarize_usage(job_data['resource_usage'])}
 """
             
             # Try Google Docs first
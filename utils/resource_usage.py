@@ -0,0 +1,139 @@
+# utils/resource_usage.py
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from utils.subprocesses import current_job
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: no child CPU accounting
+
+def child_cpu_seconds() -> Optional[float]:
+    # CPU of reaped children (ffmpeg, piper); communicate() reaps them as they finish
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def rss_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Lifetime peak rather than current; KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+def estimate_tokens(text: str) -> int:
+    # Providers here do not report usage on the message; ~4 characters per token
+    return (len(text) + 3) // 4 if text else 0
+
+class JobUsage:
+    """Resources one job has used in this process so far."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.llm = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+        self.tts = {"calls": 0, "characters": 0}
+        self.started = time.monotonic()
+        self.cpu_started = time.process_time()
+        self.child_cpu_started = child_cpu_seconds()
+        self.peak_rss_mb = rss_mb() or 0.0
+
+    def add_llm(self, input_tokens: int, output_tokens: int):
+        with self._lock:
+            self.llm["calls"] += 1
+            self.llm["input_tokens"] += input_tokens
+            self.llm["output_tokens"] += output_tokens
+
+    def add_tts(self, characters: int):
+        with self._lock:
+            self.tts["calls"] += 1
+            self.tts["characters"] += characters
+
+    def add_stage(self, stage: str, entry: Dict[str, float]):
+        with self._lock:
+            self.stages[stage] = merge_usage(self.stages.get(stage, {}), entry)
+            self.peak_rss_mb = max(self.peak_rss_mb, entry.get("peak_rss_mb", 0.0))
+
+    def snapshot(self) -> Dict[str, Any]:
+        child_cpu = child_cpu_seconds()
+        with self._lock:
+            # Job totals come from whole-job deltas: stages of one wave overlap in time
+            totals = {
+                "wall_seconds": round(time.monotonic() - self.started, 3),
+                "cpu_seconds": round(time.process_time() - self.cpu_started, 3),
+                "child_cpu_seconds": round(child_cpu - self.child_cpu_started, 3) if child_cpu is not None else None,
+                "peak_rss_mb": round(self.peak_rss_mb, 1),
+                "bytes_written": sum(int(s.get("bytes_written", 0)) for s in self.stages.values())
+            }
+            return {
+                "totals": totals,
+                "stages": {name: dict(entry) for name, entry in self.stages.items()},
+                "llm": dict(self.llm),
+                "tts": dict(self.tts)
+            }
+
+def merge_usage(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    # Runs of a resumed job add up; peaks take the larger value
+    merged = dict(old)
+    for key, value in new.items():
+        current = merged.get(key)
+        if isinstance(value, dict):
+            merged[key] = merge_usage(current or {}, value)
+        elif value is None or current is None:
+            merged[key] = value if current is None else current
+        elif key.startswith("peak"):
+            merged[key] = max(current, value)
+        else:
+            merged[key] = round(current + value, 3)
+    return merged
+
+_jobs: Dict[str, JobUsage] = {}
+
+def start_job(job_id: str) -> JobUsage:
+    _jobs[job_id] = JobUsage()
+    return _jobs[job_id]
+
+def job_usage(job_id: str) -> Optional[JobUsage]:
+    return _jobs.get(job_id)
+
+def finish_job(job_id: str) -> Optional[Dict[str, Any]]:
+    usage = _jobs.pop(job_id, None)
+    return usage.snapshot() if usage else None
+
+def record_llm(input_tokens: int, output_tokens: int):
+    usage = _jobs.get(current_job.get())
+    if usage:
+        usage.add_llm(input_tokens, output_tokens)
+
+def record_tts(characters: int):
+    usage = _jobs.get(current_job.get())
+    if usage:
+        usage.add_tts(characters)
+
+def summarize_usage(usage: Dict[str, Any]) -> str:
+    totals = usage.get("totals", {})
+    child_cpu = totals.get("child_cpu_seconds")
+    lines = [
+        f"Wall time: {totals.get('wall_seconds', 0):.1f}s | "
+        f"CPU: {totals.get('cpu_seconds', 0):.1f}s"
+        + (f" (+{child_cpu:.1f}s ffmpeg/piper)" if child_cpu is not None else "")
+        + f" | Peak RSS: {totals.get('peak_rss_mb', 0):.0f} MB"
+        f" | Written: {totals.get('bytes_written', 0) / 2**20:.1f} MB",
+        f"LLM: {usage['llm']['calls']} calls, {usage['llm']['input_tokens']} tokens in / "
+        f"{usage['llm']['output_tokens']} out | TTS: {usage['tts']['calls']} calls, "
+        f"{usage['tts']['characters']} characters"
+    ]
+    for stage, entry in usage.get("stages", {}).items():
+        lines.append(
+            f"  {stage}: {entry.get('wall_seconds', 0):.1f}s wall, {entry.get('cpu_seconds', 0):.1f}s CPU, "
+            f"{entry.get('child_cpu_seconds') or 0:.1f}s child CPU, {entry.get('bytes_written', 0) / 2**20:.1f} MB written"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,158 @@
+# utils/subprocesses.py
+
+import contextvars
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import types
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from config import settings
+from utils.metrics import SUBPROCESS_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Job the current task or thread works for; asyncio.to_thread carries it across
+current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_job", default=None)
+
+_children: Dict[Optional[str], Set[subprocess.Popen]] = {}
+_stopped: Set[str] = set()
+_lock = threading.Lock()
+
+class ProcessKilled(RuntimeError):
+    pass
+
+def _pid_dir(job_id: str) -> Path:
+    # A CPU pool process renders on the job's behalf; its children are reached through here
+    return Path(settings.temp_dir) / "pids" / job_id
+
+def _is_stopped(job_id: Optional[str]) -> bool:
+    return job_id in _stopped or (job_id is not None and (_pid_dir(job_id) / "stopped").exists())
+
+class JobProcess(subprocess.Popen):
+    """Popen registered with the current job, so kill_job_processes reaches it from any process."""
+
+    def __init__(self, *args, **kwargs):
+        self.job_id = current_job.get()
+        self._pid_file = None
+        with _lock:
+            if _is_stopped(self.job_id):
+                raise ProcessKilled(f"Job {self.job_id} was stopped, not starting a child process")
+            super().__init__(*args, **kwargs)
+            _children.setdefault(self.job_id, set()).add(self)
+
+        if self.job_id is not None:
+            self._pid_file = _pid_dir(self.job_id) / str(self.pid)
+            self._pid_file.parent.mkdir(parents=True, exist_ok=True)
+            self._pid_file.touch()
+
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        self._release()
+        return returncode
+
+    def _release(self):
+        with _lock:
+            _children.get(self.job_id, set()).discard(self)
+        if self._pid_file is not None:
+            self._pid_file.unlink(missing_ok=True)
+            self._pid_file = None
+
+def track_library_processes(*modules):
+    """Route modules that ``import subprocess as sp`` (MoviePy's ffmpeg readers/writers) through JobProcess."""
+    tracked = types.ModuleType("subprocess")
+    tracked.__dict__.update(vars(subprocess))
+    tracked.Popen = JobProcess
+    for module in modules:
+        module.sp = tracked
+
+@contextmanager
+def job_scope(job_id: str):
+    token = current_job.set(job_id)
+    try:
+        yield
+    finally:
+        current_job.reset(token)
+
+def run_process(cmd: List[str], timeout: Optional[float] = None, input: Optional[str] = None) -> subprocess.CompletedProcess:
+    """Like subprocess.run(capture_output=True, text=True), but killed on timeout or when its job is stopped."""
+    job_id = current_job.get()
+
+    if _is_stopped(job_id):
+        raise ProcessKilled(f"Job {job_id} was stopped, not starting {cmd[0]}")
+    process = JobProcess(
+        cmd,
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+
+    program = Path(cmd[0]).name
+    started = time.monotonic()
+    try:
+        stdout, stderr = process.communicate(input=input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"{cmd[0]} exceeded {timeout:.0f}s, killing it")
+        process.kill()
+        process.communicate()
+        SUBPROCESS_SECONDS.labels(program, "timeout").observe(time.monotonic() - started)
+        raise
+    finally:
+        process._release()
+
+    if _is_stopped(job_id):
+        SUBPROCESS_SECONDS.labels(program, "killed").observe(time.monotonic() - started)
+        raise ProcessKilled(f"{cmd[0]} was killed because job {job_id} was stopped")
+
+    outcome = "ok" if process.returncode == 0 else "failed"
+    SUBPROCESS_SECONDS.labels(program, outcome).observe(time.monotonic() - started)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+def kill_job_processes(job_id: str) -> int:
+    # Also refuses new processes for the job, so threads left behind cannot start more work
+    with _lock:
+        _stopped.add(job_id)
+        processes = list(_children.pop(job_id, ()))
+
+    pid_dir = _pid_dir(job_id)
+    pid_dir.mkdir(parents=True, exist_ok=True)
+    (pid_dir / "stopped").touch()
+
+    for process in processes:
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+    # Children started in other processes of this host (CPU pool renders)
+    own = {str(process.pid) for process in processes}
+    others = [path for path in pid_dir.iterdir() if path.name.isdigit() and path.name not in own]
+    for path in others:
+        try:
+            os.kill(int(path.name), getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            pass
+        path.unlink(missing_ok=True)
+
+    killed = len(processes) + len(others)
+    if killed:
+        logger.info(f"Killed {killed} child process(es) of job {job_id}")
+    return killed
+
+def allow_job_processes(job_id: str):
+    with _lock:
+        _stopped.discard(job_id)
+    (_pid_dir(job_id) / "stopped").unlink(missing_ok=True)
+
+def forget_job(job_id: str):
+    # Once the job is over its stop flag and pid directory are dropped, so neither grows per job
+    with _lock:
+        _stopped.discard(job_id)
+        _children.pop(job_id, None)
+    shutil.rmtree(_pid_dir(job_id), ignore_errors=True)
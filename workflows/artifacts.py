@@ -0,0 +1,51 @@
+# workflows/artifacts.py
+
+import ast
+import json
+import zlib
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+from models import JobArtifact, VideoJob
+
+# Artifact kinds, and the video_jobs column older jobs kept them in
+SCRIPT = "script"
+BLUEPRINT = "blueprint"
+LEGACY_COLUMNS = {SCRIPT: VideoJob.script_data, BLUEPRINT: VideoJob.blueprint_data}
+
+def encode_artifact(data: Any) -> bytes:
+    # zlib stream: servable as-is to clients accepting Content-Encoding: deflate
+    return zlib.compress(json.dumps(data, default=str, separators=(",", ":")).encode('utf-8'), 6)
+
+def decode_artifact(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+def save_artifact(db: Session, job_id: str, kind: str, data: Any):
+    """Stage the artifact on the session; the caller commits."""
+    blob = encode_artifact(data)
+    artifact = db.query(JobArtifact).filter(JobArtifact.job_id == job_id, JobArtifact.kind == kind).first()
+    if artifact:
+        artifact.data = blob
+        artifact.size = len(blob)
+    else:
+        db.add(JobArtifact(job_id=job_id, kind=kind, data=blob, size=len(blob)))
+
+def _legacy(db: Session, job_id: str, kind: str) -> Optional[Any]:
+    text = db.query(LEGACY_COLUMNS[kind]).filter(VideoJob.id == job_id).scalar()
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # The oldest jobs hold a Python repr
+        return ast.literal_eval(text)
+
+def load_artifact_blob(db: Session, job_id: str, kind: str) -> Optional[bytes]:
+    blob = db.query(JobArtifact.data).filter(JobArtifact.job_id == job_id, JobArtifact.kind == kind).scalar()
+    if blob is not None:
+        return blob
+    legacy = _legacy(db, job_id, kind)
+    return encode_artifact(legacy) if legacy is not None else None
+
+def load_artifact(db: Session, job_id: str, kind: str) -> Optional[Any]:
+    blob = load_artifact_blob(db, job_id, kind)
+    return decode_artifact(blob) if blob is not None else None
@@ -0,0 +1,85 @@
+# workflows/checkpoints.py
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List
+from database import SessionLocal, JobCheckpoint
+from api.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint holding what the job was started with, so it can be resumed later
+INPUTS = "inputs"
+
+# State keys that point at files; a checkpoint is stale once its file is gone
+FILE_KEYS = ("audio_path", "video_path")
+
+def save_checkpoint(job_id: str, stage: str, data: Dict[str, Any]):
+    db = SessionLocal()
+    try:
+        payload = json.dumps(data, default=str)
+        checkpoint = db.query(JobCheckpoint).filter(
+            JobCheckpoint.job_id == job_id,
+            JobCheckpoint.stage == stage
+        ).first()
+
+        if checkpoint:
+            checkpoint.data = payload
+        else:
+            db.add(JobCheckpoint(job_id=job_id, stage=stage, data=payload))
+        db.commit()
+    finally:
+        db.close()
+
+def load_checkpoints(job_id: str) -> Dict[str, Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        checkpoints = db.query(JobCheckpoint).filter(JobCheckpoint.job_id == job_id).all()
+        return {c.stage: json.loads(c.data) for c in checkpoints}
+    finally:
+        db.close()
+
+def checkpointed(stage: str, node: Callable) -> Callable:
+    async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        if stage in (state.get('completed_stages') or []):
+            logger.info(f"Skipping {stage} for job {state['job_id']}: restored from checkpoint")
+            return state
+
+        result = await node(state)
+        await manager.send_progress(state['job_id'], stage, result.get('progress') or 0, f"{stage} completed")
+
+        if stage == "generate_audio" and state.get('streaming'):
+            # Narration lives in the in-memory scene pipeline; it cannot be resumed
+            return result
+
+        output = {key: value for key, value in result.items() if key not in state or state[key] is not value}
+        await asyncio.to_thread(save_checkpoint, state['job_id'], stage, output)
+        return result
+
+    run.__name__ = node.__name__
+    return run
+
+def restore_state(state: Dict[str, Any], stages: Dict[str, tuple]) -> Dict[str, Any]:
+    # Fold the outputs of every resumable stage back into the initial state
+    checkpoints = load_checkpoints(state['job_id'])
+    completed: List[str] = []
+
+    for stage, (_, deps) in stages.items():
+        output = checkpoints.get(stage)
+        if output is None or not all(dep in completed for dep in deps):
+            continue
+
+        missing = [key for key in FILE_KEYS if output.get(key) and not os.path.exists(output[key])]
+        if missing:
+            logger.info(f"Checkpoint for {stage} is stale ({', '.join(missing)} missing), it will be re-run")
+            continue
+
+        state.update(output)
+        completed.append(stage)
+
+    # A resumed job never has a live scene pipeline to stream into
+    state['streaming'] = False
+    state['completed_stages'] = completed
+    return state
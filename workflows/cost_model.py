@@ -0,0 +1,126 @@
+# workflows/cost_model.py
+
+import json
+import logging
+import statistics
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from config import settings
+from models import JobArtifact, VideoJob, VideoStatus
+from workflows.artifacts import SCRIPT, decode_artifact
+
+logger = logging.getLogger(__name__)
+
+# stage -> (fixed seconds, seconds per scene, seconds per second of video); calibrated by history
+STAGE_MODEL = {
+    "generate_script": (6.0, 1.0, 0.0),
+    "create_blueprint": (6.0, 2.5, 0.0),
+    "generate_audio": (1.0, 0.5, 0.1),
+    "render_video": (8.0, 2.0, 0.8),
+    "create_report": (2.0, 0.0, 0.0),
+}
+
+# A scene edit narrates and renders one segment, then re-joins by stream copy
+SCENE_EDIT_STAGES = ("generate_audio", "render_video")
+
+# Matches the scene length the script prompt asks for
+SECONDS_PER_SCENE = 15
+
+def render_tier(request_data: dict) -> str:
+    style = (request_data.get('style_analysis') or {}).get('style')
+    return str(getattr(style, 'value', style) or "default")
+
+def job_features(request_data: dict, script_data: Optional[dict] = None) -> Tuple[int, float]:
+    if script_data and script_data.get('scenes'):
+        scenes = script_data['scenes']
+        return len(scenes), float(sum(s.get('duration', 0) for s in scenes))
+
+    duration = float(request_data.get('video_duration') or 120)
+    if request_data.get('scene_edit'):
+        return 1, float(SECONDS_PER_SCENE)
+    return max(1, round(duration / SECONDS_PER_SCENE)), duration
+
+def prior_seconds(stage: str, scenes: int, duration: float) -> float:
+    fixed, per_scene, per_second = STAGE_MODEL.get(stage, (0.0, 0.0, 0.0))
+    return fixed + per_scene * scenes + per_second * duration
+
+class CostModel:
+    """Predicts stage durations from scene count, video length and render tier.
+
+    The hand-set STAGE_MODEL is scaled per (tier, stage) by the median ratio of
+    measured to predicted wall time over recently completed jobs.
+    """
+
+    def __init__(self, refresh_seconds: float = 60.0):
+        self.refresh_seconds = refresh_seconds
+        self._factors: Dict[Tuple[str, str], float] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load_history(self, db: Session) -> Dict[Tuple[str, str], float]:
+        jobs = db.query(VideoJob.request_data, JobArtifact.data, VideoJob.resource_usage).outerjoin(
+            JobArtifact, and_(JobArtifact.job_id == VideoJob.id, JobArtifact.kind == SCRIPT)
+        ).filter(
+            VideoJob.status == VideoStatus.COMPLETED,
+            VideoJob.resource_usage.isnot(None),
+            VideoJob.request_data.isnot(None)
+        ).order_by(VideoJob.completed_at.desc()).limit(settings.cost_model_history).all()
+
+        ratios: Dict[Tuple[str, str], list] = {}
+        for request_json, script_blob, usage_json in jobs:
+            try:
+                request_data = json.loads(request_json)
+                usage = json.loads(usage_json)
+                script_data = decode_artifact(script_blob) if script_blob else None
+            except (TypeError, ValueError, zlib.error):
+                continue
+            if request_data.get('scene_edit'):
+                continue  # edits reuse cached segments; their timings say little about full runs
+
+            scenes, duration = job_features(request_data, script_data if isinstance(script_data, dict) else None)
+            tier = render_tier(request_data)
+            for stage, entry in (usage.get('stages') or {}).items():
+                predicted = prior_seconds(stage, scenes, duration)
+                if predicted > 0 and entry.get('wall_seconds'):
+                    ratio = entry['wall_seconds'] / predicted
+                    ratios.setdefault((tier, stage), []).append(ratio)
+                    ratios.setdefault(("*", stage), []).append(ratio)
+
+        return {key: statistics.median(values) for key, values in ratios.items()}
+
+    def factors(self, db: Session) -> Dict[Tuple[str, str], float]:
+        with self._lock:
+            if time.monotonic() - self._loaded_at > self.refresh_seconds:
+                try:
+                    self._factors = self._load_history(db)
+                except Exception as e:
+                    logger.warning(f"Cost model calibration failed, using priors: {str(e)}")
+                self._loaded_at = time.monotonic()
+            return self._factors
+
+    def estimate(self, db: Session, request_data: dict, completed_stages: Iterable[str] = (), script_data: Optional[dict] = None) -> Dict[str, float]:
+        scenes, duration = job_features(request_data, script_data)
+        tier = render_tier(request_data)
+        factors = self.factors(db)
+
+        stages = SCENE_EDIT_STAGES if request_data.get('scene_edit') else tuple(STAGE_MODEL)
+        done = set(completed_stages)
+        estimate = {}
+        for stage in stages:
+            if stage in done:
+                continue
+            factor = factors.get((tier, stage), factors.get(("*", stage), 1.0))
+            estimate[stage] = round(prior_seconds(stage, scenes, duration) * factor, 1)
+        return estimate
+
+    def total_seconds(self, db: Session, request_data: dict, completed_stages: Iterable[str] = (), script_data: Optional[dict] = None) -> float:
+        # Blueprint and audio run in the same wave, so only the longer of the two counts
+        stages = self.estimate(db, request_data, completed_stages, script_data)
+        parallel = max(stages.pop("create_blueprint", 0.0), stages.pop("generate_audio", 0.0))
+        return round(sum(stages.values()) + parallel, 1)
+
+cost_model = CostModel()
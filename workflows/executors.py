@@ -0,0 +1,48 @@
+# workflows/executors.py
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool():
+    # CPU_WORKERS=0 keeps everything on threads (simplest on a dev box)
+    global _process_pool
+    if settings.cpu_workers <= 0:
+        return None
+
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=settings.cpu_workers)
+            logger.info(f"Started CPU process pool with {settings.cpu_workers} workers")
+    return _process_pool
+
+async def run_cpu_bound(func: Callable, *args) -> Any:
+    # func and args must be picklable when a process pool is configured
+    pool = get_process_pool()
+    if pool is None:
+        return await asyncio.to_thread(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+def shutdown_executors():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+def render_video(blueprint: dict, script_data: dict, audio_path: str = None, job_id: str = None) -> str:
+    # Module-level so it can be shipped to a worker process
+    from services.service_registry import registry
+    from utils.subprocesses import job_scope
+
+    # The scope does not cross into a pool process, so ffmpeg is registered with the job here
+    with job_scope(job_id):
+        return registry.hybrid_renderer().render(blueprint, script_data, audio_path, job_id)
@@ -0,0 +1,127 @@
+# workflows/job_control.py
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+from config import settings
+from database import SessionLocal, VideoJob
+from utils.resource_usage import child_cpu_seconds, job_usage, rss_mb
+from utils.subprocesses import kill_job_processes
+from workflows.checkpoints import FILE_KEYS, load_checkpoints
+from workflows.scene_pipeline import discard_pipeline
+
+logger = logging.getLogger(__name__)
+
+class StageTimeout(TimeoutError):
+    pass
+
+def stage_deadline(stage: str) -> float:
+    return settings.stage_timeouts.get(stage, settings.stage_timeout)
+
+def watchdog(stage: str, node: Callable) -> Callable:
+    async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        deadline = stage_deadline(stage)
+        timer = asyncio.timeout(deadline)
+        try:
+            async with timer:
+                return await node(state)
+        except TimeoutError:
+            if not timer.expired():
+                raise  # a deadline inside the stage, not ours
+            # Threads cannot be cancelled; killing their ffmpeg/piper children unblocks them
+            kill_job_processes(state['job_id'])
+            discard_pipeline(state['job_id'])
+            raise StageTimeout(f"Stage {stage} exceeded its {deadline:.0f}s deadline") from None
+
+    run.__name__ = node.__name__
+    return run
+
+def _tree_bytes(path: Path) -> int:
+    if not path.exists():
+        return 0
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+def _written_bytes(job_id: str, state: Dict[str, Any], result: Dict[str, Any], segments_before: int) -> int:
+    # Files the stage produced: new output paths plus growth of the job's segment workspace
+    written = _tree_bytes(Path(settings.temp_dir) / "segments" / job_id) - segments_before
+    for key in FILE_KEYS:
+        path = result.get(key)
+        if path and path != state.get(key) and os.path.exists(path):
+            written += os.path.getsize(path)
+    return max(written, 0)
+
+def accounted(stage: str, node: Callable) -> Callable:
+    async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        usage = job_usage(state['job_id'])
+        if usage is None:
+            return await node(state)
+
+        peak = [rss_mb() or 0.0]
+
+        async def sample_rss():
+            while True:
+                await asyncio.sleep(0.5)
+                peak[0] = max(peak[0], rss_mb() or 0.0)
+
+        segment_dir = Path(settings.temp_dir) / "segments" / state['job_id']
+        segments_before = await asyncio.to_thread(_tree_bytes, segment_dir)
+        started, cpu_started, child_started = time.monotonic(), time.process_time(), child_cpu_seconds()
+        sampler = asyncio.create_task(sample_rss())
+        result = None
+        try:
+            result = await node(state)
+            return result
+        finally:
+            sampler.cancel()
+            child_cpu = child_cpu_seconds()
+            written = await asyncio.to_thread(
+                _written_bytes, state['job_id'], state, result, segments_before
+            ) if result else 0
+            usage.add_stage(stage, {
+                "wall_seconds": round(time.monotonic() - started, 3),
+                # Process-wide: stages running in the same wave share these
+                "cpu_seconds": round(time.process_time() - cpu_started, 3),
+                "child_cpu_seconds": round(child_cpu - child_started, 3) if child_cpu is not None else None,
+                "peak_rss_mb": round(max(peak[0], rss_mb() or 0.0), 1),
+                "bytes_written": written
+            })
+
+    run.__name__ = node.__name__
+    return run
+
+def cancel_requested(job_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+        return bool(job and job.cancel_requested)
+    finally:
+        db.close()
+
+def release_workspace(job_id: str, keep_checkpoints: bool = True) -> int:
+    # Scratch files named after the job; checkpointed audio/video only go when the job cannot resume
+    removed = 0
+
+    segment_dir = Path(settings.temp_dir) / "segments" / job_id
+    if segment_dir.exists():
+        removed += sum(1 for path in segment_dir.rglob("*") if path.is_file())
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+    # Per-job intro/outro and concat lists written by HybridVideoRenderer
+    scratch = list((Path(settings.temp_dir) / "hybrid").glob(f"*_{job_id}.*"))
+    if not keep_checkpoints:
+        for output in load_checkpoints(job_id).values():
+            scratch += [Path(output[key]) for key in FILE_KEYS if output.get(key)]
+
+    for path in scratch:
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    logger.info(f"Released {removed} workspace file(s) of job {job_id}")
+    return removed
@@ -0,0 +1,324 @@
+# workflows/job_queue.py
+
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal, VideoJob
+from models import VideoStatus
+from utils.metrics import scrape_gauge
+from workflows.cost_model import cost_model
+
+logger = logging.getLogger(__name__)
+
+# Pending jobs the scheduler weighs per claim; beyond it the oldest go first
+SCHEDULE_WINDOW = 200
+
+# Built queue plans per database: (built at, plan, free_at heap, first_free), see _plan_queue
+_plans: Dict[str, tuple] = {}
+_plans_lock = threading.Lock()
+
+def enqueue(db: Session, job: VideoJob, request_data: dict, priority: int = 0, resume: bool = False,
+            completed_stages: Iterable[str] = ()):
+    # The video_jobs row is the queue entry; workers poll for PENDING rows
+    job.status = VideoStatus.PENDING
+    job.request_data = json.dumps(request_data, default=str)
+    job.priority = priority
+    job.tenant = job.tenant or "default"
+    job.estimated_seconds = cost_model.total_seconds(db, request_data, completed_stages)
+    job.resume = resume
+    job.attempts = 0
+    job.cancel_requested = False
+    job.queued_at = datetime.now()
+    job.lease_owner = None
+    job.lease_expires_at = None
+    db.commit()
+    _plan_enqueued(db, job)
+
+def request_fingerprint(request_data: dict, tenant: str = "default") -> str:
+    # Only fields that change the produced video; priority and cache use do not.
+    # Tenants never share jobs, so one cannot see another's job through coalescing.
+    relevant = {k: v for k, v in request_data.items() if k not in ("priority", "use_cache")}
+    if tenant != "default":
+        relevant["tenant"] = tenant
+    relevant["topic"] = " ".join(str(relevant.get("topic", "")).lower().split())
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def find_reusable_job(db: Session, fingerprint: str) -> Optional[VideoJob]:
+    in_flight = db.query(VideoJob).filter(
+        VideoJob.request_hash == fingerprint,
+        VideoJob.status.in_([VideoStatus.PENDING, VideoStatus.PROCESSING])
+    ).order_by(VideoJob.created_at.asc()).first()
+    if in_flight:
+        return in_flight
+
+    if settings.job_reuse_ttl <= 0:
+        return None
+
+    completed = db.query(VideoJob).filter(
+        VideoJob.request_hash == fingerprint,
+        VideoJob.status == VideoStatus.COMPLETED,
+        VideoJob.completed_at >= datetime.now() - timedelta(seconds=settings.job_reuse_ttl)
+    ).order_by(VideoJob.completed_at.desc()).first()
+    if completed and completed.video_path and os.path.exists(completed.video_path):
+        return completed
+    return None
+
+def _claimable(now: datetime):
+    # Pending jobs, plus jobs whose worker stopped renewing its lease
+    return or_(
+        VideoJob.status == VideoStatus.PENDING,
+        and_(VideoJob.status == VideoStatus.PROCESSING, VideoJob.lease_expires_at < now)
+    )
+
+def _tenant(job: VideoJob) -> str:
+    return job.tenant or "default"
+
+def _weight(tenant: str) -> float:
+    return settings.tenant_weights.get(tenant, 1.0) or 1.0
+
+def _queued(job: VideoJob) -> datetime:
+    return job.queued_at or datetime.min
+
+def job_cost(job: VideoJob) -> float:
+    return job.estimated_seconds or settings.admission_default_job_seconds
+
+def _effective_cost(job: VideoJob, now: datetime) -> float:
+    # Aging: a long job's cost shrinks while it waits, so short jobs cannot starve it
+    waited = max((now - job.queued_at).total_seconds(), 0.0) if job.queued_at else 0.0
+    return job_cost(job) / (1 + waited / settings.job_aging_seconds)
+
+def tenant_service(db: Session, now: datetime) -> Dict[str, float]:
+    # Predicted seconds of work each tenant has running or started within the fair-share window
+    rows = db.query(VideoJob.tenant, VideoJob.estimated_seconds).filter(
+        or_(
+            VideoJob.status == VideoStatus.PROCESSING,
+            VideoJob.started_at >= now - timedelta(seconds=settings.fair_share_window)
+        )
+    ).all()
+    service: Dict[str, float] = {}
+    for tenant, estimated in rows:
+        tenant = tenant or "default"
+        service[tenant] = service.get(tenant, 0.0) + (estimated or settings.admission_default_job_seconds)
+    return service
+
+def pick_next(candidates: List[VideoJob], service: Dict[str, float], now: datetime) -> VideoJob:
+    # Priority always wins; the scheduler only orders jobs of equal priority
+    top = max(job.priority or 0 for job in candidates)
+    candidates = [job for job in candidates if (job.priority or 0) == top]
+
+    if settings.job_scheduler == "fifo":
+        return min(candidates, key=_queued)
+
+    if settings.job_scheduler == "fair":
+        oldest: Dict[str, datetime] = {}
+        for job in candidates:
+            oldest[_tenant(job)] = min(oldest.get(_tenant(job), datetime.max), _queued(job))
+        tenant = min(oldest, key=lambda t: (service.get(t, 0.0) / _weight(t), oldest[t]))
+        candidates = [job for job in candidates if _tenant(job) == tenant]
+
+    return min(candidates, key=lambda job: (_effective_cost(job, now), _queued(job)))
+
+def schedule(jobs: Iterable[VideoJob], service: Dict[str, float], now: datetime) -> List[VideoJob]:
+    """The order in which workers would claim the given jobs."""
+    remaining = list(jobs)
+    service = dict(service)
+    order = []
+    while remaining:
+        job = pick_next(remaining, service, now)
+        remaining.remove(job)
+        order.append(job)
+        service[_tenant(job)] = service.get(_tenant(job), 0.0) + job_cost(job)
+    return order
+
+def claim_next(worker_id: str) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        while True:
+            now = datetime.now()
+            candidates = db.query(VideoJob).filter(_claimable(now)).order_by(
+                func.coalesce(VideoJob.priority, 0).desc(),
+                VideoJob.queued_at.asc()
+            ).limit(SCHEDULE_WINDOW).all()
+
+            if not candidates:
+                return None
+
+            candidate = pick_next(candidates, tenant_service(db, now), now)
+
+            if candidate.cancel_requested:
+                # Cancelled while its worker was gone; nothing is left to stop
+                candidate.status = VideoStatus.CANCELLED
+                candidate.message = "Cancelled"
+                candidate.cancel_requested = False
+                candidate.lease_owner = None
+                candidate.lease_expires_at = None
+                db.commit()
+                continue
+
+            attempts = candidate.attempts or 0
+            if attempts >= settings.job_max_attempts:
+                candidate.status = VideoStatus.FAILED
+                candidate.error = f"Job abandoned after {attempts} attempts (worker lost)"
+                candidate.lease_owner = None
+                candidate.lease_expires_at = None
+                db.commit()
+                logger.warning(f"Job {candidate.id} exceeded {settings.job_max_attempts} attempts")
+                continue
+
+            # Compare-and-swap: only one worker's update can match the claimable row
+            claimed = db.query(VideoJob).filter(
+                VideoJob.id == candidate.id,
+                _claimable(now)
+            ).update({
+                VideoJob.status: VideoStatus.PROCESSING,
+                VideoJob.lease_owner: worker_id,
+                VideoJob.lease_expires_at: now + timedelta(seconds=settings.job_lease_seconds),
+                VideoJob.attempts: attempts + 1,
+                VideoJob.started_at: now
+            }, synchronize_session=False)
+            db.commit()
+
+            if not claimed:
+                continue  # another worker got it first
+
+            with _plans_lock:
+                _plans.pop(str(db.get_bind().url), None)
+
+            logger.info(f"Worker {worker_id} claimed job {candidate.id} (attempt {attempts + 1})")
+            return {
+                "job_id": candidate.id,
+                "request_data": json.loads(candidate.request_data or "{}"),
+                "llm_provider": candidate.llm_provider or "mistral",
+                # A job picked up again after a lost worker resumes from its checkpoints
+                "resume": bool(candidate.resume) or attempts > 0
+            }
+    finally:
+        db.close()
+
+def renew_lease(job_id: str, worker_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        renewed = db.query(VideoJob).filter(
+            VideoJob.id == job_id,
+            VideoJob.lease_owner == worker_id
+        ).update({
+            VideoJob.lease_expires_at: datetime.now() + timedelta(seconds=settings.job_lease_seconds)
+        }, synchronize_session=False)
+        db.commit()
+        return bool(renewed)
+    finally:
+        db.close()
+
+def release(job_id: str, worker_id: str):
+    db = SessionLocal()
+    try:
+        db.query(VideoJob).filter(
+            VideoJob.id == job_id,
+            VideoJob.lease_owner == worker_id
+        ).update({
+            VideoJob.lease_owner: None,
+            VideoJob.lease_expires_at: None
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _plan_queue(db: Session) -> Tuple[Dict[str, Tuple[Optional[int], float]], List[float], float]:
+    # schedule() is quadratic in the pending jobs, so one plan serves every admission check and
+    # status lookup for queue_plan_ttl seconds; its times are aged by how long ago it was built
+    key = str(db.get_bind().url)
+    with _plans_lock:
+        cached = _plans.get(key)
+        if cached is None or time.monotonic() - cached[0] >= settings.queue_plan_ttl:
+            cached = _plans[key] = (time.monotonic(), *_build_plan(db))
+        built, plan, free_at, first_free = cached
+
+    age = time.monotonic() - built
+    return (
+        {job_id: (position, round(max(done - age, 0.0), 1)) for job_id, (position, done) in plan.items()},
+        [max(seconds - age, 0.0) for seconds in free_at],
+        max(first_free - age, 0.0)
+    )
+
+def _plan_enqueued(db: Session, job: VideoJob):
+    # A cached plan takes a newly queued job at the back, as queue_forecast predicted for it
+    with _plans_lock:
+        cached = _plans.get(str(db.get_bind().url))
+        if cached is None or job.id in cached[1]:
+            return
+        built, plan, free_at, _ = cached
+        position = sum(1 for queued, _ in plan.values() if queued is not None) + 1
+        done = max(heapq.heappop(free_at), time.monotonic() - built) + job_cost(job)
+        heapq.heappush(free_at, done)
+        plan[job.id] = (position, round(done, 1))
+
+def _build_plan(db: Session) -> Tuple[Dict[str, Tuple[Optional[int], float]], List[float], float]:
+    now = datetime.now()
+    plan: Dict[str, Tuple[Optional[int], float]] = {}
+
+    free_at = []
+    for job in db.query(VideoJob).filter(VideoJob.status == VideoStatus.PROCESSING).all():
+        elapsed = (now - job.started_at).total_seconds() if job.started_at else 0.0
+        remaining = max(job_cost(job) - elapsed, 0.0)
+        plan[job.id] = (None, round(remaining, 1))
+        free_at.append(remaining)
+
+    workers = max(settings.job_workers, 1)
+    free_at = sorted(free_at)[:workers] + [0.0] * max(workers - len(free_at), 0)
+    heapq.heapify(free_at)
+    first_free = free_at[0]
+
+    pending = db.query(VideoJob).filter(VideoJob.status == VideoStatus.PENDING).all()
+    for position, job in enumerate(schedule(pending, tenant_service(db, now), now), start=1):
+        done = heapq.heappop(free_at) + job_cost(job)
+        heapq.heappush(free_at, done)
+        plan[job.id] = (position, round(done, 1))
+    return plan, free_at, first_free
+
+def queue_plan(db: Session) -> Dict[str, Tuple[Optional[int], float]]:
+    """Queue position and predicted seconds until done for every pending and running job.
+
+    Running jobs finish after their remaining estimate; pending jobs are handed, in
+    scheduler order, to whichever worker frees up first.
+    """
+    return _plan_queue(db)[0]
+
+def queue_forecast(db: Session, cost: float) -> dict:
+    """The same plan seen by a job of the given cost submitted now, behind every pending job."""
+    plan, free_at, first_free = _plan_queue(db)
+    pending = sum(1 for position, _ in plan.values() if position is not None)
+    return {
+        "pending": pending,
+        "running": len(plan) - pending,
+        "eta_seconds": math.ceil(free_at[0] + cost),
+        # When the first worker frees up, the head of the queue starts and leaves it
+        "next_start_seconds": math.ceil(first_free)
+    }
+
+def queue_position(db: Session, job: VideoJob) -> Optional[int]:
+    if job.status != VideoStatus.PENDING or job.queued_at is None:
+        return None
+    return queue_plan(db).get(job.id, (None, None))[0]
+
+@scrape_gauge("video_jobs", "Jobs by queue state", ("status",))
+def job_counts() -> dict:
+    db = SessionLocal()
+    try:
+        rows = db.query(VideoJob.status, func.count(VideoJob.id)).filter(
+            VideoJob.status.in_([VideoStatus.PENDING, VideoStatus.PROCESSING])
+        ).group_by(VideoJob.status).all()
+        counts = {status.value: count for status, count in rows}
+        # queued = waiting for a worker, processing = renders in flight
+        return {("queued",): counts.get("pending", 0), ("processing",): counts.get("processing", 0)}
+    finally:
+        db.close()
@@ -0,0 +1,264 @@
+# workflows/job_worker.py
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from datetime import datetime
+from config import settings
+from database import AsyncSessionLocal, SessionLocal, VideoJob, init_db
+from models import VideoStatus
+from api.websocket import manager, progress_buffer
+from utils.metrics import mark_process_dead
+from utils.resource_usage import finish_job, merge_usage, start_job
+from utils.subprocesses import allow_job_processes, forget_job, job_scope, kill_job_processes
+from workflows.executors import shutdown_executors
+from workflows.job_control import cancel_requested, release_workspace
+from workflows.job_queue import claim_next, renew_lease, release
+from workflows.scene_pipeline import discard_pipeline
+
+logger = logging.getLogger(__name__)
+
+async def process_video_job(job_id: str, request_data: dict, llm_provider: str, resume: bool = False):
+    # Child processes started on the job's behalf are tracked so cancel/watchdogs can kill them
+    allow_job_processes(job_id)
+    start_job(job_id)
+    try:
+        with job_scope(job_id):
+            await _process_video_job(job_id, request_data, llm_provider, resume)
+    finally:
+        forget_job(job_id)
+        await asyncio.to_thread(_save_usage, job_id, finish_job(job_id))
+
+def _save_usage(job_id: str, usage: dict):
+    if not usage:
+        return
+    db = SessionLocal()
+    try:
+        job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+        # A resumed or re-edited job adds to what its earlier runs used
+        previous = json.loads(job.resource_usage) if job.resource_usage else {}
+        job.resource_usage = json.dumps(merge_usage(previous, usage))
+        db.commit()
+    finally:
+        db.close()
+
+async def _process_video_job(job_id: str, request_data: dict, llm_provider: str, resume: bool):
+    from workflows.video_workflow import VideoWorkflow
+    from workflows.scene_editor import apply_scene_edits
+
+    # Job row updates are awaited, so lease renewal and cancel polling keep running meanwhile
+    db = AsyncSessionLocal()
+
+    try:
+        logger.info(f"Processing job: {job_id}")
+
+        # Update status
+        job = await db.get(VideoJob, job_id)
+        job.status = VideoStatus.PROCESSING
+        job.message = "Starting video generation"
+        await db.commit()
+
+        # Send WebSocket update
+        await manager.send_progress(job_id, "starting", 0, "Initializing")
+
+        if request_data.get('scene_edit'):
+            # Only narration and segments whose inputs changed are produced again
+            video_path = await asyncio.to_thread(apply_scene_edits, job_id)
+            result = {'video_file': video_path, 'report_url': job.report_url}
+        else:
+            # Create workflow
+            workflow = VideoWorkflow(llm_provider=llm_provider)
+
+            # Generate video
+            result = await workflow.process_full_workflow(
+                job_id=job_id,
+                topic=request_data['topic'],
+                style_data=request_data['style_analysis'],
+                db=db,
+                use_cache=request_data.get('use_cache', True),
+                resume=resume,
+                video_duration=request_data.get('video_duration') or 120
+            )
+
+        if result and result.get('video_file'):
+            job.status = VideoStatus.COMPLETED
+            job.progress = 100
+            job.message = "Video generation completed"
+            job.video_path = result['video_file']
+            job.report_url = result.get('report_url')
+            job.completed_at = datetime.now()
+
+            await manager.send_progress(job_id, "completed", 100, "Video ready")
+        else:
+            job.status = VideoStatus.FAILED
+            job.error = "Video generation failed"
+            job.message = "Failed to generate video"
+
+            await manager.send_error(job_id, "Video generation failed")
+
+        await db.commit()
+
+    except asyncio.CancelledError:
+        if not await asyncio.to_thread(cancel_requested, job_id):
+            raise  # worker shutdown: the lease lapses and another worker resumes the job
+        await _mark_cancelled(db, job_id)
+
+    except Exception as e:
+        logger.error(f"Job processing error: {str(e)}", exc_info=True)
+
+        await db.rollback()
+        job = await db.get(VideoJob, job_id)
+        job.status = VideoStatus.FAILED
+        job.error = str(e)
+        job.message = f"Error: {str(e)}"
+        await db.commit()
+
+        # Scratch files go now; checkpointed outputs stay for a resume
+        await asyncio.to_thread(release_workspace, job_id)
+        await manager.send_error(job_id, str(e))
+
+    finally:
+        await db.close()
+
+async def _mark_cancelled(db, job_id: str):
+    kill_job_processes(job_id)
+    discard_pipeline(job_id)
+
+    await db.rollback()
+    job = await db.get(VideoJob, job_id, populate_existing=True)
+    job.status = VideoStatus.CANCELLED
+    job.message = "Cancelled"
+    job.cancel_requested = False
+    await db.commit()
+
+    # A cancelled job cannot be resumed, so its checkpointed files go too
+    await asyncio.to_thread(release_workspace, job_id, False)
+    await manager.send_progress(job_id, "cancelled", job.progress or 0, "Job cancelled")
+    logger.info(f"Job {job_id} cancelled")
+
+async def _watch_cancel(job_id: str, task: asyncio.Task):
+    while not task.done():
+        await asyncio.sleep(settings.job_cancel_poll_interval)
+        if await asyncio.to_thread(cancel_requested, job_id):
+            # Kill children first so threads blocked on them return promptly
+            kill_job_processes(job_id)
+            task.cancel()
+            return
+
+async def _keep_lease(job_id: str, worker_id: str):
+    # Renew well before expiry so a slow render never looks like a dead worker
+    while True:
+        await asyncio.sleep(max(1.0, settings.job_lease_seconds / 3))
+        if not await asyncio.to_thread(renew_lease, job_id, worker_id):
+            logger.warning(f"Worker {worker_id} lost the lease on job {job_id}")
+            return
+
+async def run_worker(worker_id: str, stop) -> None:
+    logger.info(f"Job worker {worker_id} started")
+
+    while not stop.is_set():
+        claimed = await asyncio.to_thread(claim_next, worker_id)
+        if claimed is None:
+            await asyncio.sleep(settings.job_poll_interval)
+            continue
+
+        job_id = claimed['job_id']
+        lease = asyncio.create_task(_keep_lease(job_id, worker_id))
+        job = asyncio.create_task(process_video_job(
+            job_id,
+            claimed['request_data'],
+            claimed['llm_provider'],
+            claimed['resume']
+        ))
+        watcher = asyncio.create_task(_watch_cancel(job_id, job))
+        try:
+            await job
+        finally:
+            lease.cancel()
+            watcher.cancel()
+            await asyncio.to_thread(release, job_id, worker_id)
+
+    await progress_buffer.close()
+    logger.info(f"Job worker {worker_id} stopped")
+
+def worker_main(worker_id: str, stop):
+    # Entry point of a worker process: progress goes through the database, the API relays it
+    from utils.logger_config import setup_logger
+    setup_logger('worker')
+    manager.persist_progress = True
+    init_db()
+    try:
+        asyncio.run(run_worker(worker_id, stop))
+    finally:
+        shutdown_executors()
+
+class WorkerPool:
+    """Worker processes (or, with JOB_WORKERS=0, one in-process task) draining the job queue."""
+
+    def __init__(self):
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = None
+        self._processes = []
+        self._task = None
+
+    def _worker_id(self, index: int) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+    def start(self):
+        if settings.job_workers <= 0:
+            self._stop = threading.Event()
+            self._task = asyncio.get_running_loop().create_task(run_worker(self._worker_id(0), self._stop))
+            logger.info("Running jobs inside the API process")
+            return
+
+        self._stop = self._context.Event()
+        for index in range(settings.job_workers):
+            process = self._context.Process(
+                target=worker_main,
+                args=(self._worker_id(index), self._stop),
+                name=f"video-worker-{index}",
+                # Not a daemon: render_node may start a CPU process pool, and daemons cannot have children.
+                # stop() joins (or terminates) the workers instead
+                daemon=False
+            )
+            process.start()
+            self._processes.append(process)
+        logger.info(f"Started {settings.job_workers} job worker processes")
+
+    async def stop(self, timeout: float = 10.0):
+        if self._stop is None:
+            return
+        self._stop.set()
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+        for process in self._processes:
+            # Workers finish their current poll; a job mid-render is re-leased after a restart
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+            mark_process_dead(process.pid)
+        self._processes = []
+
+worker_pool = WorkerPool()
+
+if __name__ == "__main__":
+    # Run a worker pool on its own, e.g. on a separate render box sharing the database
+    stop = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=worker_main, args=(f"{socket.gethostname()}:{os.getpid()}:{index}", stop))
+        for index in range(max(1, settings.job_workers))
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop.set()
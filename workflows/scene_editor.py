@@ -0,0 +1,173 @@
+# workflows/scene_editor.py
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+from config import settings
+from sqlalchemy.orm import Session
+from database import SessionLocal, VideoJob
+from workflows.artifacts import SCRIPT, load_artifact, save_artifact
+from services.service_registry import registry
+from workflows.checkpoints import load_checkpoints, save_checkpoint
+from workflows.storage import touch
+
+logger = logging.getLogger(__name__)
+
+def _digest(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+
+def _store(source: str, target: Path):
+    # Hard link when possible: the cache entry outlives the job's scratch copy at no cost
+    partial = target.with_name(f"{target.stem}.partial{target.suffix}")
+    partial.unlink(missing_ok=True)
+    try:
+        os.link(source, partial)
+    except OSError:
+        shutil.copyfile(source, partial)
+    partial.replace(target)
+
+def load_script(db: Session, job_id: str) -> Optional[dict]:
+    return load_artifact(db, job_id, SCRIPT)
+
+def save_script(job_id: str, script_data: dict):
+    # Keep the stored script and the script checkpoint in step so a resume sees the edit
+    db = SessionLocal()
+    try:
+        save_artifact(db, job_id, SCRIPT, script_data)
+        db.commit()
+    finally:
+        db.close()
+
+    checkpoint = load_checkpoints(job_id).get("generate_script") or {}
+    save_checkpoint(job_id, "generate_script", {**checkpoint, "script_data": script_data})
+
+def apply_patch(script_data: dict, scene_number: int, patch: dict) -> dict:
+    scenes = script_data.get('scenes', [])
+    scene = next((s for s in scenes if s.get('scene_number') == scene_number), None)
+    if scene is None:
+        raise KeyError(f"Scene {scene_number} not found")
+
+    for key, value in patch.items():
+        if key == 'style':
+            scene['style'] = {**(scene.get('style') or {}), **value}
+        else:
+            scene[key] = value
+
+    # Keep the script-level aggregates consistent with the scenes
+    narration = " ".join(s.get('narration_text', '') for s in scenes)
+    script_data.update({
+        'narration': narration,
+        'voiceover_text': narration,
+        'total_duration': sum(s.get('duration', 0) for s in scenes)
+    })
+    return script_data
+
+class SceneEditor:
+    """Rebuilds a job's video from content-addressed narration clips and scene segments.
+
+    Narration is keyed by (provider, language, text) and segments by everything
+    that shows up in the frame, so an edit only re-renders what it changed and
+    the final MP4 is re-joined by stream copy.
+    """
+
+    def __init__(self):
+        self.narration_dir = Path(settings.cache_dir) / "narration"
+        self.segment_dir = Path(settings.cache_dir) / "segments"
+        self.narration_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+
+    def narration_for(self, text: str, language: str) -> Optional[str]:
+        if not text:
+            return None
+
+        tts = registry.tts_generator()
+        cached = next(self.narration_dir.glob(f"{self._narration_key(tts, text, language)}.*"), None)
+        if cached:
+            touch(str(cached))  # keeps it out of the storage sweep's LRU eviction
+            return str(cached)
+
+        return self.adopt_narration(text, language, tts.generate_audio(text, language))
+
+    def adopt_narration(self, text: str, language: str, audio_path: Optional[str]) -> Optional[str]:
+        # Also seeds the cache with the narration of the original render
+        if not audio_path or not Path(audio_path).exists() or Path(audio_path).stat().st_size == 0:
+            return None  # placeholder audio is not worth keeping
+
+        key = self._narration_key(registry.tts_generator(), text, language)
+        target = self.narration_dir / f"{key}{Path(audio_path).suffix}"
+        if not target.exists():
+            _store(audio_path, target)
+        return str(target)
+
+    def adopt_scene_audio(self, scenes: List[dict], scene_audio: Dict[int, str], language: str):
+        # Narration from TTSGenerator.generate_scene_audio, keyed by scene number
+        for scene in scenes:
+            audio_path = scene_audio.get(scene.get('scene_number'))
+            if audio_path:
+                self.adopt_narration(scene.get('narration_text', ''), language, audio_path)
+
+    def segment_for(self, scene: dict, audio_path: Optional[str]) -> tuple:
+        segment_path = self.segment_dir / f"{self._segment_key(scene, audio_path)}.mp4"
+
+        if segment_path.exists():
+            touch(str(segment_path))
+            return str(segment_path), False
+
+        # Render beside the final name so a crash never leaves a truncated segment behind
+        partial = self.segment_dir / f"{segment_path.stem}.partial.mp4"
+        registry.video_renderer().render_segment(scene, str(partial), audio_path)
+        partial.replace(segment_path)
+        return str(segment_path), True
+
+    def adopt_segment(self, scene: dict, audio_path: Optional[str], segment_path: str):
+        # A segment streamed by the original render, narrated with the (adopted) audio_path
+        target = self.segment_dir / f"{self._segment_key(scene, audio_path)}.mp4"
+        if not target.exists():
+            _store(segment_path, target)
+
+    def _narration_key(self, tts, text: str, language: str) -> str:
+        return _digest({"provider": tts.provider, "language": language, "text": text})
+
+    def _segment_key(self, scene: dict, audio_path: Optional[str]) -> str:
+        renderer = registry.video_renderer()
+        return _digest({
+            "narration_text": scene.get('narration_text', ''),
+            "duration": scene.get('duration', 5),
+            "style": scene.get('style') or {},
+            "audio": Path(audio_path).stem if audio_path else None,
+            "format": [renderer.width, renderer.height, renderer.fps]
+        })
+
+    def rebuild(self, job_id: str) -> str:
+        db = SessionLocal()
+        try:
+            job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+            script_data = load_script(db, job_id)
+            topic = job.topic
+        finally:
+            db.close()
+
+        scenes = (script_data or {}).get('scenes', [])
+        if not scenes:
+            raise ValueError("Job has no script to rebuild from")
+
+        tts = registry.tts_generator()
+        language = tts.detect_language(script_data.get('voiceover_text', '') or " ")
+
+        segment_paths = []
+        rendered = 0
+        for scene in scenes:
+            audio_path = self.narration_for(scene.get('narration_text', ''), language)
+            segment_path, fresh = self.segment_for(scene, audio_path)
+            segment_paths.append(segment_path)
+            rendered += fresh
+
+        logger.info(f"Job {job_id}: re-rendered {rendered} of {len(scenes)} segments")
+        return registry.hybrid_renderer().render_segments(segment_paths, topic, job_id)
+
+def apply_scene_edits(job_id: str) -> str:
+    return SceneEditor().rebuild(job_id)
@@ -0,0 +1,143 @@
+# workflows/scene_pipeline.py
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from services.service_registry import registry
+from utils.subprocesses import job_scope
+from workflows.scene_editor import SceneEditor
+
+logger = logging.getLogger(__name__)
+
+class ScenePipeline:
+    """Narrates and renders scenes as they stream out of the script generator."""
+
+    def __init__(self, job_id: str, max_workers: int = None):
+        self.job_id = job_id
+        self.segment_dir = Path(settings.temp_dir) / "segments" / job_id
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.scene_pipeline_workers,
+            thread_name_prefix=f"scene-{job_id[:8]}"
+        )
+        self.futures: Dict[int, Future] = {}
+        self.editor = SceneEditor()
+        # Scenes that stream in while a TTS request is in flight share the next request
+        self._narration = threading.Condition()
+        self._pending_narration: List[dict] = []
+        self._narrating = False
+        self.started_at = time.monotonic()
+        self.first_segment_seconds: Optional[float] = None
+
+    def submit(self, scene: dict):
+        scene_number = scene.get('scene_number', len(self.futures) + 1)
+        self.futures[scene_number] = self.executor.submit(self.process_scene, scene)
+
+    def process_scene(self, scene: dict) -> dict:
+        # Executor threads do not inherit the job context; tag their ffmpeg/piper children
+        with job_scope(self.job_id):
+            return self._process_scene(scene)
+
+    def _process_scene(self, scene: dict) -> dict:
+        scene_number = scene.get('scene_number', 0)
+
+        audio_path, language = self._narrate(scene) if scene.get('narration_text') else (None, None)
+
+        segment_path = str(self.segment_dir / f"scene_{scene_number:03d}.mp4")
+        registry.video_renderer().render_segment(scene, segment_path, audio_path)
+        self._seed_edit_cache(scene, audio_path, language, segment_path)
+
+        if self.first_segment_seconds is None:
+            self.first_segment_seconds = time.monotonic() - self.started_at
+            logger.info(f"Job {self.job_id}: first segment ready after {self.first_segment_seconds:.1f}s")
+
+        return {
+            "scene_number": scene_number,
+            "audio_path": audio_path,
+            "segment_path": segment_path
+        }
+
+    def _narrate(self, scene: dict) -> Tuple[Optional[str], str]:
+        # Whichever waiting thread finds no request in flight sends everything queued so far;
+        # the first scene goes out alone, so batching never delays it
+        entry = {"scene": scene}
+        with self._narration:
+            self._pending_narration.append(entry)
+            while "audio_path" not in entry:
+                if self._narrating:
+                    self._narration.wait()
+                    continue
+
+                batch, self._pending_narration = self._pending_narration, []
+                self._narrating = True
+                self._narration.release()
+                try:
+                    self._narrate_batch(batch)
+                finally:
+                    self._narration.acquire()
+                    self._narrating = False
+                    self._narration.notify_all()
+        return entry["audio_path"], entry["language"]
+
+    def _narrate_batch(self, batch: List[dict]):
+        scenes = [dict(entry["scene"], scene_number=i) for i, entry in enumerate(batch)]
+        language = None
+        try:
+            tts = registry.tts_generator()
+            language = tts.detect_language(" ".join(scene['narration_text'] for scene in scenes))
+            audio = tts.generate_scene_audio(scenes, language)
+        except Exception as e:
+            numbers = [entry["scene"].get('scene_number') for entry in batch]
+            logger.warning(f"Scenes {numbers} TTS failed (optional): {e}")
+            audio = {}
+        for i, entry in enumerate(batch):
+            entry["audio_path"], entry["language"] = audio.get(i), language
+
+    def _seed_edit_cache(self, scene: dict, audio_path: Optional[str], language: Optional[str], segment_path: str):
+        # The first scene edit of this job then re-renders only the scenes it changes
+        try:
+            cached_audio = self.editor.adopt_narration(scene.get('narration_text', ''), language, audio_path)
+            if cached_audio or not audio_path:
+                self.editor.adopt_segment(scene, cached_audio, segment_path)
+        except Exception as e:
+            logger.warning(f"Scene {scene.get('scene_number')} not added to the edit cache: {e}")
+
+    def collect(self, scenes: List[dict]) -> Dict[int, dict]:
+        # Waits for every scene; ones that failed or never streamed are rendered inline
+        results = {}
+        for scene in scenes:
+            scene_number = scene.get('scene_number', 0)
+            future = self.futures.get(scene_number)
+            try:
+                if future is None:
+                    raise RuntimeError("scene was not streamed")
+                results[scene_number] = future.result()
+            except Exception as e:
+                logger.warning(f"Scene {scene_number} pipeline failed ({e}), retrying inline")
+                results[scene_number] = self.process_scene(scene)
+        return results
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Pipelines live outside the graph state so the state stays plain data
+active_pipelines: Dict[str, ScenePipeline] = {}
+
+def start_pipeline(job_id: str) -> ScenePipeline:
+    discard_pipeline(job_id)
+    pipeline = ScenePipeline(job_id)
+    active_pipelines[job_id] = pipeline
+    return pipeline
+
+def pop_pipeline(job_id: str) -> Optional[ScenePipeline]:
+    return active_pipelines.pop(job_id, None)
+
+def discard_pipeline(job_id: str):
+    pipeline = active_pipelines.pop(job_id, None)
+    if pipeline:
+        pipeline.shutdown()
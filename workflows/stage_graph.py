@@ -0,0 +1,73 @@
+# workflows/stage_graph.py
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from langgraph.graph import StateGraph, END
+
+logger = logging.getLogger(__name__)
+
+# stage name -> (node, names of the stages whose output it needs)
+StageSpec = Dict[str, Tuple[Callable, Sequence[str]]]
+
+def plan_waves(stages: StageSpec) -> List[List[str]]:
+    # Group stages into waves; every stage in a wave only depends on earlier waves
+    remaining = {name: set(deps) for name, (_, deps) in stages.items()}
+    for name, deps in remaining.items():
+        unknown = deps - set(stages)
+        if unknown:
+            raise ValueError(f"Stage `{name}` depends on unknown stage(s): {sorted(unknown)}")
+
+    waves = []
+    done = set()
+    while remaining:
+        # Keep declaration order inside a wave so merges are deterministic
+        ready = [name for name, deps in remaining.items() if deps <= done]
+        if not ready:
+            raise ValueError(f"Cyclic stage dependencies: {sorted(remaining)}")
+        waves.append(ready)
+        done.update(ready)
+        for name in ready:
+            del remaining[name]
+    return waves
+
+def parallel_node(names: List[str], nodes: List[Callable]) -> Callable:
+    async def run_concurrently(state: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info(f"Running stages concurrently: {', '.join(names)}")
+        results = await asyncio.gather(*(node(state) for node in nodes))
+
+        merged = dict(state)
+        for result in results:
+            for key, value in result.items():
+                if key in state and state[key] is value:
+                    continue  # untouched by this stage
+                if key == "progress":
+                    merged[key] = max(merged.get(key) or 0, value or 0)
+                else:
+                    merged[key] = value
+        return merged
+
+    run_concurrently.__name__ = "+".join(names)
+    return run_concurrently
+
+def build_stage_graph(schema: type, stages: StageSpec):
+    waves = plan_waves(stages)
+    workflow = StateGraph(schema)
+
+    wave_nodes = []
+    for wave in waves:
+        if len(wave) == 1:
+            key = wave[0]
+            workflow.add_node(key, stages[key][0])
+        else:
+            key = "+".join(wave)
+            workflow.add_node(key, parallel_node(wave, [stages[name][0] for name in wave]))
+        wave_nodes.append(key)
+
+    workflow.set_entry_point(wave_nodes[0])
+    for current, following in zip(wave_nodes, wave_nodes[1:]):
+        workflow.add_edge(current, following)
+    workflow.add_edge(wave_nodes[-1], END)
+
+    logger.info(f"Stage plan: {' -> '.join(wave_nodes)}")
+    return workflow.compile()
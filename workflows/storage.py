@@ -0,0 +1,187 @@
+# workflows/storage.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+from config import REPORT_DIR, settings
+from database import SessionLocal, VideoJob
+from models import JobCheckpoint, VideoStatus
+from utils.metrics import STORAGE_RECLAIMED_BYTES, scrape_gauge
+from workflows.checkpoints import FILE_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Under temp_dir but not scratch: the shared metric samples and child pids of running processes
+KEEP_TEMP_DIRS = ("metrics", "pids")
+
+# Under cache_dir, SceneEditor's narration clips and segments; the LLM cache database manages itself
+CACHE_DIRS = ("narration", "segments")
+
+@dataclass
+class StoredFile:
+    path: Path
+    area: str
+    size: int
+    used_at: float  # last read (see touch) or write
+    modified_at: float
+
+def storage_areas() -> Dict[str, Tuple[Path, int]]:
+    """Managed directories and their TTL in seconds since last use (0 = no TTL)."""
+    return {
+        "temp": (Path(settings.temp_dir), settings.storage_temp_ttl),
+        "videos": (Path(settings.output_dir), settings.storage_video_ttl),
+        "reports": (Path(settings.output_dir).parent / REPORT_DIR, settings.storage_report_ttl),
+        "cache": (Path(settings.cache_dir), settings.storage_cache_ttl)
+    }
+
+def touch(path: str):
+    # Mark a file as used for LRU eviction; atime alone is unreliable on noatime/relatime mounts
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+def scan(area: str, root: Path) -> List[StoredFile]:
+    files = []
+    for directory, subdirs, names in os.walk(root):
+        if Path(directory) == root:
+            if area == "temp":
+                subdirs[:] = [name for name in subdirs if name not in KEEP_TEMP_DIRS]
+            elif area == "cache":
+                subdirs[:] = [name for name in subdirs if name in CACHE_DIRS]
+                continue
+        for name in names:
+            path = Path(directory) / name
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # removed by its job meanwhile
+            files.append(StoredFile(path, area, stat.st_size, max(stat.st_atime, stat.st_mtime), stat.st_mtime))
+    return files
+
+def live_references() -> Tuple[Set[str], Set[Path]]:
+    """Ids of queued/running jobs, and the files they (or their checkpoints) point at."""
+    db = SessionLocal()
+    try:
+        live = db.query(VideoJob.id, VideoJob.video_path).filter(
+            VideoJob.status.in_([VideoStatus.PENDING, VideoStatus.PROCESSING])
+        ).all()
+        job_ids = {job_id for job_id, _ in live}
+        # A queued scene edit re-renders from the job's video and checkpointed narration
+        paths = {Path(video_path).resolve() for _, video_path in live if video_path}
+        for (data,) in db.query(JobCheckpoint.data).filter(JobCheckpoint.job_id.in_(job_ids)):
+            output = json.loads(data)
+            paths.update(Path(output[key]).resolve() for key in FILE_KEYS if output.get(key))
+        return job_ids, paths
+    finally:
+        db.close()
+
+def _job_scratch(file: StoredFile, root: Path, job_ids: Set[str]) -> bool:
+    # Segment workspaces and HybridVideoRenderer intermediates are named after their job
+    parts = file.path.relative_to(root).parts
+    if len(parts) > 2 and parts[0] == "segments":
+        return parts[1] in job_ids
+    return parts[0] == "hybrid" and file.path.stem.rsplit("_", 1)[-1] in job_ids
+
+class StorageLifecycle:
+    """Deletes generated files nothing needs any more.
+
+    Each sweep removes files unused for longer than their directory's TTL, then, while the
+    managed directories exceed the quota, the least recently used remaining ones. Files of
+    queued or running jobs and files written within the grace period (renders in progress)
+    are never removed. Resuming a failed job re-runs the stages whose outputs are gone.
+    """
+
+    def __init__(self):
+        self.usage: Dict[str, int] = {}  # bytes per area after the last sweep
+
+    def _remove(self, file: StoredFile, reason: str) -> bool:
+        try:
+            file.path.unlink()
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Could not remove {file.path}: {str(e)}")
+            return False
+        STORAGE_RECLAIMED_BYTES.labels(file.area, reason).inc(file.size)
+        return True
+
+    def sweep(self) -> Dict[str, int]:
+        """One pass over the managed directories; returns bytes reclaimed per area."""
+        now = time.time()
+        areas = storage_areas()
+        job_ids, referenced = live_references()
+
+        files, candidates = [], []
+        for area, (root, _) in areas.items():
+            for file in scan(area, root):
+                files.append(file)
+                # A cache hit may be feeding a scene edit's rebuild right now
+                recent = file.used_at if area == "cache" else file.modified_at
+                if (now - recent < settings.storage_grace_seconds
+                        or file.path.resolve() in referenced
+                        or (area == "temp" and _job_scratch(file, root, job_ids))):
+                    continue
+                candidates.append(file)
+
+        removed = []
+        for file in candidates:
+            ttl = areas[file.area][1]
+            if ttl and now - file.used_at > ttl and self._remove(file, "ttl"):
+                removed.append(file)
+        gone = {file.path for file in removed}
+
+        quota = settings.storage_quota_mb * 2**20
+        total = sum(file.size for file in files if file.path not in gone)
+        if quota and total > quota:
+            for file in sorted((file for file in candidates if file.path not in gone), key=lambda file: file.used_at):
+                if total <= quota:
+                    break
+                if self._remove(file, "quota"):
+                    removed.append(file)
+                    gone.add(file.path)
+                    total -= file.size
+            if total > quota:
+                logger.warning(f"Storage still over quota ({total / 2**20:.0f} MB): the rest is in use")
+
+        self._prune_emptied_dirs(areas["temp"][0], removed)
+
+        reclaimed: Dict[str, int] = {}
+        self.usage = {area: 0 for area in areas}
+        for file in files:
+            counter = reclaimed if file.path in gone else self.usage
+            counter[file.area] = counter.get(file.area, 0) + file.size
+
+        if removed:
+            logger.info(f"Storage sweep removed {len(removed)} file(s), {sum(reclaimed.values()) / 2**20:.1f} MB")
+        return reclaimed
+
+    def _prune_emptied_dirs(self, root: Path, removed: List[StoredFile]):
+        # Per-render Lottie frame and segment directories this sweep emptied; the top-level ones
+        # are created once by long-lived renderers, and a live job's segments are never emptied
+        for directory in sorted({file.path.parent for file in removed if file.area == "temp"}, reverse=True):
+            while directory != root and len(directory.relative_to(root).parts) >= 2:
+                try:
+                    directory.rmdir()  # fails while not empty
+                except OSError:
+                    break
+                directory = directory.parent
+
+    async def run(self, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Storage sweep failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(interval)
+
+storage_lifecycle = StorageLifecycle()
+
+@scrape_gauge("video_storage_bytes", "Bytes in the managed directories at the last storage sweep", ("directory",))
+def storage_bytes() -> dict:
+    return {(area,): size for area, size in storage_lifecycle.usage.items()}
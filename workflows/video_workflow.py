@@ -1,11 +1,11 @@
 # workflows/video_workflow.py
 
+import asyncio
 import logging
 from datetime import datetime
-from sqlalchemy.orm import Session
-from langgraph.graph import StateGraph, END
-
+from sqlalchemy.ext.asyncio import AsyncSession
 from workflows.workflow_state import WorkflowState
+from workflows.stage_graph import build_stage_graph
 from workflows.workflow_nodes import (
     script_node,
     blueprint_node,
@@ -15,41 +15,51 @@ from workflows.workflow_nodes import (
 )
 from api.websocket import manager
 from models import VideoStatus
+from services.service_registry import registry
+from workflows.scene_pipeline import discard_pipeline
+from workflows.checkpoints import INPUTS, checkpointed, restore_state, save_checkpoint
+from workflows.artifacts import BLUEPRINT, SCRIPT, save_artifact
+from workflows.job_control import accounted, watchdog
+from utils.metrics import timed_node
 
 logger = logging.getLogger(__name__)
 
+# Each stage lists the stages whose output it needs. Stages whose
+# dependencies are satisfied together run concurrently.
+STAGES = {
+    "generate_script": (script_node, []),
+    "create_blueprint": (blueprint_node, ["generate_script"]),
+    "generate_audio": (tts_node, ["generate_script"]),
+    "render_video": (render_node, ["create_blueprint", "generate_audio"]),
+    "create_report": (report_node, ["render_video"]),
+}
+
+def _wrap_stage(name: str, node):
+    # Innermost first: deadline, per-job resource accounting, latency histogram,
+    # then checkpointing, which skips the whole stack for stages restored on resume
+    node = watchdog(name, node)
+    node = accounted(name, node)
+    node = timed_node(node)
+    return checkpointed(name, node)
+
+def build_graph():
+    stages = {name: (_wrap_stage(name, node), deps) for name, (node, deps) in STAGES.items()}
+    graph = build_stage_graph(WorkflowState, stages)
+    logger.info("LangGraph workflow compiled successfully")
+    return graph
+
 class VideoWorkflow:
     def __init__(self, llm_provider: str = "mistral"):
         self.llm_provider = llm_provider
         
-        # Build LangGraph workflow
-        workflow = StateGraph(WorkflowState)
-        
-        # Add nodes
-        workflow.add_node("generate_script", script_node)
-        workflow.add_node("create_blueprint", blueprint_node)
-        workflow.add_node("generate_audio", tts_node)
-        workflow.add_node("render_video", render_node)
-        workflow.add_node("create_report", report_node)
-        
-        # Define edges (workflow sequence)
-        workflow.set_entry_point("generate_script")
-        workflow.add_edge("generate_script", "create_blueprint")
-        workflow.add_edge("create_blueprint", "generate_audio")
-        workflow.add_edge("generate_audio", "render_video")
-        workflow.add_edge("render_video", "create_report")
-        workflow.add_edge("create_report", END)
-        
-        # Compile graph
-        self.graph = workflow.compile()
-        logger.info("LangGraph workflow compiled successfully")
+        # One compiled graph per provider, shared by every job in the process
+        self.graph = registry.workflow_graph(llm_provider, build_graph)
     
-    async def generate_script_async(self, topic: str, style: str, duration: int) -> dict:
+    async def generate_script_async(self, topic: str, style: str, duration: int, use_cache: bool = True) -> dict:
     
         try:
-            from services.script_generator import ScriptGenerator
-            gen = ScriptGenerator(self.llm_provider)
-            return gen.generate_script(topic, style, duration)
+            gen = registry.script_generator(self.llm_provider)
+            return await gen.agenerate_script(topic, style, duration, use_cache)
         except Exception as e:
             logger.error(f"Script generation failed: {str(e)}")
             raise
@@ -59,20 +69,26 @@ class VideoWorkflow:
         job_id: str,
         topic: str,
         style_data: dict,
-        db: Session
+        db: AsyncSession,
+        use_cache: bool = True,
+        resume: bool = False,
+        video_duration: int = 120
     ) -> dict:
         try:
             logger.info(f"Starting LangGraph workflow for job {job_id}")
             
             from database import VideoJob
-            job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+            job = await db.get(VideoJob, job_id)
             
             # Prepare initial state
             initial_state = {
                 "job_id": job_id,
                 "topic": topic,
                 "style_data": style_data,
+                "video_duration": video_duration,
                 "llm_provider": self.llm_provider,
+                "use_cache": use_cache,
+                "streaming": False,
                 "script_data": None,
                 "blueprint": None,
                 "audio_path": None,
@@ -80,24 +96,39 @@ class VideoWorkflow:
                 "report_url": None,
                 "progress": 0,
                 "current_stage": "initializing",
+                "completed_stages": [],
                 "error": None
             }
             
+            if resume:
+                initial_state = await asyncio.to_thread(restore_state, initial_state, STAGES)
+                logger.info(f"Resuming job {job_id}, completed stages: {initial_state['completed_stages']}")
+            else:
+                await asyncio.to_thread(save_checkpoint, job_id, INPUTS, {
+                    "topic": topic,
+                    "style_data": style_data,
+                    "use_cache": use_cache,
+                    "video_duration": video_duration
+                })
+            
             # Execute LangGraph workflow
-            await manager.send_progress(job_id, "workflow", 0, "Starting workflow")
+            await manager.send_progress(
+                job_id, "workflow", initial_state['progress'],
+                "Resuming workflow" if resume else "Starting workflow"
+            )
             
-            final_state = self.graph.invoke(initial_state)
+            final_state = await self.graph.ainvoke(initial_state)
             
             # Update database with results
-            job.script_data = str(final_state.get('script_data'))
-            job.blueprint_data = str(final_state.get('blueprint'))
+            await db.run_sync(save_artifact, job_id, SCRIPT, final_state.get('script_data'))
+            await db.run_sync(save_artifact, job_id, BLUEPRINT, final_state.get('blueprint'))
             job.video_path = str(final_state.get('video_path'))
             job.report_url = final_state.get('report_url')
             job.progress = 100
             job.message = "Video and Report completed"
             job.status = VideoStatus.COMPLETED
             job.completed_at = datetime.now()
-            db.commit()
+            await db.commit()
             
             await manager.send_progress(job_id, "completed", 100, "Workflow completed")
             
@@ -112,11 +143,13 @@ class VideoWorkflow:
             
         except Exception as e:
             logger.error(f"Workflow failed: {str(e)}", exc_info=True)
+            discard_pipeline(job_id)
             
-            job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+            await db.rollback()
+            job = await db.get(VideoJob, job_id)
             job.status = VideoStatus.FAILED
             job.error = str(e)
-            db.commit()
+            await db.commit()
             
             await manager.send_error(job_id, str(e))
             raise
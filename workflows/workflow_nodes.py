@@ -1,40 +1,76 @@
 # workflows/workflow_nodes.py
 
+import asyncio
 import logging
 from typing import Dict, Any
-from services.script_generator import ScriptGenerator
-from services.animation_blueprint import AnimationBlueprint
-from services.video_renderer import VideoRenderer
-from services.tts_generator import TTSGenerator
-from services.ffmpeg_composer import FFmpegComposer
-from utils.report_generator import ReportGenerator
+from config import settings
+from services.service_registry import registry
+from workflows.scene_pipeline import start_pipeline, pop_pipeline, discard_pipeline
+from workflows.executors import run_cpu_bound, render_video
+from workflows.job_control import stage_deadline
+from workflows.scene_editor import SceneEditor
+from utils.resource_usage import job_usage
 
 logger = logging.getLogger(__name__)
 
-def script_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def script_node(state: Dict[str, Any]) -> Dict[str, Any]:
     logger.info(f"Script node: Generating script for {state['topic']}")
     
-    generator = ScriptGenerator(state['llm_provider'])
-    script_data = generator.generate_script(
+    generator = registry.script_generator(state['llm_provider'])
+    
+    if settings.script_streaming:
+        # Narration and rendering of each scene start while later scenes are still being written
+        pipeline = start_pipeline(state['job_id'])
+        try:
+            script_data = await generator.astream_script(
+                state['topic'],
+                state['style_data']['style'],
+                state.get('video_duration', 120),
+                pipeline.submit,
+                use_cache=state.get('use_cache', True)
+            )
+            
+            return {
+                **state,
+                "script_data": script_data,
+                "streaming": True,
+                "progress": 25,
+                "current_stage": "script_completed"
+            }
+        except Exception as e:
+            logger.warning(f"Streaming script generation failed, using full generation: {e}")
+            discard_pipeline(state['job_id'])
+    
+    script_data = await generator.agenerate_script(
         state['topic'],
         state['style_data']['style'],
-        120  # duration
+        state.get('video_duration', 120),
+        use_cache=state.get('use_cache', True)
     )
     
     return {
         **state,
         "script_data": script_data,
+        "streaming": False,
         "progress": 25,
         "current_stage": "script_completed"
     }
 
-def blueprint_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def blueprint_node(state: Dict[str, Any]) -> Dict[str, Any]:
     logger.info("Blueprint node: Creating animation blueprint")
     
-    generator = AnimationBlueprint(state['llm_provider'])
-    blueprint = generator.create_blueprint(
+    generator = registry.animation_blueprint(state['llm_provider'])
+    
+    if settings.blueprint_mode == "per_scene":
+        create = generator.acreate_blueprint_batched
+    else:
+        create = generator.acreate_blueprint
+    
+    blueprint = await create(
         state['script_data'],
-        state['style_data']
+        state['style_data'],
+        use_cache=state.get('use_cache', True),
+        budget=stage_deadline("create_blueprint")
     )
     
     return {
@@ -44,17 +80,39 @@ def blueprint_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "current_stage": "blueprint_completed"
     }
 
-def tts_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def tts_node(state: Dict[str, Any]) -> Dict[str, Any]:
     logger.info("TTS node: Generating voiceover")
     
     audio_path = None
+    
+    if state.get('streaming'):
+        # Each scene was already narrated by the scene pipeline
+        return {
+            **state,
+            "audio_path": None,
+            "progress": 70,
+            "current_stage": "audio_completed"
+        }
+    
     try:
-        tts = TTSGenerator()
+        tts = registry.tts_generator()
         voiceover_text = state['script_data'].get('voiceover_text', '')
         
         if voiceover_text:
             language = tts.detect_language(voiceover_text)
-            audio_path = tts.generate_audio(voiceover_text, language)
+            # TTS engines are blocking/CPU-bound, keep them off the event loop
+            scene_audio = await asyncio.to_thread(
+                tts.generate_scene_audio, state['script_data'].get('scenes', []), language
+            )
+            if scene_audio:
+                # One clip per scene (Sarvam packs them into a few requests), joined in script order
+                audio_path = await asyncio.to_thread(tts.join_audio, list(scene_audio.values()))
+                # A later scene edit reuses the narration of the scenes it leaves alone
+                await asyncio.to_thread(
+                    SceneEditor().adopt_scene_audio, state['script_data'].get('scenes', []), scene_audio, language
+                )
+            else:
+                audio_path = await asyncio.to_thread(tts.generate_audio, voiceover_text, language)
             logger.info(f"Audio generated: {audio_path}")
     except Exception as e:
         logger.warning(f"TTS failed (optional): {e}")
@@ -66,17 +124,35 @@ def tts_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "current_stage": "audio_completed"
     }
 
-def render_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def render_node(state: Dict[str, Any]) -> Dict[str, Any]:
     logger.info("Render node: Creating video with hybrid renderer")
     
-    from services.hybrid_video_renderer import HybridVideoRenderer
+    pipeline = pop_pipeline(state['job_id'])
     
-    renderer = HybridVideoRenderer()
-    video_path = renderer.render(
-        state['blueprint'],
-        state['script_data'],
-        state.get('audio_path')
-    )
+    if pipeline:
+        def assemble() -> str:
+            try:
+                segments = pipeline.collect(state['script_data'].get('scenes', []))
+            finally:
+                pipeline.shutdown()
+            
+            return registry.hybrid_renderer().render_segments(
+                [segments[n]['segment_path'] for n in sorted(segments)],
+                state['topic'],
+                state['job_id']
+            )
+        
+        # The pipeline's segments are rendered on its own threads; only the join is left
+        video_path = await asyncio.to_thread(assemble)
+    else:
+        # Encoding is CPU-bound; keep it off the event loop so the API stays responsive
+        video_path = await run_cpu_bound(
+            render_video,
+            state['blueprint'],
+            state['script_data'],
+            state.get('audio_path'),
+            state['job_id']
+        )
     
     return {
         **state,
@@ -85,10 +161,10 @@ def render_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "current_stage": "video_completed"
     }
 
-def report_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def report_node(state: Dict[str, Any]) -> Dict[str, Any]:
     logger.info("Report node: Creating report")
     
-    reporter = ReportGenerator()
+    reporter = registry.report_generator()
     report_data = {
         'topic': state['topic'],
         'style': state['style_data']['style'],
@@ -98,7 +174,12 @@ def report_node(state: Dict[str, Any]) -> Dict[str, Any]:
         'blueprint_data': str(state['blueprint'])
     }
     
-    report_url = reporter.create_report(report_data)
+    # What the job has used up to this, its last stage
+    usage = job_usage(state['job_id'])
+    if usage:
+        report_data['resource_usage'] = usage.snapshot()
+    
+    report_url = await asyncio.to_thread(reporter.create_report, report_data)
     
     return {
         **state,
@@ -7,7 +7,11 @@ class WorkflowState(TypedDict):
     job_id: str
     topic: str
     style_data: Dict[str, Any]
+    video_duration: int
     llm_provider: str
+    use_cache: bool
+    streaming: bool
+    completed_stages: List[str]
     
     # Generated data
     script_data: Optional[Dict[str, Any]]